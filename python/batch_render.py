@@ -0,0 +1,139 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from extract_music_data import get_external_file_path
+from jacket_cache import JACKET_CACHE_DIR_NAME, JacketCache
+from master_data import load_master_index
+from rating_engine import RatingEngine
+from score_csv import read_score_csv
+from table_render import MAX_NEW_SONGS_DISPLAY, MAX_OLD_SONGS_DISPLAY, render_rating_table
+from tile_cache import TILE_CACHE_DIR_NAME, TileCache
+
+NEW_SONG_MASTER_CSV_FILE_NAME = 'new_song_master.csv'
+OLD_SONG_MASTER_CSV_FILE_NAME = 'old_song_master.csv'
+IMAGES_DIR_NAME = 'ジャケット'
+
+# ワーカープロセスごとの状態 (_init_worker で1回だけ作る)
+_worker = {}
+
+
+def _init_worker(new_master_path, old_master_path, images_dir, cache_root):
+    # マスタはコンパイル済みキャッシュから読むので、プロセスごとに読み込んでも数ミリ秒で済む
+    _worker['new_master'] = load_master_index(new_master_path)
+    _worker['old_master'] = load_master_index(old_master_path)
+    _worker['images_dir'] = images_dir
+    _worker['jacket_cache'] = JacketCache(os.path.join(cache_root, JACKET_CACHE_DIR_NAME))
+    _worker['tile_cache'] = TileCache(cache_dir=os.path.join(cache_root, TILE_CACHE_DIR_NAME))
+
+
+def render_player(csv_filepath, output_path):
+    """
+    1人分のスコアCSVからレーティング表の画像を作って保存する (ワーカープロセスで実行)。
+
+    Returns:
+        dict: 'csv', 'png', '総合計レート', '新曲小計', '旧曲小計', '未登録譜面数'。
+
+    """
+    engine = RatingEngine(_worker['new_master'], _worker['old_master'], _worker['images_dir'],
+                          MAX_NEW_SONGS_DISPLAY, MAX_OLD_SONGS_DISPLAY)
+    song_types, _ = engine.add_scores(read_score_csv(csv_filepath))
+    image = render_rating_table(engine.top_new_songs(), engine.top_old_songs(), engine.total_rate,
+                                engine.new_songs_subtotal_rate, engine.old_songs_subtotal_rate,
+                                jacket_cache=_worker['jacket_cache'], max_workers=1, # 並列化はプロセス単位で行う
+                                tile_cache=_worker['tile_cache'])
+    image.save(output_path)
+    _worker['jacket_cache'].save_hash_index()
+    return {
+        'csv': csv_filepath,
+        'png': output_path,
+        '総合計レート': engine.total_rate,
+        '新曲小計': engine.new_songs_subtotal_rate,
+        '旧曲小計': engine.old_songs_subtotal_rate,
+        '未登録譜面数': song_types.count('unknown'),
+    }
+
+
+def list_score_csvs(csv_dir):
+    """ フォルダ内のスコアCSVのパス (ファイル名順) """
+    return sorted(os.path.join(csv_dir, name) for name in os.listdir(csv_dir) if name.lower().endswith('.csv'))
+
+
+def batch_render(csv_dir, output_dir, new_master_path=None, old_master_path=None,
+                 images_dir=None, cache_root=None, max_workers=None):
+    """
+    フォルダ内のプレイヤーごとのスコアCSV (曲名,難易度,STDORDX,スコア) から、
+    1人1枚のレーティング表の画像を output_dir に作る。プレイヤーはプロセスプールで並列に処理する。
+
+    Args:
+        csv_dir (str): スコアCSVのフォルダ。
+        output_dir (str): 画像の保存先 (CSVと同じファイル名で拡張子を .png にする)。
+        new_master_path (str): 新曲マスタCSVのパス (None でexeと同じ場所の new_song_master.csv)。
+        old_master_path (str): 旧曲マスタCSVのパス (None でexeと同じ場所の old_song_master.csv)。
+        images_dir (str): ジャケット画像のフォルダ (None でexeと同じ場所の ジャケット)。
+        cache_root (str): ジャケットとセルのキャッシュを置く cache フォルダの親
+            (None で画面・watch.py・rating_server.py と同じexeと同じ場所。キャッシュを共有できる)。
+        max_workers (int): プロセス数 (None でCPU数)。
+
+    Returns:
+        tuple: (成功したプレイヤーの結果のリスト, (CSVのパス, エラー) のリスト)。
+
+    """
+    if new_master_path is None:
+        new_master_path = get_external_file_path(NEW_SONG_MASTER_CSV_FILE_NAME)
+    if old_master_path is None:
+        old_master_path = get_external_file_path(OLD_SONG_MASTER_CSV_FILE_NAME)
+    if images_dir is None:
+        images_dir = get_external_file_path(IMAGES_DIR_NAME)
+    if cache_root is None:
+        cache_root = get_external_file_path('')
+    csv_filepaths = list_score_csvs(csv_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    # 親プロセスで一度読み込み、マスタのキャッシュを最新にしておく (ワーカーはキャッシュを読むだけになる)
+    load_master_index(new_master_path)
+    load_master_index(old_master_path)
+
+    results = []
+    errors = []
+    initargs = (new_master_path, old_master_path, images_dir, cache_root)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=initargs) as executor:
+        futures = {}
+        for csv_filepath in csv_filepaths:
+            output_path = os.path.join(output_dir, os.path.splitext(os.path.basename(csv_filepath))[0] + '.png')
+            futures[executor.submit(render_player, csv_filepath, output_path)] = csv_filepath
+        for future in as_completed(futures):
+            csv_filepath = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"エラー: {csv_filepath}: {e}")
+                errors.append((csv_filepath, e))
+                continue
+            print(f"{os.path.basename(csv_filepath)}: 総合計レート {result['総合計レート']} → {result['png']}")
+            results.append(result)
+    results.sort(key=lambda result: result['csv'])
+    return results, errors
+
+
+def _main():
+    parser = argparse.ArgumentParser(description="フォルダ内のスコアCSVからプレイヤーごとのレーティング表の画像をまとめて作る")
+    parser.add_argument('csv_dir', help="スコアCSVのフォルダ")
+    parser.add_argument('output_dir', help="画像の保存先フォルダ")
+    parser.add_argument('--new-master', default=get_external_file_path(NEW_SONG_MASTER_CSV_FILE_NAME), help="新曲マスタCSVのパス")
+    parser.add_argument('--old-master', default=get_external_file_path(OLD_SONG_MASTER_CSV_FILE_NAME), help="旧曲マスタCSVのパス")
+    parser.add_argument('--images-dir', default=get_external_file_path(IMAGES_DIR_NAME), help="ジャケット画像のフォルダ")
+    parser.add_argument('--cache-root', default=get_external_file_path(''), help="ジャケットとセルのキャッシュを置く cache フォルダの親 (既定はexeと同じ場所)")
+    parser.add_argument('--workers', type=int, default=None, help="プロセス数 (既定はCPU数)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results, errors = batch_render(args.csv_dir, args.output_dir, args.new_master, args.old_master,
+                                   args.images_dir, cache_root=args.cache_root, max_workers=args.workers)
+    print(f"{len(results)} 人分の画像を作成しました ({len(errors)} 件のエラー、{time.perf_counter() - start:.1f} 秒)")
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    _main()
@@ -0,0 +1,437 @@
+import argparse
+import csv
+import datetime
+import html
+import io
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageEnhance
+
+from calculate import calculate_rate, calculate_rates
+from extract_music_data import DIFFICULTY_ICONS, parse_html_file, parse_song_blocks_soup, parse_song_blocks_stream
+from jacket_cache import JacketCache
+from master_data import load_master_index
+from rating_engine import RatingEngine, TopKTracker
+from score_csv import read_score_csv, write_score_csv
+from tile_cache import TileCache
+from table_render import (CELL_HEIGHT, CELL_PADDING, CELL_WIDTH, FONT_SIZE_DETAIL, FONT_SIZE_RATE, FONT_SIZE_TITLE,
+                          HEADING_AREA_HEIGHT, JACKET_BRIGHTNESS, MAX_NEW_SONGS_DISPLAY, MAX_OLD_SONGS_DISPLAY,
+                          NEW_SONGS_TABLE_ROWS, OLD_SONGS_TABLE_ROWS, RATE_PASSING, TABLE_COLS, RenderTemplate,
+                          get_render_template, load_fonts, render_rating_table)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_SCORE_CSV_PATH = os.path.join(BASE_DIR, 'extracted_music_data.csv')
+JACKETS_DIR = os.path.join(BASE_DIR, 'ジャケット')
+NEW_SONG_MASTER_CSV_PATH = os.path.join(BASE_DIR, 'new_song_master.csv')
+OLD_SONG_MASTER_CSV_PATH = os.path.join(BASE_DIR, 'old_song_master.csv')
+
+# ベンチマークスイートの既定の楽曲ブロック数
+DEFAULT_SUITE_SIZES = (100, 1000, 10000, 50000)
+# 合成データでスコアのない (未プレイの) ブロックの割合
+UNPLAYED_RATIO = 0.05
+
+_ICON_BY_DIFFICULTY = {difficulty: icon_name for icon_name, difficulty in DIFFICULTY_ICONS}
+_IMG_BASE = 'https://maimaidx.jp/maimai-mobile/img/'
+
+
+def load_score_rows(csv_filepath=SAMPLE_SCORE_CSV_PATH):
+    with open(csv_filepath, 'r', encoding='utf-8-sig') as f:
+        return [row for row in csv.DictReader(f) if row.get('曲名')]
+
+
+def _song_block_html(row):
+    difficulty = row['難易度']
+    diff_class = _ICON_BY_DIFFICULTY[difficulty][5:-4] # diff_master.png → master
+    kind_icon = 'music_dx.png' if row['STDORDX'] == 'DX' else 'music_standard.png'
+    score_text = f"{int(row['スコア']) / 10000:.4f}%" if row['スコア'] != '' else '― %'
+    return (
+        f'<div class="music_{diff_class}_score_back pointer w_450 m_15 p_3 f_0">\n'
+        f'  <img src="{_IMG_BASE}{_ICON_BY_DIFFICULTY[difficulty]}" class="h_20 f_l">\n'
+        f'  <img src="{_IMG_BASE}{kind_icon}" class="music_kind_icon f_r">\n'
+        f'  <div class="music_lv_block f_r t_c f_14">13+</div>\n'
+        f'  <div class="music_name_block t_l f_13 break">{html.escape(row["曲名"])}</div>\n'
+        f'  <table class="w_450 f_0"><tbody><tr>\n'
+        f'    <td class="p_r_5 f_b t_r {diff_class}_score_label w_120">98.0000%</td>\n'
+        f'    <td class="t_c f_10">+0.0000%</td>\n'
+        f'    <td class="f_b t_r {diff_class}_score_label w_120">{score_text}</td>\n'
+        f'  </tr></tbody></table>\n'
+        f'</div>\n'
+    )
+
+
+def make_friend_vs_html(rows):
+    """ スコア行からmaimaiNETのフレンドVSページを模したHTMLを作る """
+    parts = [
+        '<!DOCTYPE html>\n<html lang="ja"><head><meta charset="utf-8"><title>maimai DX NET</title>\n',
+        '<script>window.dataLayer = window.dataLayer || [];</script></head>\n<body>\n',
+        '<div class="main_wrapper t_c"><header><div class="header_block">friend vs</div></header>\n',
+        '<div class="see_through_block m_15 p_10 t_l f_0"><span class="f_12">battle</span></div>\n',
+    ]
+    parts.extend(_song_block_html(row) for row in rows)
+    parts.append('</div>\n<footer class="f_10">&copy; SEGA</footer></body></html>\n')
+    return ''.join(parts)
+
+
+def _time_best(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_extract(rows, repeat=3):
+    """ 従来のDOMパースとストリーミング解析を同じHTMLで比較する """
+    html_content = make_friend_vs_html(rows)
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.txt', delete=False) as f:
+        f.write(html_content)
+        html_file_path = f.name
+    try:
+        def run_soup():
+            with open(html_file_path, 'r', encoding='utf-8') as f:
+                return parse_song_blocks_soup(f.read())
+
+        def run_stream():
+            with open(html_file_path, 'r', encoding='utf-8') as f:
+                return parse_song_blocks_stream(f)
+
+        soup_time, soup_rows = _time_best(run_soup, repeat)
+        stream_time, stream_rows = _time_best(run_stream, repeat)
+    finally:
+        os.remove(html_file_path)
+
+    return {
+        'blocks': len(rows),
+        'html_bytes': len(html_content.encode('utf-8')),
+        'soup_sec': soup_time,
+        'stream_sec': stream_time,
+        'speedup': soup_time / stream_time if stream_time else None,
+        'same_rows': soup_rows == stream_rows,
+    }
+
+
+def make_table_songs(jackets_dir=JACKETS_DIR):
+    """ 同梱のジャケットを順に使った、新曲15曲・旧曲35曲分の表示用データ """
+    jacket_names = sorted(name for name in os.listdir(jackets_dir) if name.lower().endswith(('.png', '.jpg')))
+    songs = []
+    for i in range(MAX_NEW_SONGS_DISPLAY + MAX_OLD_SONGS_DISPLAY):
+        jacket_name = jacket_names[i % len(jacket_names)]
+        songs.append({
+            '曲名': os.path.splitext(jacket_name)[0],
+            '難易度': 'MAS',
+            'STDORDX': 'DX',
+            'スコア': 1005000 - i * 1000,
+            '譜面定数': 14.0 - i * 0.02,
+            'レベル': '14',
+            '画像パス': os.path.join(jackets_dir, jacket_name),
+            'レート値': 315 - i,
+        })
+    return songs[:MAX_NEW_SONGS_DISPLAY], songs[MAX_NEW_SONGS_DISPLAY:]
+
+
+def _draw_song_cell_baseline(draw, song, x1, y1, fonts):
+    text_x = x1 + CELL_PADDING
+    rate_y = y1
+    draw.text((text_x, rate_y), f"{song['レート値']:.0f}", font=fonts['rate'], fill="yellow")
+    title_y = rate_y + FONT_SIZE_RATE + CELL_PADDING + RATE_PASSING
+    song_name_display = song['曲名']
+    max_title_len = int(CELL_WIDTH / (FONT_SIZE_TITLE * 0.65))
+    if len(song_name_display) > max_title_len:
+        song_name_display = song_name_display[:max_title_len-1] + "…"
+    draw.text((text_x, title_y), song_name_display, font=fonts['title'], fill="white")
+    difficulty_y = title_y + FONT_SIZE_TITLE + 1.5*CELL_PADDING
+    draw.text((text_x, difficulty_y), f"{song['難易度']} [{song['レベル']}]", font=fonts['detail'], fill="white")
+    const_y = difficulty_y + FONT_SIZE_DETAIL + CELL_PADDING
+    draw.text((text_x, const_y), f"定数:{song['譜面定数']:.1f} ({song['STDORDX']})", font=fonts['detail'], fill="white")
+    achivescore_y = const_y + FONT_SIZE_DETAIL + CELL_PADDING
+    draw.text((text_x, achivescore_y), text=f"スコア:{song['スコア']/10000:.4f} % ", font=fonts['detail'], fill="white")
+
+
+def render_rating_table_baseline(top_new_songs, top_old_songs, total_rate=None, new_songs_subtotal_rate=None,
+                                 old_songs_subtotal_rate=None):
+    """
+    比較用に残した、並列化・キャッシュ導入前の画像エクスポート (RatingApp.export_as_image の元の処理)。
+    フォントを毎回読み込み、ジャケットを毎回縮小して、1セルずつ直接描く。render_rating_table と同じ画素になる。
+    """
+    img_width = TABLE_COLS * CELL_WIDTH
+    img_height = (HEADING_AREA_HEIGHT +
+                  HEADING_AREA_HEIGHT + NEW_SONGS_TABLE_ROWS * CELL_HEIGHT +
+                  HEADING_AREA_HEIGHT + OLD_SONGS_TABLE_ROWS * CELL_HEIGHT)
+    image = Image.new("RGB", (img_width, img_height), "white")
+    draw = ImageDraw.Draw(image)
+    fonts = load_fonts()
+
+    current_y_offset = 0
+    if total_rate is not None:
+        total_rate_text = f"総合計レート: {total_rate:.0f}"
+        text_bbox = draw.textbbox((0, 0), total_rate_text, font=fonts['total_rate'])
+        text_width = text_bbox[2] - text_bbox[0]
+        text_height = text_bbox[3] - text_bbox[1]
+        text_x = (img_width - text_width) / 2
+        text_y = current_y_offset + (HEADING_AREA_HEIGHT - text_height) / 2
+        draw.text((text_x, text_y), total_rate_text, font=fonts['total_rate'], fill="red")
+    current_y_offset += HEADING_AREA_HEIGHT
+
+    sections = ((f"新曲 (Top {MAX_NEW_SONGS_DISPLAY})", new_songs_subtotal_rate, top_new_songs, NEW_SONGS_TABLE_ROWS),
+                (f"旧曲 (Top {MAX_OLD_SONGS_DISPLAY})", old_songs_subtotal_rate, top_old_songs, OLD_SONGS_TABLE_ROWS))
+    for heading_text, subtotal_rate, songs, table_rows in sections:
+        if subtotal_rate is not None:
+            heading_text += f"　小計: {subtotal_rate:.0f}"
+        draw.text((10, current_y_offset + HEADING_AREA_HEIGHT / 2 - fonts['heading'].getbbox("A")[3] / 2),
+                  heading_text, font=fonts['heading'], fill="black")
+        current_y_offset += HEADING_AREA_HEIGHT
+        for i, song in enumerate(songs[:table_rows * TABLE_COLS]):
+            x1 = (i % TABLE_COLS) * CELL_WIDTH
+            y1_cell = current_y_offset + (i // TABLE_COLS) * CELL_HEIGHT
+            img_path_s = song.get('画像パス', '')
+            if img_path_s and os.path.exists(img_path_s):
+                s_img = Image.open(img_path_s).resize((CELL_WIDTH, CELL_HEIGHT), Image.LANCZOS)
+                image.paste(ImageEnhance.Brightness(s_img).enhance(JACKET_BRIGHTNESS), (x1, y1_cell))
+            else:
+                draw.rectangle([x1, y1_cell, x1 + CELL_WIDTH, y1_cell + CELL_HEIGHT], fill="darkgrey", outline="black")
+            _draw_song_cell_baseline(draw, song, x1, y1_cell, fonts)
+        current_y_offset += table_rows * CELL_HEIGHT
+    return image
+
+
+def bench_export(repeat=3, max_workers=None):
+    """ レーティング表の画像作成を、元の処理 (render_rating_table_baseline) と1セルずつ・並列タイル描画で比較する """
+    top_new_songs, top_old_songs = make_table_songs()
+    template_time, _ = _time_best(RenderTemplate, repeat) # フォント読み込みとレイアウト計算
+    template = get_render_template()
+    baseline_time, baseline_image = _time_best(
+        lambda: render_rating_table_baseline(top_new_songs, top_old_songs, 15000, 4500, 10500).tobytes(), repeat)
+
+    def render(workers, jacket_cache=None, tile_cache=None):
+        return render_rating_table(top_new_songs, top_old_songs, 15000, 4500, 10500,
+                                   template=template, jacket_cache=jacket_cache, max_workers=workers,
+                                   tile_cache=tile_cache).tobytes()
+
+    serial_time, serial_image = _time_best(lambda: render(1), repeat)
+    parallel_time, parallel_image = _time_best(lambda: render(max_workers), repeat)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        jacket_cache = JacketCache(cache_dir)
+        render(max_workers, JacketCache(cache_dir)) # ディスクキャッシュを作っておく
+        cached_time, cached_image = _time_best(lambda: render(max_workers, jacket_cache), repeat)
+
+        # 描画済みセルのキャッシュがある状態で、1曲だけスコアが上がった場合
+        tile_cache = TileCache()
+        render(max_workers, jacket_cache, tile_cache)
+        def render_one_changed():
+            top_old_songs[0] = dict(top_old_songs[0], スコア=top_old_songs[0]['スコア'] + 1)
+            return render(max_workers, jacket_cache, tile_cache)
+        one_changed_time, _ = _time_best(render_one_changed, repeat)
+
+    return {
+        'cells': len(top_new_songs) + len(top_old_songs),
+        'workers': max_workers or min(8, os.cpu_count() or 1),
+        'template_sec': template_time,
+        'baseline_sec': baseline_time,
+        'serial_sec': serial_time,
+        'parallel_sec': parallel_time,
+        'cached_sec': cached_time,
+        'one_changed_sec': one_changed_time,
+        'same_image': baseline_image == serial_image == parallel_image == cached_image,
+    }
+
+
+def make_synthetic_rows(size, charts, seed=0):
+    """
+    マスタの譜面からランダムに選んだ size 件のスコア行 (load_score_rows と同じ形) を作る。
+    譜面数より多い場合は同じ譜面が複数回現れる (複数のダンプを合わせた場合と同じ)。
+
+    Args:
+        size (int): 楽曲ブロック数。
+        charts (list): (曲名, 難易度, STDORDX) のリスト。
+        seed (int): 乱数の種 (同じ値なら同じデータになる)。
+
+    Returns:
+        list: '曲名', '難易度', 'STDORDX', 'スコア' (文字列、未プレイは '') の辞書のリスト。
+
+    """
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(size):
+        song_name, difficulty, std_or_dx = rng.choice(charts)
+        score = '' if rng.random() < UNPLAYED_RATIO else str(min(1010000, int(rng.triangular(700000, 1010000, 1000000))))
+        rows.append({'曲名': song_name, '難易度': difficulty, 'STDORDX': std_or_dx, 'スコア': score})
+    return rows
+
+
+def chart_universe(new_master, old_master):
+    """ 合成データに使う譜面 (新旧マスタの全譜面のうち、HTMLで表せる難易度のもの) """
+    return [key for key in list(new_master) + list(old_master)
+            if key[1] in _ICON_BY_DIFFICULTY and key[2] in ('STD', 'DX')]
+
+
+def bench_master_load(new_master_path=NEW_SONG_MASTER_CSV_PATH, old_master_path=OLD_SONG_MASTER_CSV_PATH, repeat=3):
+    """ マスタの読み込み (キャッシュなしでCSVを解析する場合と、コンパイル済みキャッシュがある場合) """
+    def load_cold():
+        with tempfile.TemporaryDirectory() as cache_dir:
+            return load_master_index(new_master_path, cache_dir), load_master_index(old_master_path, cache_dir)
+
+    cold_time, (new_master, old_master) = _time_best(load_cold, repeat)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        load_master_index(new_master_path, cache_dir)
+        load_master_index(old_master_path, cache_dir)
+        warm_time, _ = _time_best(lambda: (load_master_index(new_master_path, cache_dir),
+                                           load_master_index(old_master_path, cache_dir)), repeat)
+    return {'charts': len(new_master) + len(old_master), 'cold_sec': cold_time, 'cached_sec': warm_time}
+
+
+def bench_pipeline(size, new_master, old_master, seed=0, repeat=3, images_dir=JACKETS_DIR):
+    """
+    合成した size ブロックのデータで、抽出 → レート計算 → 上位選択 → 画像作成 の各段階を別々に測る。
+
+    Returns:
+        dict: 各段階の秒数 (*_sec) と件数。
+
+    """
+    rows = make_synthetic_rows(size, chart_universe(new_master, old_master), seed)
+    result = {'blocks': size}
+    with tempfile.TemporaryDirectory() as work_dir:
+        html_file_path = os.path.join(work_dir, 'html.txt')
+        with open(html_file_path, 'w', encoding='utf-8') as f:
+            f.write(make_friend_vs_html(rows))
+        result['html_bytes'] = os.path.getsize(html_file_path)
+        # extract_music_data と同じストリーミング解析 (1ファイル分)
+        result['extract_sec'], records = _time_best(lambda: parse_html_file(html_file_path), repeat)
+        result['records'] = len(records)
+
+        csv_file_path = os.path.join(work_dir, 'scores.csv')
+        write_score_csv(csv_file_path, records)
+        result['csv_read_sec'], _ = _time_best(lambda: read_score_csv(csv_file_path), repeat)
+
+    engine = RatingEngine(new_master, old_master, images_dir, MAX_NEW_SONGS_DISPLAY, MAX_OLD_SONGS_DISPLAY)
+    resolved = [engine.lookup_chart(r['曲名'], r['難易度'], r['STDORDX']) for r in records]
+    constants = np.array([info['譜面定数'] for info, _ in resolved], dtype=np.float64)
+    scores = np.array([r['スコア'] for r in records], dtype=np.int64)
+    result['rate_scalar_sec'], _ = _time_best(
+        lambda: [calculate_rate(constant, score) for constant, score in zip(constants.tolist(), scores.tolist())], repeat)
+    result['rate_vector_sec'], rates = _time_best(lambda: calculate_rates(constants, scores), repeat)
+
+    def select_top():
+        trackers = {'new': TopKTracker(MAX_NEW_SONGS_DISPLAY), 'old': TopKTracker(MAX_OLD_SONGS_DISPLAY)}
+        for row, ((_, song_type), rate) in enumerate(zip(resolved, rates.tolist())):
+            if song_type in trackers:
+                trackers[song_type].offer(row, rate)
+        return trackers
+    result['topk_sec'], _ = _time_best(select_top, repeat)
+
+    def fold_in():
+        engine = RatingEngine(new_master, old_master, images_dir, MAX_NEW_SONGS_DISPLAY, MAX_OLD_SONGS_DISPLAY)
+        engine.add_scores(records)
+        return engine
+    result['engine_add_scores_sec'], engine = _time_best(fold_in, repeat)
+    result['total_rate'] = engine.total_rate
+
+    # export_table_as_image と同じ描画 (キャッシュなし) と PNG への書き出し
+    template = get_render_template()
+    top_new_songs, top_old_songs = engine.top_new_songs(), engine.top_old_songs()
+    result['render_sec'], image = _time_best(
+        lambda: render_rating_table(top_new_songs, top_old_songs, engine.total_rate, engine.new_songs_subtotal_rate,
+                                    engine.old_songs_subtotal_rate, template=template), repeat)
+    result['png_encode_sec'], _ = _time_best(lambda: image.save(io.BytesIO(), format='PNG'), repeat)
+    return result
+
+
+def machine_info():
+    """ 結果を比べるときに使う実行環境の情報 """
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+    }
+
+
+def run_suite(sizes=DEFAULT_SUITE_SIZES, seed=0, repeat=3, new_master_path=NEW_SONG_MASTER_CSV_PATH,
+              old_master_path=OLD_SONG_MASTER_CSV_PATH):
+    """
+    マスタの読み込みと、サイズごとのパイプラインの各段階を測る。
+    同じ seed なら同じ合成データになるので、同じマシンでの結果を比べられる。
+
+    Returns:
+        dict: 'machine', 'seed', 'repeat', 'master_load', 'pipeline' (サイズごとの結果のリスト)。
+
+    """
+    new_master = load_master_index(new_master_path)
+    old_master = load_master_index(old_master_path)
+    return {
+        'machine': machine_info(),
+        'seed': seed,
+        'repeat': repeat,
+        'master_load': bench_master_load(new_master_path, old_master_path, repeat),
+        'pipeline': [bench_pipeline(size, new_master, old_master, seed, repeat) for size in sizes],
+    }
+
+
+def format_suite(result):
+    """ run_suite の結果を表にした文字列 """
+    master_load = result['master_load']
+    lines = [f"マスタ読み込み ({master_load['charts']} 譜面): CSV解析 {master_load['cold_sec'] * 1000:.1f} ms / "
+             f"キャッシュ {master_load['cached_sec'] * 1000:.1f} ms",
+             f"{'ブロック数':>10} {'抽出':>9} {'CSV読込':>9} {'レート(1件ずつ)':>14} {'レート(配列)':>12} "
+             f"{'上位選択':>9} {'エンジン':>9} {'描画':>9} {'PNG':>9}  (ms)"]
+    for row in result['pipeline']:
+        lines.append(f"{row['blocks']:>10} " + ' '.join(
+            f"{row[key] * 1000:>{width}.1f}" for key, width in (
+                ('extract_sec', 9), ('csv_read_sec', 9), ('rate_scalar_sec', 14), ('rate_vector_sec', 12),
+                ('topk_sec', 9), ('engine_add_scores_sec', 9), ('render_sec', 9), ('png_encode_sec', 9))))
+    return '\n'.join(lines)
+
+
+def _print_legacy_benchmarks(csv_filepath):
+    result = bench_extract(load_score_rows(csv_filepath))
+    print(f"楽曲ブロック数: {result['blocks']} ({result['html_bytes'] / 1024:.0f} KB)")
+    print(f"従来 (BeautifulSoup全体パース): {result['soup_sec'] * 1000:.1f} ms")
+    print(f"ストリーミング解析: {result['stream_sec'] * 1000:.1f} ms (x{result['speedup']:.1f})")
+    print(f"抽出結果の一致: {result['same_rows']}")
+
+    result = bench_export()
+    print(f"画像エクスポート ({result['cells']} セル、{result['workers']} スレッド):")
+    print(f"テンプレート作成 (初回のみ): {result['template_sec'] * 1000:.1f} ms")
+    baseline = result['baseline_sec']
+    print(f"元の処理 (毎回フォント読み込み・ジャケット縮小): {baseline * 1000:.1f} ms")
+    for label, key in (("テンプレート + 1セルずつ描画", 'serial_sec'), ("並列タイル描画", 'parallel_sec'),
+                       ("並列タイル描画 + ジャケットキャッシュ", 'cached_sec'),
+                       ("1曲だけ変わった再エクスポート (セルキャッシュあり)", 'one_changed_sec')):
+        print(f"{label}: {result[key] * 1000:.1f} ms (x{baseline / result[key]:.1f})")
+    print(f"出力画像の一致: {result['same_image']}")
+
+
+def _main():
+    parser = argparse.ArgumentParser(description="抽出・レート計算・画像作成の処理時間を測る")
+    parser.add_argument('csv_file', nargs='?', default=SAMPLE_SCORE_CSV_PATH,
+                        help="抽出と画像エクスポートの比較に使うスコアCSV (--suite なしの場合)")
+    parser.add_argument('--suite', action='store_true', help="合成データでパイプラインの各段階をサイズ別に測る")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SUITE_SIZES), help="楽曲ブロック数")
+    parser.add_argument('--seed', type=int, default=0, help="合成データの乱数の種")
+    parser.add_argument('--repeat', type=int, default=3, help="各段階を繰り返す回数 (最短の時間を使う)")
+    parser.add_argument('--json', help="結果をJSONで保存するパス")
+    args = parser.parse_args()
+
+    if not args.suite:
+        _print_legacy_benchmarks(args.csv_file)
+        return
+    result = run_suite(args.sizes, args.seed, args.repeat)
+    print(format_suite(result))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"結果を {args.json} に保存しました。")
+
+
+if __name__ == '__main__':
+    _main()
@@ -1,3 +1,43 @@
+# 達成率(%)の下限 → ランク係数
+RANK_COEFFICIENTS = {
+    100.50: 22.4,
+    100.4999: 22.2,
+    100.00: 21.6,
+    99.99: 21.4,
+    99.50: 21.1,
+    99.00: 20.8,
+    98.99: 20.6,
+    98.00: 20.3,
+    97.00: 20.0,
+    96.99: 17.6,
+    94.00: 16.8,
+    90.00: 15.2,
+    80.00: 13.6,
+    79.99: 12.8,
+    75.00: 12.0,
+    70.00: 11.2,
+    60.00: 9.6,
+    50.00: 8.0,
+    40.00: 6.4,
+    30.00: 4.8,
+    20.00: 3.2,
+    10.00: 1.6,
+    0.00: 0.0,
+}
+
+# 線形探索用 (降順)
+_SORTED_RANK_RATES = sorted(RANK_COEFFICIENTS.keys(), reverse=True)
+
+# 境界 (昇順)
+RANK_BORDERS = tuple(sorted(RANK_COEFFICIENTS.keys()))
+
+# searchsorted用の境界と係数の numpy 配列 (初めて calculate_rates を呼ぶときに作る)
+_rank_tables = None
+
+# 達成率の上限 (これ以上はレート計算上 100.5% として扱う)
+MAX_ACHIEVEMENT_RATE = 100.50
+
+
 def calculate_rate(level: float, achievement_rate: float) -> int:
     """
     レベルと達成率からレート値を計算する関数。
@@ -15,46 +55,53 @@ def calculate_rate(level: float, achievement_rate: float) -> int:
 
     #百分率に変換　例980000→　98.0000
 
-    if achievement_rate >= 100.50:
-        achievement_rate =100.50
-
-    rank_coefficients = {
-        100.50: 22.4,
-        100.4999: 22.2,
-        100.00: 21.6,
-        99.99: 21.4,
-        99.50: 21.1,
-        99.00: 20.8,
-        98.99: 20.6,
-        98.00: 20.3,
-        97.00: 20.0,
-        96.99: 17.6,
-        94.00: 16.8,
-        90.00: 15.2,
-        80.00: 13.6,
-        79.99: 12.8,
-        75.00: 12.0,
-        70.00: 11.2,
-        60.00: 9.6,
-        50.00: 8.0,
-        40.00: 6.4,
-        30.00: 4.8,
-        20.00: 3.2,
-        10.00: 1.6,
-        0.00: 0.0,
-    }
+    if achievement_rate >= MAX_ACHIEVEMENT_RATE:
+        achievement_rate = MAX_ACHIEVEMENT_RATE
 
     rank_coefficient = 0.0
-    sorted_rates = sorted(rank_coefficients.keys(), reverse=True)
-
-    for rate in sorted_rates:
+    for rate in _SORTED_RANK_RATES:
         if achievement_rate >= rate:
-            rank_coefficient = rank_coefficients[rate]
+            rank_coefficient = RANK_COEFFICIENTS[rate]
             break
 
     rate_value = level * (achievement_rate / 100) * rank_coefficient
     return int(rate_value)
 
+
+def calculate_rates(levels, achievement_rates):
+    """
+    譜面定数とスコアの配列から、全てのレート値をまとめて計算する関数。
+    calculate_rate と同じ結果 (100.5%での頭打ち、小数点以下切り捨て) を返す。
+
+    Args:
+        levels (array-like): 譜面定数の配列。
+        achievement_rates (array-like): スコアの配列 (例: 1005000)。
+
+    Returns:
+        numpy.ndarray: レート値の配列 (int64)。
+
+    """
+    # numpy の import は起動時間の大半を占めるので、配列計算を初めて使うときまで遅らせる
+    import numpy as np
+
+    global _rank_tables
+    if _rank_tables is None:
+        _rank_tables = (np.array(RANK_BORDERS, dtype=np.float64),
+                        np.array([RANK_COEFFICIENTS[b] for b in RANK_BORDERS], dtype=np.float64))
+    rank_borders, rank_coefficient_table = _rank_tables
+
+    levels = np.asarray(levels, dtype=np.float64)
+    achievement = np.asarray(achievement_rates, dtype=np.float64) / 10000
+    achievement = np.minimum(achievement, MAX_ACHIEVEMENT_RATE)
+
+    # 達成率以下で最大の境界を二分探索 (0%未満は係数0.0)
+    border_index = np.searchsorted(rank_borders, achievement, side='right') - 1
+    rank_coefficient = rank_coefficient_table[np.maximum(border_index, 0)]
+    rank_coefficient = np.where(border_index >= 0, rank_coefficient, 0.0)
+
+    rate_values = levels * (achievement / 100) * rank_coefficient
+    return np.trunc(rate_values).astype(np.int64)
+
 # 関数の使用例
 
 """
@@ -76,7 +123,8 @@ print(f"レベル: {level}, 達成率: {achievement} の時のレート値: {rat
 
 """
 
-level = 13.4
-achievement = 1010000
-rate = calculate_rate(level, achievement)
-print(f"レベル: {level}, 達成率: {achievement} の時のレート値: {rate}")
\ No newline at end of file
+if __name__ == '__main__': # import したときには実行しない
+    level = 13.4
+    achievement = 1010000
+    rate = calculate_rate(level, achievement)
+    print(f"レベル: {level}, 達成率: {achievement} の時のレート値: {rate}")
@@ -0,0 +1,194 @@
+import unicodedata
+from collections import defaultdict
+
+# あいまい一致で採用する類似度 (トライグラムの Dice 係数) の下限。
+# 低くすると別の曲 ('ENERGY SYNERGY MATRIX' と 'ULTRA SYNERGY MATRIX' など) に読み替えてしまうので、
+# マスタの曲を1曲ずつ抜いて引いても別の曲に一致しない値にしている
+FUZZY_MATCH_THRESHOLD = 0.85
+# 1位と2位の類似度の差がこれより小さければ、どちらか決められないとして採用しない
+FUZZY_MATCH_MARGIN = 0.1
+
+# NFKC で揃わない記号の表記ゆれ
+_SYMBOL_TABLE = str.maketrans({
+    '～': '~', '〜': '~',
+    '‘': "'", '’': "'", '“': '"', '”': '"',
+    '‐': '-', '‑': '-', '–': '-', '—': '-', '―': '-', '−': '-',
+})
+
+# 難易度の別表記 (小文字・記号なし) → マスタの表記
+_DIFFICULTY_ALIASES = {
+    'basic': 'BASIC', 'bas': 'BASIC',
+    'advanced': 'ADVANCED', 'adv': 'ADVANCED',
+    'expert': 'EXP', 'exp': 'EXP',
+    'master': 'MAS', 'mas': 'MAS',
+    'remaster': 'ReMAS', 'remas': 'ReMAS',
+}
+_STD_OR_DX_ALIASES = {'std': 'STD', 'standard': 'STD', 'dx': 'DX', 'deluxe': 'DX'}
+
+# 一致する候補が複数あることを表す値
+_AMBIGUOUS = object()
+
+
+def normalize_title(title, casefold=True):
+    """
+    曲名の表記ゆれ (全角/半角・連続した空白・一部の記号、casefold=True なら大文字/小文字) をなくした文字列。
+    空白は1つにまとめるだけで取り除かない ('Heart Beats' と 'Heartbeats' は別の曲)。
+    """
+    text = unicodedata.normalize('NFKC', title).translate(_SYMBOL_TABLE)
+    text = ' '.join(text.split())
+    return text.casefold() if casefold else text
+
+
+def normalize_difficulty(difficulty):
+    """ 難易度の表記をマスタの表記 (BASIC, ADVANCED, EXP, MAS, ReMAS) に揃える。知らない表記はそのまま """
+    alias = ''.join(c for c in unicodedata.normalize('NFKC', difficulty).casefold() if c.isalnum())
+    return _DIFFICULTY_ALIASES.get(alias, difficulty.strip())
+
+
+def normalize_std_or_dx(std_or_dx):
+    alias = unicodedata.normalize('NFKC', std_or_dx).strip().casefold()
+    return _STD_OR_DX_ALIASES.get(alias, std_or_dx.strip())
+
+
+def _trigrams(text):
+    # 短い曲名でもトライグラムができるように前後に印を付ける。空白は単語の区切りとして同じ印に置き換え、
+    # 空白の有無だけが違う別の曲 ('Heart Beats' と 'Heartbeats') が似ているとみなされにくいようにする
+    padded = "\x02" + text.replace(' ', '\x03\x02') + "\x03"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _add_unique(index, key, value):
+    current = index.get(key)
+    if current is None:
+        index[key] = value
+    elif current != value:
+        index[key] = _AMBIGUOUS
+
+
+class ChartMatcher:
+    """
+    マスタのキー (曲名, 難易度, STDORDX) を表記ゆれに強く探すための索引。
+    正規化した曲名での完全一致を先に試し、見つからなければ曲名のトライグラムで似た曲を探す。
+    同じ正規化結果になる譜面が複数ある場合 ('Trust' と 'TRUST' など) は、その表記では一致とみなさない。
+    """
+
+    def __init__(self, master_keys):
+        self._exact = {}  # (曲名 (大文字/小文字はそのまま), 難易度, STDORDX) → マスタのキー
+        self._folded = {} # (曲名 (casefold), 難易度, STDORDX) → マスタのキー
+        self._titles = [] # 曲名 (casefold) の一覧
+        self._title_grams = [] # 曲名ごとのトライグラムの数
+        self._charts = [] # 曲名ごとの {(難易度, STDORDX): マスタのキー}
+        self._gram_index = defaultdict(list) # トライグラム → 曲名の番号
+        title_ids = {}
+        normalized_titles = {} # 曲名 → (正規化した曲名, casefold した曲名) (同じ曲名の譜面が多いので1回だけ正規化する)
+        normalized_charts = {}
+        for key in master_keys:
+            song_name, difficulty, std_or_dx = key
+            titles = normalized_titles.get(song_name)
+            if titles is None:
+                normalized = normalize_title(song_name, casefold=False)
+                titles = normalized_titles[song_name] = (normalized, normalized.casefold())
+            normalized, folded = titles
+            chart = normalized_charts.get((difficulty, std_or_dx))
+            if chart is None:
+                chart = normalized_charts[(difficulty, std_or_dx)] = (normalize_difficulty(difficulty), normalize_std_or_dx(std_or_dx))
+            _add_unique(self._exact, (normalized,) + chart, key)
+            _add_unique(self._folded, (folded,) + chart, key)
+
+            title_id = title_ids.get(folded)
+            if title_id is None:
+                title_id = title_ids[folded] = len(self._titles)
+                grams = _trigrams(folded)
+                self._titles.append(folded)
+                self._title_grams.append(len(grams))
+                self._charts.append({})
+                for gram in grams:
+                    self._gram_index[gram].append(title_id)
+            _add_unique(self._charts[title_id], chart, key)
+
+    def match(self, song_name, difficulty, std_or_dx):
+        """
+        表記ゆれを許してマスタのキーを探す。
+
+        Returns:
+            tuple: (マスタのキー, 類似度)。正規化だけで一致すれば類似度は 1.0、見つからなければ (None, 0.0)。
+
+        """
+        chart = (normalize_difficulty(difficulty), normalize_std_or_dx(std_or_dx))
+        for index, title in ((self._exact, normalize_title(song_name, casefold=False)),
+                             (self._folded, normalize_title(song_name))):
+            key = index.get((title,) + chart)
+            if key is not None and key is not _AMBIGUOUS:
+                return key, 1.0
+        return self._fuzzy_match(normalize_title(song_name), chart)
+
+    def _fuzzy_match(self, folded, chart):
+        grams = _trigrams(folded)
+        shared = defaultdict(int)
+        for gram in grams:
+            for title_id in self._gram_index.get(gram, ()):
+                shared[title_id] += 1
+
+        best_key, best, second = None, 0.0, 0.0
+        for title_id, count in shared.items():
+            key = self._charts[title_id].get(chart)
+            if key is None:
+                continue
+            similarity = 2 * count / (len(grams) + self._title_grams[title_id])
+            if similarity > best:
+                best_key, best, second = key, similarity, best
+            elif similarity > second:
+                second = similarity
+        if best_key is None or best_key is _AMBIGUOUS or best < FUZZY_MATCH_THRESHOLD or best - second < FUZZY_MATCH_MARGIN:
+            return None, 0.0
+        return best_key, best
+
+
+def matcher_for(master_data):
+    """ マスタの ChartMatcher (MasterIndex ならマスタごとに1回だけ作ったものを共有する) """
+    matcher = getattr(master_data, 'matcher', None)
+    return matcher if matcher is not None else ChartMatcher(master_data)
+
+
+class ChartResolver:
+    """
+    スコアの (曲名, 難易度, STDORDX) を新曲・旧曲マスタのキーに対応付ける。
+    完全一致を優先し、なければ両方のマスタを表記ゆれを許して探して類似度の高い方を使う (同じなら新曲)。
+    索引は完全一致しない譜面が初めて来たときに作り、一度調べたキーは結果を覚えておく。
+    正規化だけでは一致せず、似た曲名の譜面に読み替えたものは fuzzy_matches に残す (利用者に確認してもらうため)。
+    """
+
+    def __init__(self, new_song_master_data, old_song_master_data):
+        self.new_song_master_data = new_song_master_data
+        self.old_song_master_data = old_song_master_data
+        self.fuzzy_matches = {} # 元のキー → 読み替えたマスタのキー
+        self._matchers = None
+        self._resolved = {}
+
+    def resolve(self, song_name, difficulty, std_or_dx):
+        """
+        Returns:
+            tuple: (マスタのキー, 'new'/'old')。どちらのマスタにもなければ (元のキー, 'unknown')。
+        """
+        key = (song_name, difficulty, std_or_dx)
+        if key in self.new_song_master_data: # 新曲マスタを優先
+            return key, 'new'
+        if key in self.old_song_master_data:
+            return key, 'old'
+        resolved = self._resolved.get(key)
+        if resolved is None:
+            if self._matchers is None:
+                self._matchers = (matcher_for(self.new_song_master_data), matcher_for(self.old_song_master_data))
+            new_matcher, old_matcher = self._matchers
+            new_key, new_similarity = new_matcher.match(*key)
+            old_key, old_similarity = old_matcher.match(*key)
+            if new_key is not None and new_similarity >= old_similarity:
+                resolved, similarity = (new_key, 'new'), new_similarity
+            elif old_key is not None:
+                resolved, similarity = (old_key, 'old'), old_similarity
+            else:
+                resolved, similarity = (key, 'unknown'), 1.0
+            if similarity < 1.0:
+                self.fuzzy_matches[key] = resolved[0]
+            self._resolved[key] = resolved
+        return resolved
@@ -1,9 +1,15 @@
+import multiprocessing
 import os
 import sys
-from bs4 import BeautifulSoup
-import pandas as pd
+import time
+import tracemalloc
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from html.parser import HTMLParser
 import re
 
+import instrumentation
+from score_csv import write_score_csv
+
 def get_external_file_path(relative_path, subdirectory=None):
     """
     exeファイルと同じディレクトリ、またはそのサブディレクトリにある外部ファイルのパスを取得する。
@@ -21,19 +27,91 @@ def get_external_file_path(relative_path, subdirectory=None):
 
 # extract_music_data 関数内のファイルパス指定はそのまま
 # html_file_path = get_external_file_path('html.txt')
-# csv_file_path = 'extracted_music_data.csv'
+# 抽出結果CSVの既定のファイル名 (html.txt と同じくexeと同じ場所に保存する)
+EXTRACTED_CSV_FILE_NAME = 'extracted_music_data.csv'
+
+
+# --- 事前コンパイル済みのマッチャー ---
+SONG_BLOCK_CLASS_RE = re.compile(r'music_.*_score_back')
+SCORE_LABEL_CLASS_RE = re.compile(r'.*_score_label')
+DX_ICON_RE = re.compile(r'music_dx\.png')
+STD_ICON_RE = re.compile(r'music_standard\.png')
+NAME_BLOCK_CLASS = 'music_name_block'
+DIFFICULTY_ICON_CLASS = 'h_20 f_l'
+
+# 難易度アイコンのファイル名 → 難易度 (上から順に判定)
+DIFFICULTY_ICONS = (
+    ('diff_master.png', 'MAS'),
+    ('diff_remaster.png', 'ReMAS'),
+    ('diff_expert.png', 'EXP'),
+    ('diff_advanced.png', 'ADVANCED'),
+    ('diff_basic.png', 'BASIC'),
+)
+
+# ストリーミング解析時の読み込み単位
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# 難易度ごとのHTMLを1ファイルずつ置くフォルダ (exeと同じ場所)
+HTML_DUMP_DIR_NAME = 'html'
+HTML_DUMP_EXTENSIONS = ('.txt', '.html', '.htm')
+
+
+# 並列解析中に中止の指示を確認する間隔 (秒)
+CANCEL_POLL_INTERVAL_SEC = 0.1
+
+
+class ExtractionCancelled(Exception):
+    """ cancel_event によって抽出が中止された """
+
+
+def _check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise ExtractionCancelled()
+
 
+def _difficulty_from_icon(src):
+    for icon_name, difficulty in DIFFICULTY_ICONS:
+        if icon_name in src:
+            return difficulty
+    return None
 
 
-def extract_music_data():
+def _build_song_row(song_name, difficulty, dx_or_std, score_texts):
     """
-    HTMLファイルから楽曲データを抽出し、CSVファイルに保存します。
+    1つの楽曲ブロックから取り出した値を出力用の行にまとめる。
+    スコアが '― %' の場合や、必要な情報が揃っていない場合は None を返す。
     """
-    # HTMLファイルを読み込みます
-    # 'html.txt'ファイルがこのPythonスクリプトと同じディレクトリにあることを確認してください
-    html_file_path = get_external_file_path('html.txt') # <-- 追加/変更
-    with open(html_file_path, 'r', encoding='utf-8') as f: # <-- 変更
-        html_content = f.read()
+    score = None
+    # スコアが2つ以上存在する場合、2番目のスコアを選択します (インデックスは1)
+    # スコアが1つしかない場合は、そのスコアを選択
+    if score_texts:
+        score_text = score_texts[1] if len(score_texts) > 1 else score_texts[0]
+        # スコアが '― %' の場合は、このエントリをスキップします
+        if '― %' in score_text:
+            return None
+        try:
+            # '%'記号を削除し、float型に変換してから10000を掛けます
+            score = float(score_text.replace('%', '')) * 10000
+            score = int(score)  # 整数に変換します
+        except ValueError:
+            score = None
+
+    # すべての必要な情報が揃っている場合のみ、データに追加します
+    if song_name and difficulty and dx_or_std and score is not None:
+        return {
+            '曲名': song_name,
+            '難易度': difficulty,
+            'STDORDX': dx_or_std,
+            'スコア': score
+        }
+    return None
+
+
+def parse_song_blocks_soup(html_content):
+    """
+    HTML全体をBeautifulSoupでパースして楽曲データを抽出する (従来の方式)。
+    """
+    from bs4 import BeautifulSoup # 読み込みが重いので、この方式を使うときだけ import する
 
     # HTMLコンテンツをパース（解析）します
     soup = BeautifulSoup(html_content, 'html.parser')
@@ -43,84 +121,404 @@ def extract_music_data():
 
     # 楽曲ブロックのクラス名が 'music_master_score_back' または 'music_expert_score_back' など複数あるため、
     # 'music_' で始まり '_score_back' で終わるクラス名を持つdiv要素を検索します。
-    song_blocks = soup.find_all('div', class_=re.compile(r'music_.*_score_back'))
+    song_blocks = soup.find_all('div', class_=SONG_BLOCK_CLASS_RE)
 
     for block in song_blocks:
         song_name = None
         difficulty = None
         dx_or_std = None
-        score = None # スコアを初期化
 
         # 曲名を抽出
-        name_block = block.find('div', class_='music_name_block')
+        name_block = block.find('div', class_=NAME_BLOCK_CLASS)
         if name_block:
             song_name = name_block.get_text(strip=True)
 
         # 難易度を抽出
-        diff_img = block.find('img', class_='h_20 f_l')
+        diff_img = block.find('img', class_=DIFFICULTY_ICON_CLASS)
         if diff_img:
-            if 'diff_master.png' in diff_img['src']:
-                difficulty = 'MAS'
-            elif 'diff_remaster.png' in diff_img['src']:
-                difficulty = 'ReMAS'
-            elif 'diff_expert.png' in diff_img['src']:
-                difficulty = 'EXP'
-            elif 'diff_advanced.png' in diff_img['src']:
-                difficulty = 'ADVANCED'
-            elif 'diff_basic.png' in diff_img['src']:
-                difficulty = 'BASIC'
+            difficulty = _difficulty_from_icon(diff_img['src'])
 
         # DX or STDを抽出
-        dx_img = block.find('img', src=re.compile(r'music_dx\.png'))
-        std_img = block.find('img', src=re.compile(r'music_standard\.png'))
-        if dx_img:
+        if block.find('img', src=DX_ICON_RE):
             dx_or_std = 'DX'
-        elif std_img:
+        elif block.find('img', src=STD_ICON_RE):
             dx_or_std = 'STD'
 
         # スコアを抽出
-         # スコアを抽出
         # 全てのスコアラベルを持つ<td>要素を見つけます
-        score_labels = block.find_all('td', class_=re.compile(r'.*_score_label'))
-        score = None
-        # スコアが2つ以上存在する場合、2番目のスコアを選択します (インデックスは1)
-        if len(score_labels) > 1:
-            score_text = score_labels[1].get_text(strip=True) # 2番目のスコアを選択
-            # スコアが '― %' の場合は、このエントリをスキップします
-            if '― %' in score_text:
-                continue
-            try:
-                # '%'記号を削除し、float型に変換してから10000を掛けます
-                score = float(score_text.replace('%', '')) * 10000
-                score = int(score)  # 整数に変換します
-            except ValueError:
-                score = None
-        elif len(score_labels) == 1: # スコアが1つしかない場合は、そのスコアを選択
-            score_text = score_labels[0].get_text(strip=True)
-            if '― %' in score_text:
-                continue
-            try:
-                score = float(score_text.replace('%', '')) * 10000
-                score = int(score)
-            except ValueError:
-                score = None
-
-        # すべての必要な情報が揃っている場合のみ、データに追加します
-        if song_name and difficulty and dx_or_std and score is not None:
-            extracted_data.append({
-                '曲名': song_name,
-                '難易度': difficulty,
-                'STDORDX': dx_or_std,
-                'スコア': score
-            })
-
-    # 抽出したデータからDataFrameを作成します
-    df = pd.DataFrame(extracted_data)
-
-    # CSVファイルとして出力します
-    csv_file_path = 'extracted_music_data.csv'
-    df.to_csv(csv_file_path, index=False, encoding='utf-8-sig')
-
-    print(f"データが正常に抽出され、{csv_file_path} に保存されました。")
-    
-extract_music_data()
\ No newline at end of file
+        score_labels = block.find_all('td', class_=SCORE_LABEL_CLASS_RE)
+        score_texts = [label.get_text(strip=True) for label in score_labels[:2]]
+
+        row = _build_song_row(song_name, difficulty, dx_or_std, score_texts)
+        if row:
+            extracted_data.append(row)
+
+    return extracted_data
+
+
+class _SongBlock:
+    """ ストリーミング解析中の楽曲ブロック1つ分の状態 """
+    __slots__ = ('order', 'name_parts', 'difficulty_src', 'has_dx', 'has_std', 'score_parts')
+
+    def __init__(self, order):
+        self.order = order
+        self.name_parts = None
+        self.difficulty_src = None
+        self.has_dx = False
+        self.has_std = False
+        self.score_parts = []
+
+    def to_row(self):
+        song_name = ''.join(self.name_parts) if self.name_parts is not None else None
+        difficulty = _difficulty_from_icon(self.difficulty_src) if self.difficulty_src is not None else None
+        dx_or_std = 'DX' if self.has_dx else ('STD' if self.has_std else None)
+        score_texts = [''.join(parts) for parts in self.score_parts[:2]]
+        return _build_song_row(song_name, difficulty, dx_or_std, score_texts)
+
+
+class SongBlockScanner(HTMLParser):
+    """
+    HTMLをDOMを組み立てずに先頭から走査し、楽曲ブロックの中身だけを取り出すパーサー。
+    BeautifulSoup(html.parser) と同じトークナイザを使い、
+    閉じタグの扱い (直近の同名タグまで閉じる) とテキストの取り出し方も合わせている。
+    """
+
+    # 閉じタグを持たない要素 (BeautifulSoup の空要素と同じ)
+    VOID_ELEMENTS = frozenset([
+        'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link',
+        'menuitem', 'meta', 'param', 'source', 'track', 'wbr',
+        'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex', 'nextid', 'spacer',
+    ])
+    # 直下の文字列が get_text の対象外になる要素
+    NON_TEXT_ELEMENTS = frozenset(['script', 'style', 'template'])
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._stack = []      # [タグ名, 楽曲ブロック or None, テキスト収集先のリスト]
+        self._open_blocks = []
+        self._pending_text = []
+        self._block_count = 0
+        self._finished = []
+
+    def _flush_text(self):
+        if not self._pending_text:
+            return
+        text = ''.join(self._pending_text).strip()
+        self._pending_text = []
+        if not text:
+            return
+        if self._stack and self._stack[-1][0] in self.NON_TEXT_ELEMENTS:
+            return
+        for _tag, _block, collectors in self._stack:
+            for parts in collectors:
+                parts.append(text)
+
+    def handle_data(self, data):
+        if self._open_blocks:
+            self._pending_text.append(data)
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if not self._open_blocks and tag != 'div':
+            # 楽曲ブロックの外側は閉じタグの対応を取るためだけに積む
+            if tag not in self.VOID_ELEMENTS:
+                self._stack.append((tag, None, ()))
+            return
+
+        attr_map = dict(attrs)
+        classes = (attr_map.get('class') or '').split()
+        class_text = ' '.join(classes)
+        src = attr_map.get('src') or ''
+
+        # 開いている楽曲ブロックそれぞれの find/find_all に相当する判定
+        collectors = []
+        for block in self._open_blocks:
+            if tag == 'div':
+                if block.name_parts is None and (NAME_BLOCK_CLASS in classes or class_text == NAME_BLOCK_CLASS):
+                    block.name_parts = []
+                    collectors.append(block.name_parts)
+            elif tag == 'img':
+                if block.difficulty_src is None and class_text == DIFFICULTY_ICON_CLASS:
+                    block.difficulty_src = src
+                if DX_ICON_RE.search(src):
+                    block.has_dx = True
+                if STD_ICON_RE.search(src):
+                    block.has_std = True
+            elif tag == 'td':
+                if SCORE_LABEL_CLASS_RE.search(class_text):
+                    parts = []
+                    block.score_parts.append(parts)
+                    collectors.append(parts)
+
+        new_block = None
+        if tag == 'div' and SONG_BLOCK_CLASS_RE.search(class_text):
+            new_block = _SongBlock(self._block_count)
+            self._block_count += 1
+
+        if tag in self.VOID_ELEMENTS:
+            return
+        self._stack.append((tag, new_block, collectors))
+        if new_block is not None:
+            self._open_blocks.append(new_block)
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                break
+        else:
+            return # 対応する開始タグがない閉じタグは無視
+        for _tag, block, _collectors in self._stack[i:]:
+            if block is not None:
+                self._open_blocks.remove(block)
+                self._finished.append(block)
+        del self._stack[i:]
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def handle_decl(self, decl):
+        self._flush_text()
+
+    def handle_pi(self, data):
+        self._flush_text()
+
+    def unknown_decl(self, data):
+        self._flush_text()
+
+    def close(self):
+        super().close()
+        self._flush_text()
+        self._finished.extend(self._open_blocks)
+        self._open_blocks = []
+        self._stack = []
+
+    @property
+    def block_count(self):
+        """ ここまでに見つけた楽曲ブロックの数 """
+        return self._block_count
+
+    def rows(self):
+        """ 抽出した行をHTML内の出現順で返す """
+        extracted_data = []
+        for block in sorted(self._finished, key=lambda b: b.order):
+            row = block.to_row()
+            if row:
+                extracted_data.append(row)
+        return extracted_data
+
+
+def parse_song_blocks_stream(html_file, cancel_event=None, progress=None):
+    """
+    ファイルを少しずつ読み込みながら楽曲ブロックだけを解析して楽曲データを抽出する。
+    parse_song_blocks_soup と同じ行を返す。
+
+    Args:
+        html_file: テキストモードで開いたファイルオブジェクト、またはHTML文字列。
+        cancel_event (threading.Event): セットされたら読み込みの区切りごとに中止する (None で中止しない)。
+        progress (callable): 読み込みの区切りごとに、見つけた楽曲ブロックの数を渡して呼ぶ関数。
+
+    Returns:
+        list: 楽曲データの辞書のリスト。
+
+    Raises:
+        ExtractionCancelled: cancel_event がセットされた場合。
+
+    """
+    scanner = SongBlockScanner()
+    if isinstance(html_file, str):
+        scanner.feed(html_file)
+    else:
+        while True:
+            _check_cancelled(cancel_event)
+            chunk = html_file.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            scanner.feed(chunk)
+            if progress is not None:
+                progress(scanner.block_count)
+    scanner.close()
+    return scanner.rows()
+
+
+def parse_html_file(html_file_path, cancel_event=None):
+    """ HTMLファイル1つを解析して楽曲データを返す (プロセスプールのワーカーからも呼ばれる) """
+    with open(html_file_path, 'r', encoding='utf-8') as f:
+        return parse_song_blocks_stream(f, cancel_event)
+
+
+def _parse_html_file_traced(html_file_path, trace_memory):
+    """
+    プロセスプールのワーカー用の parse_html_file。計測はワーカーでは有効にならないので、
+    解析結果と一緒に (開始時刻, 所要時間(ms), メモリのピーク(KB), プロセスID) を返して親プロセスで記録する。
+    """
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        rows = parse_html_file(html_file_path)
+        duration_ms = (time.perf_counter() - start) * 1000
+        peak_kb = tracemalloc.get_traced_memory()[1] / 1024 if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return rows, (start, duration_ms, peak_kb, os.getpid())
+
+
+def merge_best_scores(row_lists):
+    """
+    複数ファイルの抽出結果を (曲名, 難易度, STDORDX) ごとに1行へまとめる。
+    同じ譜面が複数ある場合は最も高いスコアを残す。並びは最初に出てきた順。
+    """
+    best_rows = {}
+    for rows in row_lists:
+        for row in rows:
+            key = (row['曲名'], row['難易度'], row['STDORDX'])
+            current = best_rows.get(key)
+            if current is None or row['スコア'] > current['スコア']:
+                best_rows[key] = row
+    return list(best_rows.values())
+
+
+def list_html_dumps(dump_dir):
+    """ フォルダ内のHTMLダンプファイルを名前順で返す """
+    if not os.path.isdir(dump_dir):
+        return []
+    return [os.path.join(dump_dir, name) for name in sorted(os.listdir(dump_dir))
+            if name.lower().endswith(HTML_DUMP_EXTENSIONS) and os.path.isfile(os.path.join(dump_dir, name))]
+
+
+def extract_music_data_from_files(html_file_paths, max_workers=None, cancel_event=None, progress=None):
+    """
+    複数のHTMLファイルをプロセスプールで並列に解析し、重複をまとめた楽曲データを返す。
+    1ファイルにつき1ワーカーで処理する。
+
+    Args:
+        html_file_paths (list): HTMLファイルのパスのリスト。
+        max_workers (int): ワーカー数 (None でCPUコア数とファイル数の小さい方)。
+        cancel_event (threading.Event): セットされたら中止する (並列解析中は解析中のファイルの完了を待たずに戻る)。
+        progress (callable): ファイルの解析が終わるたびに (終わったファイル数, ファイル数) を渡して呼ぶ関数。
+
+    Returns:
+        list: 楽曲データの辞書のリスト。
+
+    Raises:
+        ExtractionCancelled: cancel_event がセットされた場合。
+
+    """
+    html_file_paths = list(html_file_paths)
+    if not html_file_paths:
+        return []
+    if max_workers is None:
+        max_workers = min(len(html_file_paths), os.cpu_count() or 1)
+
+    row_lists = [None] * len(html_file_paths)
+    if max_workers <= 1 or len(html_file_paths) == 1:
+        for i, path in enumerate(html_file_paths):
+            with instrumentation.stage('extract.html_file', file=os.path.basename(path)):
+                row_lists[i] = parse_html_file(path, cancel_event)
+            if progress is not None:
+                progress(i + 1, len(html_file_paths))
+    else:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+        pending = set() # submit が失敗しても finally で参照できるように先に作っておく
+        try:
+            traced = instrumentation.is_enabled()
+            if traced: # ワーカーでの1ファイルごとの時間とメモリのピークを記録する
+                futures = {executor.submit(_parse_html_file_traced, path, instrumentation.is_tracing_memory()): i
+                           for i, path in enumerate(html_file_paths)}
+            else:
+                futures = {executor.submit(parse_html_file, path): i for i, path in enumerate(html_file_paths)}
+            pending = set(futures)
+            while pending:
+                _check_cancelled(cancel_event)
+                done, pending = wait(pending, timeout=CANCEL_POLL_INTERVAL_SEC, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = futures[future]
+                    if traced:
+                        row_lists[i], (start, duration_ms, peak_kb, pid) = future.result()
+                        instrumentation.record_stage('extract.html_file', start, duration_ms, peak_kb, pid,
+                                                     file=os.path.basename(html_file_paths[i]))
+                    else:
+                        row_lists[i] = future.result()
+                if done and progress is not None:
+                    progress(len(html_file_paths) - len(pending), len(html_file_paths))
+        finally:
+            # 中止やエラーのときは未着手のファイルを取り消し、解析中のワーカーの終了は待たない
+            executor.shutdown(wait=not pending, cancel_futures=True)
+
+    for path, rows in zip(html_file_paths, row_lists):
+        print(f"{os.path.basename(path)}: {len(rows)} 件")
+    return merge_best_scores(row_lists)
+
+
+def extract_music_data_from_dir(dump_dir=None, max_workers=None):
+    """ フォルダ内の全HTMLダンプを並列に解析する (省略時はexeと同じ場所の 'html' フォルダ) """
+    if dump_dir is None:
+        dump_dir = get_external_file_path(HTML_DUMP_DIR_NAME)
+    return extract_music_data_from_files(list_html_dumps(dump_dir), max_workers=max_workers)
+
+
+def extract_music_data(mode='stream', csv_file_path=None, cancel_event=None, progress=None):
+    """
+    HTMLファイルから楽曲データを抽出して返します。csv_file_path を指定した場合はCSVファイルにも保存します。
+
+    Args:
+        mode (str): 'stream' (楽曲ブロックだけを逐次解析) または 'soup' (従来のDOM全体のパース)。
+            'stream' では 'html' フォルダ内のダンプもまとめて読み込む。
+        csv_file_path (str): 抽出結果を保存するCSVのパス (None なら保存しない)。
+        cancel_event (threading.Event): セットされたら解析の途中かCSVの保存前に中止する (None で中止しない)。
+        progress (callable): 解析の進み具合 (0.0〜1.0) と表示用の文字列を渡して呼ぶ関数。
+
+    Returns:
+        list: 楽曲データ ('曲名', '難易度', 'STDORDX', 'スコア') の辞書のリスト。同じ譜面は最高スコアの1行にまとめる。
+
+    Raises:
+        ExtractionCancelled: cancel_event がセットされた場合 (CSVは保存しない)。
+    """
+    # HTMLファイルを読み込みます
+    # 'html.txt'ファイルがこのPythonスクリプトと同じディレクトリにあることを確認してください
+    html_file_path = get_external_file_path('html.txt') # <-- 追加/変更
+    dump_file_paths = list_html_dumps(get_external_file_path(HTML_DUMP_DIR_NAME))
+    if dump_file_paths and mode != 'soup':
+        # 'html' フォルダにダンプがあれば html.txt と合わせて並列に解析し、譜面ごとに最高スコアを残す
+        if os.path.exists(html_file_path):
+            dump_file_paths.insert(0, html_file_path)
+        report_files = None
+        if progress is not None:
+            report_files = lambda done, total: progress(done / total, f"HTMLを解析中... ({done}/{total} ファイル)")
+        with instrumentation.stage('extract.html_parse', mode=mode, files=len(dump_file_paths)):
+            extracted_data = extract_music_data_from_files(dump_file_paths, cancel_event=cancel_event, progress=report_files)
+    else:
+        with open(html_file_path, 'r', encoding='utf-8') as f, instrumentation.stage('extract.html_parse', mode=mode, files=1): # <-- 変更
+            if mode == 'soup':
+                with instrumentation.stage('extract.html_read'):
+                    html_content = f.read()
+                _check_cancelled(cancel_event)
+                extracted_data = parse_song_blocks_soup(html_content)
+            else:
+                report_blocks = None
+                if progress is not None:
+                    file_size = os.fstat(f.fileno()).st_size or 1
+                    # 進み具合は読み込んだバイト数から求める
+                    report_blocks = lambda blocks: progress(min(f.buffer.tell() / file_size, 1.0), f"HTMLを解析中... ({blocks} 曲)")
+                # 少しずつ読みながら解析するので、読み込みは read() 1回ごとに記録する
+                extracted_data = parse_song_blocks_stream(instrumentation.timed_reader(f, 'extract.html_read'),
+                                                          cancel_event=cancel_event, progress=report_blocks)
+        # 複数ファイルのときと同じく、同じ譜面が複数あれば最高スコアの1行にまとめる
+        extracted_data = merge_best_scores([extracted_data])
+
+    # CSVファイルとして出力します (指定された場合のみ)
+    _check_cancelled(cancel_event) # 中止されたら前回の抽出結果のCSVを上書きしない
+    if csv_file_path:
+        write_score_csv(csv_file_path, extracted_data)
+        print(f"データが正常に抽出され、{csv_file_path} に保存されました。")
+    else:
+        print(f"データが正常に抽出されました ({len(extracted_data)} 件)。")
+
+    return extracted_data
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    extract_music_data(csv_file_path=get_external_file_path(EXTRACTED_CSV_FILE_NAME))
@@ -0,0 +1,257 @@
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# 設定すると計測を有効にする (値はトレースの保存先。"1" なら既定の保存先)
+TRACE_ENV = 'MAIRATE_TRACE'
+# "0" にするとメモリのピークを測らない (tracemalloc は解析などを数倍遅くするので、時間だけを見たい場合用)
+TRACE_MEMORY_ENV = 'MAIRATE_TRACE_MEMORY'
+DEFAULT_TRACE_FILE_NAME = 'mairate_trace.json'
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class _Recorder:
+    """ 計測結果 (Chrome のトレース形式のイベントと段階ごとの集計) を保持する """
+
+    def __init__(self, trace_path, trace_memory):
+        self.trace_path = trace_path
+        self.trace_memory = trace_memory
+        self.events = []
+        self.stats = {}    # 段階名 → {'calls', 'total_ms', 'max_ms', 'peak_kb'}
+        self.counters = {} # 名前 → 値
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self._open_peaks = {} # 計測中の段階の番号 → その段階の間の tracemalloc のピーク
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _update_peaks(self):
+        # ピークは全スレッド共通なので、計測中のすべての段階に反映してから数え直す (ロックの中で呼ぶ)
+        _, peak = tracemalloc.get_traced_memory()
+        for stage_id, stage_peak in self._open_peaks.items():
+            if peak > stage_peak:
+                self._open_peaks[stage_id] = peak
+        tracemalloc.reset_peak()
+
+    def begin(self):
+        with self._lock:
+            stage_id = self._next_id
+            self._next_id += 1
+            current = 0
+            if self.trace_memory:
+                self._update_peaks()
+                current, _ = tracemalloc.get_traced_memory()
+                self._open_peaks[stage_id] = current
+        return stage_id, current, time.perf_counter()
+
+    def end(self, name, args, stage_id, start_memory, start):
+        end = time.perf_counter()
+        event_args = dict(args)
+        with self._lock:
+            peak_kb = None
+            if self.trace_memory:
+                self._update_peaks()
+                current, _ = tracemalloc.get_traced_memory()
+                peak_kb = self._open_peaks.pop(stage_id) / 1024
+                event_args['delta_kb'] = round((current - start_memory) / 1024, 1)
+            self._add(name, event_args, start, (end - start) * 1000, peak_kb, self.pid, threading.get_ident())
+
+    def add(self, name, args, start, duration_ms, peak_kb, pid, tid):
+        with self._lock:
+            self._add(name, dict(args), start, duration_ms, peak_kb, pid, tid)
+
+    def _add(self, name, event_args, start, duration_ms, peak_kb, pid, tid):
+        # ロックの中で呼ぶ
+        if peak_kb is not None:
+            event_args['peak_kb'] = round(peak_kb, 1)
+        self.events.append({
+            'name': name, 'cat': name.split('.')[0], 'ph': 'X', 'pid': pid, 'tid': tid,
+            'ts': round((start - self.origin) * 1e6, 1), 'dur': round(duration_ms * 1000, 1), 'args': event_args,
+        })
+        stat = self.stats.setdefault(name, {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'peak_kb': None})
+        stat['calls'] += 1
+        stat['total_ms'] += duration_ms
+        stat['max_ms'] = max(stat['max_ms'], duration_ms)
+        if peak_kb is not None:
+            stat['peak_kb'] = max(stat['peak_kb'] or 0.0, peak_kb)
+
+    def counter(self, name, values):
+        with self._lock:
+            self.counters.update({f"{name}.{key}": value for key, value in values.items()})
+            self.events.append({
+                'name': name, 'ph': 'C', 'pid': self.pid, 'tid': threading.get_ident(),
+                'ts': round((time.perf_counter() - self.origin) * 1e6, 1), 'args': dict(values),
+            })
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.events), {name: dict(stat) for name, stat in self.stats.items()}, dict(self.counters)
+
+
+class _Stage:
+    def __init__(self, recorder, name, args):
+        self.recorder = recorder
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.state = self.recorder.begin()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args = dict(self.args, error=exc_type.__name__)
+        self.recorder.end(self.name, self.args, *self.state)
+        return False
+
+
+_recorder = None
+
+
+def enable(trace_path, trace_memory=True):
+    """
+    計測を有効にする。以後 stage() で囲んだ処理の時間・呼び出し回数・メモリのピークを記録し、
+    flush() とプロセスの終了時に trace_path へ Chrome のトレース形式 (chrome://tracing や Perfetto で開ける) で保存する。
+
+    Args:
+        trace_path (str): トレースの保存先。
+        trace_memory (bool): tracemalloc でメモリのピークも測るか (処理は遅くなる)。
+
+    """
+    global _recorder
+    if _recorder is not None:
+        return
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _recorder = _Recorder(trace_path, trace_memory)
+    atexit.register(flush)
+    print(f"計測を有効にしました。結果は {trace_path} に保存します。")
+
+
+def memory_tracing_requested():
+    """ 環境変数 MAIRATE_TRACE_MEMORY でメモリの計測を止めていないか """
+    return os.environ.get(TRACE_MEMORY_ENV, '1') != '0'
+
+
+def enable_from_env(default_trace_path):
+    """ 環境変数 MAIRATE_TRACE が設定されていれば計測を有効にする ("1" なら default_trace_path に保存) """
+    value = os.environ.get(TRACE_ENV)
+    if value:
+        enable(default_trace_path if value == '1' else value, trace_memory=memory_tracing_requested())
+
+
+def is_enabled():
+    return _recorder is not None
+
+
+def is_tracing_memory():
+    return _recorder is not None and _recorder.trace_memory
+
+
+def stage(name, **args):
+    """
+    処理の段階を計測する with 文用のオブジェクト。計測が無効なら何もしない (ほぼ負荷なし)。
+
+    Args:
+        name (str): 段階名 ('export.render' のように '.' の前を分類として使う)。
+        **args: トレースに一緒に記録する値 (件数など)。
+
+    """
+    if _recorder is None:
+        return _NULL_STAGE
+    return _Stage(_recorder, name, args)
+
+
+def record_stage(name, start, duration_ms, peak_kb=None, pid=None, **args):
+    """
+    別のプロセスで計測した段階を記録する (計測が無効なら何もしない)。
+
+    Args:
+        name (str): 段階名。
+        start (float): 開始時の time.perf_counter() (プロセス間で共通の時計)。
+        duration_ms (float): 所要時間 (ms)。
+        peak_kb (float): その段階の間のメモリのピーク (KB、測っていなければ None)。
+        pid (int): 計測したプロセスのID (トレースではプロセスごとに別の行に表示される)。
+        **args: トレースに一緒に記録する値。
+
+    """
+    if _recorder is not None:
+        pid = _recorder.pid if pid is None else pid
+        _recorder.add(name, args, start, duration_ms, peak_kb, pid, pid)
+
+
+class _TimedReader:
+    """ read() の1回ごとを段階として記録するファイルのラッパー (解析しながら少しずつ読む場合の読み込み時間用) """
+
+    def __init__(self, f, name):
+        self._f = f
+        self._name = name
+
+    def read(self, size=-1):
+        with stage(self._name, size=size):
+            return self._f.read(size)
+
+
+def timed_reader(f, name):
+    """ 計測が有効なら read() を name の段階として記録するラッパーを、無効なら f をそのまま返す """
+    if _recorder is None:
+        return f
+    return _TimedReader(f, name)
+
+
+def counter(name, **values):
+    """ キャッシュのヒット数などの値を記録する (計測が無効なら何もしない) """
+    if _recorder is not None:
+        _recorder.counter(name, values)
+
+
+def record_cache_stats(name, cache):
+    """ hits / misses を持つキャッシュのヒット率を記録する """
+    if _recorder is None:
+        return
+    lookups = cache.hits + cache.misses
+    counter(name, hits=cache.hits, misses=cache.misses, hit_rate=round(cache.hits / lookups, 3) if lookups else None)
+
+
+def summary():
+    """ 段階ごとの集計 ({'stages': {段階名: {'calls', 'total_ms', 'max_ms', 'peak_kb'}}, 'counters': {...}}) """
+    if _recorder is None:
+        return {'stages': {}, 'counters': {}}
+    _, stats, counters = _recorder.snapshot()
+    return {'stages': stats, 'counters': counters}
+
+
+def format_summary():
+    """ 段階ごとの集計を人が読める形の文字列にする """
+    result = summary()
+    lines = [f"{'段階':<28} {'回数':>6} {'合計(ms)':>10} {'最大(ms)':>10} {'ピーク(KB)':>11}"]
+    for name, stat in sorted(result['stages'].items(), key=lambda item: -item[1]['total_ms']):
+        peak = '-' if stat['peak_kb'] is None else f"{stat['peak_kb']:.0f}"
+        lines.append(f"{name:<28} {stat['calls']:>6} {stat['total_ms']:>10.1f} {stat['max_ms']:>10.1f} {peak:>11}")
+    for name, value in sorted(result['counters'].items()):
+        lines.append(f"{name}: {value}")
+    return '\n'.join(lines)
+
+
+def flush():
+    """ ここまでの計測結果をトレースファイルに保存する (計測が無効なら何もしない) """
+    if _recorder is None:
+        return
+    events, stats, counters = _recorder.snapshot()
+    trace = {
+        'traceEvents': events,
+        'displayTimeUnit': 'ms',
+        'otherData': {'stages': stats, 'counters': counters},
+    }
+    try:
+        tmp_path = f"{_recorder.trace_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(trace, f, ensure_ascii=False)
+        os.replace(tmp_path, _recorder.trace_path)
+    except OSError as e:
+        print(f"計測結果を保存できませんでした ({_recorder.trace_path}): {e}")
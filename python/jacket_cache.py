@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageEnhance
+
+import instrumentation
+
+# サムネイルの保存先の既定 (実行ファイルと同じ場所の cache フォルダ内)
+JACKET_CACHE_DIR_NAME = os.path.join('cache', 'jackets')
+# ディスク上のサムネイルの合計サイズの上限
+DEFAULT_MAX_CACHE_BYTES = 64 * 1024 * 1024
+# メモリ上に保持するサムネイルの数
+DEFAULT_MEMORY_ENTRIES = 128
+
+_HASH_INDEX_FILE_NAME = 'hashes.json'
+
+
+def evict_lru_files(cache_dir, max_bytes, suffix='.png'):
+    """ cache_dir 内の suffix のファイルの合計が max_bytes を超えていれば、更新日時の古いものから削除する """
+    entries = []
+    total = 0
+    try:
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(suffix):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                    total += stat.st_size
+    except OSError:
+        return
+    if total <= max_bytes:
+        return
+    for _, file_size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= file_size
+        if total <= max_bytes:
+            break
+
+
+def make_thumbnail(source_path, size, brightness):
+    """ ジャケット画像を size に縮小し、明るさを brightness 倍にする (キャッシュを使わない元の処理) """
+    with Image.open(source_path) as img:
+        thumbnail = img.resize(size, Image.LANCZOS)
+    return ImageEnhance.Brightness(thumbnail).enhance(brightness)
+
+
+class JacketCache:
+    """
+    縮小・明るさ調整済みのジャケット画像をディスクに保存して使い回すキャッシュ。
+    キーは元画像の内容のハッシュ・サイズ・明るさで、元画像が差し替えられれば別のキーになる。
+    元画像のハッシュは (パス, 更新日時, サイズ) ごとに覚えておき、変わっていなければ元画像を読まない。
+    保存したサムネイルの合計が max_bytes を超えたら、最後に使ったのが古いものから削除する。
+    複数のスレッドから同時に使ってよい。
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_CACHE_BYTES, memory_entries=DEFAULT_MEMORY_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict() # キャッシュファイル名 → Image
+        self._lock = threading.Lock()
+        self._hash_index_path = os.path.join(cache_dir, _HASH_INDEX_FILE_NAME)
+        self._hashes = self._load_hash_index()
+        self._hashes_dirty = False
+
+    def _load_hash_index(self):
+        try:
+            with open(self._hash_index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"ジャケットキャッシュの索引を読み込めないため作り直します ({self._hash_index_path}): {e}")
+            return {}
+
+    def save_hash_index(self):
+        """ 元画像のハッシュの記録を保存する (変更があった場合だけ) """
+        with self._lock:
+            if not self._hashes_dirty:
+                return
+            hashes = dict(self._hashes)
+            self._hashes_dirty = False
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._hash_index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(hashes, f, ensure_ascii=False)
+            os.replace(tmp_path, self._hash_index_path)
+        except OSError as e:
+            print(f"ジャケットキャッシュの索引を保存できませんでした ({self._hash_index_path}): {e}")
+
+    def source_hash(self, source_path):
+        """ 元画像の内容の SHA-1 (更新日時とサイズが変わっていなければ記録済みの値を返す) """
+        stat = os.stat(source_path)
+        path_key = os.path.abspath(source_path)
+        with self._lock:
+            entry = self._hashes.get(path_key)
+        if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry[2]
+
+        digest = hashlib.sha1()
+        with open(source_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        source_hash = digest.hexdigest()
+        with self._lock:
+            self._hashes[path_key] = [stat.st_mtime_ns, stat.st_size, source_hash]
+            self._hashes_dirty = True
+        return source_hash
+
+    def _remember(self, name, image):
+        with self._lock:
+            self._memory[name] = image
+            self._memory.move_to_end(name)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, source_path, size, brightness):
+        """
+        ジャケット画像のサムネイルを返す。make_thumbnail(source_path, size, brightness) と同じ画素になる。
+        返した Image は共有されるので、呼び出し側で書き換えないこと。
+
+        Args:
+            source_path (str): 元のジャケット画像のパス。
+            size (tuple): (幅, 高さ)。
+            brightness (float): 明るさの倍率。
+
+        Returns:
+            PIL.Image.Image: サムネイル。
+
+        Raises:
+            OSError: 元画像を読み込めない場合。
+
+        """
+        name = f"{self.source_hash(source_path)}_{size[0]}x{size[1]}_b{brightness:g}.png"
+        with self._lock:
+            image = self._memory.get(name)
+            if image is not None:
+                self._memory.move_to_end(name)
+                self.hits += 1
+                return image
+
+        cache_path = os.path.join(self.cache_dir, name)
+        try:
+            with Image.open(cache_path) as cached, instrumentation.stage('jacket.load_cached'):
+                image = cached.copy()
+            os.utime(cache_path) # 最後に使った日時として更新日時を使う
+            with self._lock:
+                self.hits += 1
+            self._remember(name, image)
+            return image
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"ジャケットキャッシュを読み込めないため作り直します ({cache_path}): {e}")
+
+        with instrumentation.stage('jacket.decode'):
+            image = make_thumbnail(source_path, size, brightness)
+        with self._lock:
+            self.misses += 1
+        self._remember(name, image)
+        self._store(cache_path, image)
+        return image
+
+    def _store(self, cache_path, image):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            image.save(tmp_path, format='PNG')
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"ジャケットキャッシュを保存できませんでした ({cache_path}): {e}")
+            return
+        self.evict()
+
+    def evict(self):
+        """ サムネイルの合計サイズが上限を超えていれば、最後に使ったのが古いものから削除する """
+        evict_lru_files(self.cache_dir, self.max_bytes)
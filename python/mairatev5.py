@@ -1,16 +1,23 @@
+import time
+_STARTUP_BEGIN = time.perf_counter() # 起動時間の計測用 (import より前に記録する)
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import csv
-from PIL import Image, ImageTk, ImageDraw, ImageFont, ImageEnhance
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import ImageTk
 import os
 import sys
-from bs4 import BeautifulSoup
-import pandas as pd
-import re
 import tkinter.font as tkfont
 # --- 定数 ---
 print("mairatev5.pyを実行中...しばらくお待ちください")
 
+import instrumentation
+from jacket_cache import JACKET_CACHE_DIR_NAME, JacketCache
+from tile_cache import TILE_CACHE_DIR_NAME, TILE_FIELDS, TileCache
+from ui_assets import UI_ASSET_CACHE_DIR_NAME, load_scaled_image
+
 def get_resource_path(relative_path):
     """
     リソースファイルの絶対パスを取得する。
@@ -31,44 +38,46 @@ def get_resource_path(relative_path):
 APP_TITLE = "mairate_bynomaji_AI(@nomaji1030)"
 WINDOW_WIDTH = 1000
 WINDOW_HEIGHT = 800
-TABLE_COLS = 5 # 横方向のセル数は共通
+# 表のレイアウトとフォントサイズは画像エクスポートと共通 (table_render.py で定義)
+from table_render import (TABLE_COLS, NEW_SONGS_TABLE_ROWS, MAX_NEW_SONGS_DISPLAY,
+                          OLD_SONGS_TABLE_ROWS, MAX_OLD_SONGS_DISPLAY,
+                          CELL_WIDTH, CELL_HEIGHT, HEADING_FONT_SIZE, HEADING_AREA_HEIGHT, CELL_PADDING, RATE_PASSING,
+                          FONT_SIZE_RATE, FONT_SIZE_TITLE, FONT_SIZE_DETAIL, FONT_SIZE_TOTAL_RATE,
+                          JACKET_BRIGHTNESS, render_rating_table, truncate_title)
 
 # 新曲用設定
 NEW_SONG_MASTER_CSV_PATH = get_resource_path("new_song_master.csv")
-NEW_SONGS_TABLE_ROWS = 3
-MAX_NEW_SONGS_DISPLAY = NEW_SONGS_TABLE_ROWS * TABLE_COLS # 15
 
 # 旧曲用設定
 OLD_SONG_MASTER_CSV_PATH = get_resource_path("old_song_master.csv")
-OLD_SONGS_TABLE_ROWS = 7
-MAX_OLD_SONGS_DISPLAY = OLD_SONGS_TABLE_ROWS * TABLE_COLS # 35
-
-# セルとフォント設定 (共通)
-CELL_WIDTH = 190
-CELL_HEIGHT = 120
-HEADING_FONT_SIZE = 18 # 小見出し用フォントサイズ
-HEADING_AREA_HEIGHT = 40 # 小見出しエリアの高さ
-CELL_PADDING = 5 # セル内テキストのパディング
-
-RATE_PASSING =  12# レート値の下に空白を入れるためのスペース
-
-FONT_NAME = "Yu Gothic UI"
-FONT_SIZE_RATE = 23
-FONT_SIZE_TITLE = 15
-FONT_SIZE_DETAIL = 12
 
-# --- 修正箇所: 新たなフォントサイズ定数を追加 ---
-FONT_SIZE_TOTAL_RATE = 40 # 総合計レートのフォントサイズ
-# --- 修正箇所ここまで ---
+FONT_NAME = "Yu Gothic UI" # Canvas 表示用のフォント
 
 
 BACKGROUND_IMAGE_PATH = get_resource_path("background.png")
 EXPLANATION_IMAGE_PATH = get_resource_path("explanation.png")
+EXPLANATION_IMAGE_SIZE = (300, 100)
+UI_ASSET_CACHE_DIR = get_resource_path(UI_ASSET_CACHE_DIR_NAME) # 縮小済みの背景・説明画像の保存先
 
 IMAGES_DIR =get_resource_path("ジャケット") 
-
-from calculate import calculate_rate
-from extract_music_data import extract_music_data
+JACKET_CACHE_DIR = get_resource_path(JACKET_CACHE_DIR_NAME) # 縮小済みジャケットの保存先
+TILE_CACHE_DIR = get_resource_path(TILE_CACHE_DIR_NAME) # 描画済みセルの保存先
+
+HISTORY_DB_PATH = get_resource_path("score_history.sqlite3") # スコア履歴の保存先
+AUTOMATIC_POLL_INTERVAL_MS = 50 # 全自動処理の進捗を確認する間隔
+JACKET_POLL_INTERVAL_MS = 30 # 読み込み終わったジャケットを Canvas に反映する間隔
+UI_ASSET_POLL_INTERVAL_MS = 20 # 読み込み終わった背景・説明画像を反映する間隔
+JACKET_LOADER_WORKERS = 2 # ジャケットを読み込むスレッド数
+MAX_UNMATCHED_LISTED = 20 # マスタにない曲の警告に並べる曲数
+SAVE_EXTRACTED_CSV = True # 全自動処理の抽出結果を extracted_music_data.csv にも保存するか
+TRACE_FILE_PATH = get_resource_path(instrumentation.DEFAULT_TRACE_FILE_NAME) # --trace や MAIRATE_TRACE=1 の場合の計測結果の保存先
+# 設定すると、ウィンドウが表示されるまでの時間を表示する ("exit" なら表示後に終了する。startup_report.py が使う)
+STARTUP_REPORT_ENV = "MAIRATE_STARTUP_REPORT"
+
+# HTMLの解析 (extract_music_data)・スコア履歴・差分は使うときに import する (起動を速くするため)
+from master_data import load_master_index
+from score_csv import read_score_csv
+from rating_engine import RatingEngine
 
 class RatingApp:
     """ レーティング表作成アプリ """
@@ -78,22 +87,34 @@ class RatingApp:
         master.title(APP_TITLE)
         master.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
 
-        self.song_data_list = [] # 全ての入力楽曲データ
         self.new_song_master_data = {}
         self.old_song_master_data = {}
         self.load_all_master_data() # 両方のマスタデータを読み込む
+        # 全ての入力楽曲データ (譜面ごとに最高スコアを保持し、上位曲を差分更新する)
+        self.engine = RatingEngine(self.new_song_master_data, self.old_song_master_data, IMAGES_DIR,
+                                   MAX_NEW_SONGS_DISPLAY, MAX_OLD_SONGS_DISPLAY)
 
         self.image_cache = {}
-
-        try:
-            self.bg_image = Image.open(BACKGROUND_IMAGE_PATH)
-            self.bg_photo_image = ImageTk.PhotoImage(self.bg_image.resize((WINDOW_WIDTH, WINDOW_HEIGHT)))
-            self.bg_label = tk.Label(master, image=self.bg_photo_image)
-            self.bg_label.place(x=0, y=0, relwidth=1, relheight=1)
-        except FileNotFoundError:
-            print(f"背景画像 {BACKGROUND_IMAGE_PATH} が見つかりません。")
-        except Exception as e:
-            print(f"背景画像の読み込みエラー: {e}")
+        self.jacket_cache = JacketCache(JACKET_CACHE_DIR) # Canvas とエクスポートで共有する
+        self.tile_cache = TileCache(cache_dir=TILE_CACHE_DIR) # エクスポートで変わっていないセルは描き直さない
+        # Canvas のジャケットはバックグラウンドで読み込み、読み込めたものから差し替える
+        self.jacket_executor = ThreadPoolExecutor(max_workers=JACKET_LOADER_WORKERS, thread_name_prefix='jacket_loader')
+        self.jacket_results = queue.Queue() # (画像パス, 縮小済み画像, エラー)
+        self.jacket_loading = set() # 読み込み中の画像パス
+        self.jacket_waiting = {} # 画像パス → ジャケットの表示を待つセルのリスト
+        self.canvas_slots = None # Canvas の表のアイテム (初回の表示で作り、以後は中身だけ書き換える)
+        self.displayed_version = None # 表示中の表の engine.version
+        self.history = None # スコア履歴DB (初回使用時に開く)
+        self.automatic_worker = None # 全自動処理のバックグラウンドスレッド
+        self.automatic_queue = queue.Queue() # ワーカー → 画面 への進捗通知
+        self.automatic_cancel = threading.Event()
+
+        # 背景と説明の画像は縮小済みのキャッシュをバックグラウンドで読み込み、ウィンドウを先に表示する
+        # (ラベルは重なり順を保つため元の位置で作っておき、読み込めたら画像を設定する)
+        self.ui_asset_results = queue.Queue() # (ラベル, 画像パス, 縮小済み画像, エラー)
+        self.ui_photo_images = {} # PhotoImage が破棄されないように保持する
+        self.bg_label = tk.Label(master)
+        self.bg_label.place(x=0, y=0, relwidth=1, relheight=1)
 
         
 
@@ -126,8 +147,8 @@ class RatingApp:
         style.configure("Big.TButton", font=bigfont)
 
 # ボタン作成時に style="Big.TButton" を指定
-        self.add_button = ttk.Button(input_frame, text="全自動処理", command=self.fully_automatic_processing, style="Big.TButton")
-        self.add_button.grid(row=1, column=4, padx=5, pady=2)
+        self.auto_button = ttk.Button(input_frame, text="全自動処理", command=self.fully_automatic_processing, style="Big.TButton")
+        self.auto_button.grid(row=1, column=4, padx=5, pady=2)
 
         self.import_csv_button = ttk.Button(input_frame, text="スコアCSVインポート", command=self.import_scores_from_csv)
         self.import_csv_button.grid(row=2, column=0, columnspan=2, padx=5, pady=5)
@@ -138,15 +159,26 @@ class RatingApp:
         self.export_button = ttk.Button(input_frame, text="画像エクスポート", command=self.export_table_as_image, state=tk.DISABLED)
         self.export_button.grid(row=2, column=4, columnspan=2, padx=5, pady=5)
 
-        try:
-            self.bg_explanation = Image.open(EXPLANATION_IMAGE_PATH)
-            self.bg_photo_explanation = ImageTk.PhotoImage(self.bg_explanation.resize((300,100)))
-            self.bg_label = tk.Label(input_frame, image=self.bg_photo_explanation)
-            self.bg_label.place( x=WINDOW_WIDTH/1.5, y=0,  relwidth=0.5, relheight=1    )
-        except FileNotFoundError:
-            print(f"背景画像 {EXPLANATION_IMAGE_PATH} が見つかりません。")
-        except Exception as e:
-            print(f"背景画像の読み込みエラー: {e}")
+        self.history_button = ttk.Button(input_frame, text="履歴から読込", command=self.load_scores_from_history)
+        self.history_button.grid(row=3, column=0, columnspan=2, padx=5, pady=5)
+
+        self.diff_button = ttk.Button(input_frame, text="スコアCSV比較", command=self.compare_score_csvs)
+        self.diff_button.grid(row=3, column=2, columnspan=2, padx=5, pady=5)
+
+        # 全自動処理の進捗表示
+        self.progress_label = ttk.Label(input_frame, text="")
+        self.progress_label.grid(row=4, column=0, columnspan=2, padx=5, pady=2, sticky="w")
+        self.progress_bar = ttk.Progressbar(input_frame, orient="horizontal", length=200, mode="determinate", maximum=100)
+        self.progress_bar.grid(row=4, column=2, columnspan=2, padx=5, pady=2)
+        self.cancel_button = ttk.Button(input_frame, text="中止", command=self.cancel_automatic_processing, state=tk.DISABLED)
+        self.cancel_button.grid(row=4, column=4, padx=5, pady=2)
+
+        self.explanation_label = tk.Label(input_frame)
+        self.explanation_label.place( x=WINDOW_WIDTH/1.5, y=0,  relwidth=0.5, relheight=1    )
+        ui_assets = [(self.bg_label, BACKGROUND_IMAGE_PATH, (WINDOW_WIDTH, WINDOW_HEIGHT)),
+                     (self.explanation_label, EXPLANATION_IMAGE_PATH, EXPLANATION_IMAGE_SIZE)]
+        threading.Thread(target=self._load_ui_assets, args=(ui_assets,), daemon=True).start()
+        self.master.after(UI_ASSET_POLL_INTERVAL_MS, self._poll_ui_assets, len(ui_assets))
 
         # --- Canvas設定 ---
         self.canvas_frame = ttk.Frame(master)
@@ -174,20 +206,11 @@ class RatingApp:
     def _load_master_csv(self, csv_filepath):
         master_data = {}
         try:
-            with open(csv_filepath, 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                if 'STDORDX' not in reader.fieldnames: # 共通チェック
-                    messagebox.showerror("マスタCSVエラー", f"{csv_filepath} に 'STDORDX' 列がありません。")
-                    return {}
-                for row in reader:
-                    key = (row['曲名'], row['難易度'], row['STDORDX'])
-                    master_data[key] = {
-                        '譜面定数': float(row['譜面定数']),
-                        'レベル': row['レベル'],
-                        'STDORDX_val': row['STDORDX'],
-                        '画像ファイル名': row.get('画像ファイル名', '')
-                    }
+            master_data = load_master_index(csv_filepath) # 変更がなければコンパイル済みキャッシュから読む
             print(f"{csv_filepath} を読み込みました。")
+        except ValueError as e:
+            messagebox.showerror("マスタCSVエラー", str(e))
+            return {}
         except FileNotFoundError:
             print(f"エラー: {csv_filepath} が見つかりません。")
             messagebox.showwarning("マスタファイルエラー", f"{csv_filepath} が見つかりません。処理は続行されますが、該当曲の情報は取得できません。")
@@ -195,6 +218,32 @@ class RatingApp:
             print(f"{csv_filepath} の読み込みエラー: {e}")
         return master_data
 
+    def _load_ui_assets(self, ui_assets):
+        # バックグラウンドのスレッドで実行する (Tk の PhotoImage はメインスレッドで作る)
+        for label, image_path, size in ui_assets:
+            try:
+                self.ui_asset_results.put((label, image_path, load_scaled_image(image_path, size, UI_ASSET_CACHE_DIR), None))
+            except Exception as e:
+                self.ui_asset_results.put((label, image_path, None, e))
+
+    def _poll_ui_assets(self, remaining):
+        """ 読み込み終わった背景・説明画像をラベルに設定する (after から呼ばれる) """
+        while remaining:
+            try:
+                label, image_path, image, error = self.ui_asset_results.get_nowait()
+            except queue.Empty:
+                break
+            remaining -= 1
+            if isinstance(error, FileNotFoundError):
+                print(f"背景画像 {image_path} が見つかりません。")
+            elif error is not None:
+                print(f"背景画像の読み込みエラー: {error}")
+            else:
+                self.ui_photo_images[image_path] = ImageTk.PhotoImage(image)
+                label.config(image=self.ui_photo_images[image_path])
+        if remaining:
+            self.master.after(UI_ASSET_POLL_INTERVAL_MS, self._poll_ui_assets, remaining)
+
     def load_all_master_data(self):
         self.new_song_master_data = self._load_master_csv(NEW_SONG_MASTER_CSV_PATH)
         self.old_song_master_data = self._load_master_csv(OLD_SONG_MASTER_CSV_PATH)
@@ -225,6 +274,8 @@ class RatingApp:
             return
 
         self._add_song_to_list(song_name, difficulty, std_or_dx, score)
+        if self.canvas_slots is not None and self.engine.version != self.displayed_version:
+            self.calculate_and_display_ratings() # 表を表示中なら、変わったセルだけをすぐに更新する
         self.song_name_entry.delete(0, tk.END)
         self.difficulty_entry.delete(0, tk.END)
         self.std_or_dx_entry.delete(0, tk.END)
@@ -232,272 +283,328 @@ class RatingApp:
         # print(f"追加: {song_name} ({difficulty} / {std_or_dx}) - スコア: {score}")
 
     def _add_song_to_list(self, song_name, difficulty, std_or_dx, score):
-        master_key = (song_name, difficulty, std_or_dx)
-        song_type = 'unknown'
-        chart_info = None
-  
-        if master_key in self.new_song_master_data:
-            chart_info = self.new_song_master_data[master_key]
-            song_type = 'new'
-        elif master_key in self.old_song_master_data:
-            chart_info = self.old_song_master_data[master_key]
-            song_type = 'old'
-        else:
-            messagebox.showwarning("マスタ参照エラー", f"楽曲「{song_name} ({difficulty} / {std_or_dx})」が新旧どちらのマスタにも見つかりません。")
-            chart_info = {'譜面定数': 0.0, 'レベル': 'N/A', 'STDORDX_val': std_or_dx, '画像ファイル名': ''}
-            # song_type remains 'unknown'
-
-        song_entry = {
-            '曲名': song_name,
-            '難易度': difficulty,
-            'STDORDX': std_or_dx,
-            'スコア': score,
-            '譜面定数': chart_info['譜面定数'],
-            'レベル': chart_info['レベル'],
-            '画像パス': os.path.join(IMAGES_DIR, chart_info['画像ファイル名']) if chart_info.get('画像ファイル名') else '',
-            'レート値': 0.0,
-            'song_type': song_type # 曲のタイプ (new/old/unknown) を格納
-        }
-        self.song_data_list.append(song_entry)
-        print(f"追加 ({song_type}): {song_name} ({difficulty} / {std_or_dx}) - スコア: {score}")
-
+        song_type, _ = self.engine.add_score(song_name, difficulty, std_or_dx, score)
+        self._report_added_song(song_name, difficulty, std_or_dx, score, song_type)
+
+    def _report_added_song(self, song_name, difficulty, std_or_dx, score, song_type):
+        if song_type == 'unknown': # 入力のたびにダイアログで止めず、進捗表示の欄に出す
+            self.progress_label.config(text=f"マスタにない曲: {song_name} ({difficulty} / {std_or_dx})")
+        elif (song_name, difficulty, std_or_dx) in self.engine.resolver.fuzzy_matches:
+            self.progress_label.config(text=f"似た曲名の譜面として登録: {self._format_resolved_chart(song_name, difficulty, std_or_dx)}")
+        print(f"追加 ({song_type}): {self._format_resolved_chart(song_name, difficulty, std_or_dx)} - スコア: {score}")
+
+    def _format_resolved_chart(self, song_name, difficulty, std_or_dx):
+        """ 表示用の譜面名。表記ゆれを補正した場合はマスタの表記も並べる """
+        master_key, _ = self.engine.resolver.resolve(song_name, difficulty, std_or_dx) # 結果は覚えてあるので速い
+        text = f"{song_name} ({difficulty} / {std_or_dx})"
+        if master_key != (song_name, difficulty, std_or_dx):
+            text += f" → {master_key[0]} ({master_key[1]} / {master_key[2]})"
+        return text
+
+    def _apply_score_records(self, records):
+        """
+        楽曲データをエンジンに反映し、(マスタにない譜面のリスト, 似た曲名の譜面に読み替えた譜面のリスト) を返す。
+        読み替えたものは表示用の文字列 ('元の譜面 → マスタの譜面') で返す。
+        画面を操作しないので、バックグラウンドのスレッドからも呼べる。
+        """
+        song_types, _ = self.engine.add_scores(records)
+        fuzzy_matches = self.engine.resolver.fuzzy_matches
+        unmatched, remapped = [], []
+        for record, song_type in zip(records, song_types):
+            key = (record['曲名'], record['難易度'], record['STDORDX'])
+            print(f"追加 ({song_type}): {self._format_resolved_chart(*key)} - スコア: {record['スコア']}")
+            if song_type == 'unknown':
+                unmatched.append(key)
+            elif key in fuzzy_matches:
+                remapped.append(self._format_resolved_chart(*key))
+        return unmatched, remapped
+
+    def _show_unmatched_warning(self, unmatched, remapped=()):
+        """ マスタにない曲と、似た曲名の譜面に読み替えた曲の警告をまとめて1回ずつ表示する """
+        def listed(lines):
+            if len(lines) > MAX_UNMATCHED_LISTED:
+                return lines[:MAX_UNMATCHED_LISTED] + [f"ほか {len(lines) - MAX_UNMATCHED_LISTED} 曲"]
+            return lines
+
+        if unmatched:
+            lines = listed([f"・{song_name} ({difficulty} / {std_or_dx})" for song_name, difficulty, std_or_dx in unmatched])
+            messagebox.showwarning("マスタ参照エラー", f"次の {len(unmatched)} 曲が新旧どちらのマスタにも見つかりません。\n" + "\n".join(lines))
+        if remapped:
+            lines = listed([f"・{text}" for text in remapped])
+            messagebox.showwarning("曲名の読み替え", f"次の {len(remapped)} 曲は曲名がマスタと一致しないため、似た曲名の譜面として計算しました。"
+                                   "正しいか確認してください。\n" + "\n".join(lines))
+
+    def _import_score_records(self, records):
+        """ 楽曲データ ('曲名', '難易度', 'STDORDX', 'スコア') をまとめて追加し、件数を返す """
+        records = list(records)
+        self._show_unmatched_warning(*self._apply_score_records(records))
+        return len(records)
 
     def import_scores_from_csv(self):
         # (_add_song_to_list が song_type を設定する)
         filepath = filedialog.askopenfilename(title="スコアCSVファイルを選択", filetypes=[("CSVファイル", "*.csv")])
         if not filepath: return
         try:
-            with open(filepath, 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                required_headers = ['曲名', '難易度', 'STDORDX', 'スコア']
-                if not all(header in reader.fieldnames for header in required_headers):
-                    messagebox.showerror("CSVフォーマットエラー", f"CSVファイルには '{', '.join(required_headers)}' のヘッダーが必要です。")
-                    return
-                imported_count = 0
-                for row in reader:
-                    try:
-                        song_name = row['曲名']
-                        difficulty = row['難易度']
-                        std_or_dx = row['STDORDX'].upper()
-                        score = int(row['スコア'])
-                        if std_or_dx not in ["STD", "DX"]:
-                            print(f"警告: STDORDXの値が不正な行 (STD/DX以外): {row}")
-                            continue
-                        self._add_song_to_list(song_name, difficulty, std_or_dx, score)
-                        imported_count += 1
-                    except ValueError: print(f"警告: スコア形式不正: {row}")
-                    except KeyError as e: print(f"警告: CSV必須列不足 ({e}): {row}")
+            records = read_score_csv(filepath)
+            imported_count = self._import_score_records(records)
+            self._record_history(records, os.path.basename(filepath))
             messagebox.showinfo("インポート完了", f"{imported_count} 件の楽曲データを処理しました。")
         except FileNotFoundError: messagebox.showerror("エラー", "ファイルが見つかりません。")
+        except ValueError as e: messagebox.showerror("CSVフォーマットエラー", str(e))
         except Exception as e: messagebox.showerror("インポートエラー", f"CSV処理エラー: {e}")
 
-    def automotive_csv(self):
-        # (全自動処理のCSVインポート)
-        filepath = "extracted_music_data.csv"
-        if not filepath: return
+    def _get_history(self):
+        if self.history is None:
+            from score_history import ScoreHistory
+            self.history = ScoreHistory(HISTORY_DB_PATH)
+        return self.history
+
+    def _record_history(self, records, source):
+        """ 取り込んだスコアを履歴DBに記録する (変わった譜面だけが書き込まれる) """
         try:
-            with open(filepath, 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                required_headers = ['曲名', '難易度', 'STDORDX', 'スコア']
-                if not all(header in reader.fieldnames for header in required_headers):
-                    messagebox.showerror("CSVフォーマットエラー", f"CSVファイルには '{', '.join(required_headers)}' のヘッダーが必要です。")
-                    return
-                imported_count = 0
-                for row in reader:
-                    try:
-                        song_name = row['曲名']
-                        difficulty = row['難易度']
-                        std_or_dx = row['STDORDX'].upper()
-                        score = int(row['スコア'])
-                        if std_or_dx not in ["STD", "DX"]:
-                            print(f"警告: STDORDXの値が不正な行 (STD/DX以外): {row}")
-                            continue
-                        self._add_song_to_list(song_name, difficulty, std_or_dx, score)
-                        imported_count += 1
-                    except ValueError: print(f"警告: スコア形式不正: {row}")
-                    except KeyError as e: print(f"警告: CSV必須列不足 ({e}): {row}")
-            messagebox.showinfo("インポート完了", f"{imported_count} 件の楽曲データを処理しました。")
-        except FileNotFoundError: messagebox.showerror("エラー", "ファイルが見つかりません。")
-        except Exception as e: messagebox.showerror("インポートエラー", f"CSV処理エラー: {e}")
+            snapshot_id, changed = self._get_history().import_records(records, source=source)
+            print(f"履歴に記録しました (スナップショット {snapshot_id}、{changed} 件更新)")
+        except Exception as e:
+            print(f"履歴の記録エラー: {e}")
 
+    def load_scores_from_history(self):
+        """ 履歴DBから譜面ごとの最高スコアを読み込む """
+        try:
+            records = self._get_history().current_best()
+        except Exception as e:
+            messagebox.showerror("履歴エラー", f"履歴の読み込みエラー: {e}")
+            return
+        if not records:
+            messagebox.showinfo("情報", "履歴にスコアがありません。")
+            return
+        imported_count = self._import_score_records(records)
+        messagebox.showinfo("インポート完了", f"履歴から {imported_count} 件の楽曲データを読み込みました。")
+
+    def compare_score_csvs(self):
+        """ 2つのスコアCSVを選び、上位曲の入れ替わりとレート差分を表示する """
+        before_filepath = filedialog.askopenfilename(title="比較元 (変更前) のスコアCSVを選択", filetypes=[("CSVファイル", "*.csv")])
+        if not before_filepath: return
+        after_filepath = filedialog.askopenfilename(title="比較先 (変更後) のスコアCSVを選択", filetypes=[("CSVファイル", "*.csv")])
+        if not after_filepath: return
+        try:
+            from score_diff import diff_score_csvs
+            result = diff_score_csvs(before_filepath, after_filepath, self.new_song_master_data, self.old_song_master_data,
+                                     MAX_NEW_SONGS_DISPLAY, MAX_OLD_SONGS_DISPLAY)
+        except FileNotFoundError: messagebox.showerror("エラー", "ファイルが見つかりません。"); return
+        except ValueError as e: messagebox.showerror("CSVフォーマットエラー", str(e)); return
+        except Exception as e: messagebox.showerror("比較エラー", f"CSV比較エラー: {e}"); return
+
+        window = tk.Toplevel(self.master)
+        window.title(f"スコア比較: {os.path.basename(before_filepath)} → {os.path.basename(after_filepath)}")
+        text = tk.Text(window, width=80, height=30)
+        scrollbar = ttk.Scrollbar(window, orient="vertical", command=text.yview)
+        text.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        text.pack(side="left", fill="both", expand=True)
+        text.insert("1.0", result.format_report())
+        text.config(state=tk.DISABLED)
 
     def calculate_and_display_ratings(self):
-        if not self.song_data_list:
+        if not len(self.engine.store):
             messagebox.showinfo("情報", "表示する楽曲データがありません。")
             return
 
-        for song in self.song_data_list:
-            try:
-                level = float(song['譜面定数'])
-                achievement_rate = float(song['スコア'])
-                song['レート値'] = calculate_rate(level, achievement_rate)
-            except (ValueError, TypeError): # 譜面定数が0.0の場合なども考慮
-                song['レート値'] = 0.0
-            except Exception as e:
-                song['レート値'] = 0.0
-                print(f"レート計算中に予期せぬエラー: {song['曲名']} - {e}")
-
-        # 新曲と旧曲に分類
-        new_songs_processed = [s for s in self.song_data_list if s['song_type'] == 'new']
-        old_songs_processed = [s for s in self.song_data_list if s['song_type'] == 'old']
-
-        # それぞれソートして上位曲を取得
-        self.top_new_songs = sorted(new_songs_processed, key=lambda s: s['レート値'], reverse=True)[:MAX_NEW_SONGS_DISPLAY]
-        self.top_old_songs = sorted(old_songs_processed, key=lambda s: s['レート値'], reverse=True)[:MAX_OLD_SONGS_DISPLAY]
+        # レート値と上位曲はスコアを追加した時点で差分更新済みなので、ここでは読み出すだけ
+        self.top_new_songs = self.engine.top_new_songs()
+        self.top_old_songs = self.engine.top_old_songs()
 
         # --- 修正箇所: 小計と合計を計算 ---
-        self.new_songs_subtotal_rate = sum(s['レート値'] for s in self.top_new_songs)
-        self.old_songs_subtotal_rate = sum(s['レート値'] for s in self.top_old_songs)
-        self.total_rate = self.new_songs_subtotal_rate + self.old_songs_subtotal_rate
+        self.new_songs_subtotal_rate = self.engine.new_songs_subtotal_rate
+        self.old_songs_subtotal_rate = self.engine.old_songs_subtotal_rate
+        self.total_rate = self.engine.total_rate
         # --- 修正箇所ここまで ---
 
         self.display_rating_tables() # 複数形に変更
+        self.displayed_version = self.engine.version
         self.export_button.config(state=tk.NORMAL)
 
-    def _draw_song_cell_on_canvas(self, song, base_x, base_y):
-        """ Canvasに1つの楽曲セルを描画するヘルパー """
+    def _create_canvas_slot(self, base_x, base_y):
+        """ Canvasに1つの楽曲セルのアイテム (仮セル・ジャケット・テキスト5つ) を作る。中身は _update_canvas_slot で入れる """
         x1, y1 = base_x, base_y
         x2, y2 = x1 + CELL_WIDTH, y1 + CELL_HEIGHT
 
-        img_path = song.get('画像パス', '')
-        if img_path and os.path.exists(img_path):
-            if img_path not in self.image_cache:
-                try:
-                    img = Image.open(img_path).resize((CELL_WIDTH, CELL_HEIGHT), Image.LANCZOS)
-                    # 明るさを調整する処理を追加
-                    brightness_factor = 0.5 # 0.0 (黒) から 1.0 (元の明るさ) の範囲で調整
-                    enhancer = ImageEnhance.Brightness(img)
-                    img_brightness_adjusted = enhancer.enhance(brightness_factor)
-
-                    self.image_cache[img_path] = ImageTk.PhotoImage(img_brightness_adjusted)
-                    
-                except Exception as e:
-                    print(f"画像読み込みエラー ({img_path}): {e}")
-                    self.image_cache[img_path] = None
-            if self.image_cache[img_path]:
-                self.canvas.create_image(x1, y1, anchor="nw", image=self.image_cache[img_path])
-            else: self.canvas.create_rectangle(x1, y1, x2, y2, fill="darkgrey", outline="black")
-        else:
-            self.canvas.create_rectangle(x1, y1, x2, y2, fill="darkgrey", outline="black")
-            if img_path: print(f"画像ファイルが見つかりません: {img_path}")
+        # 仮のセル (灰色の四角) の上にジャケットを重ね、ジャケットを表示している間は仮のセルを隠す
+        placeholder_item = self.canvas.create_rectangle(x1, y1, x2, y2, fill="darkgrey", outline="black", state=tk.HIDDEN)
+        image_item = self.canvas.create_image(x1, y1, anchor="nw", state=tk.HIDDEN)
 
         text_x = x1 + CELL_PADDING
         rate_y = y1  # CELL_PADDINGを0に
-        self.canvas.create_text(text_x, rate_y, anchor="nw", text=f"{song['レート値']:.0f}", font=(FONT_NAME, FONT_SIZE_RATE, "bold"), fill="yellow")
-
-        # 空行を追加 (Canvas表示ではこの空行は特に意味を持たないが、レイアウトの一貫性のため残す)
-        # blank_y = rate_y + FONT_SIZE_RATE + CELL_PADDING // 2
-        # self.canvas.create_text(text_x, blank_y, anchor="nw", text="", font=(FONT_NAME, FONT_SIZE_RATE))
-        
         # タイトル、難易度、定数、スコアの描画位置を調整
         # レート値の下に直接タイトルを配置する
         title_y = rate_y + FONT_SIZE_RATE + CELL_PADDING   +RATE_PASSING    # レート値の下に少しスペースを空ける,レート値の下はさらに空白
-    
-
-        song_name_display = song['曲名']
-        # フォントサイズとCELL_WIDTHに基づいて最大文字数を計算
-        # ImageFont.getsizeで正確なピクセル幅を取得する代わりに、おおよその比率で計算
-        max_title_len = int(CELL_WIDTH / (FONT_SIZE_TITLE * 0.65)) # 0.65は経験的な値
-
-        if len(song_name_display) > max_title_len:
-            song_name_display = song_name_display[:max_title_len-1] + "…"
-        self.canvas.create_text(text_x, title_y, anchor="nw", text=song_name_display, font=(FONT_NAME, FONT_SIZE_TITLE), fill="white")
-        
         difficulty_y = title_y + FONT_SIZE_TITLE + 1.5*CELL_PADDING
-        self.canvas.create_text(text_x, difficulty_y, anchor="nw", text=f"{song['難易度']} [{song['レベル']}]", font=(FONT_NAME, FONT_SIZE_DETAIL), fill="white")
-        
         const_y = difficulty_y + FONT_SIZE_DETAIL + CELL_PADDING
-        self.canvas.create_text(text_x, const_y, anchor="nw", text=f"定数:{song['譜面定数']:.1f} ({song['STDORDX']})", font=(FONT_NAME, FONT_SIZE_DETAIL), fill="white")
-        
         achivescore_y = const_y + FONT_SIZE_DETAIL + CELL_PADDING
-        self.canvas.create_text(text_x, achivescore_y, anchor="nw",
-                                    text=f"スコア:{song['スコア']/10000:.4f} % ",
-                                    font=(FONT_NAME, FONT_SIZE_DETAIL), fill="white")
+        text_items = [
+            self.canvas.create_text(text_x, rate_y, anchor="nw", font=(FONT_NAME, FONT_SIZE_RATE, "bold"), fill="yellow", state=tk.HIDDEN),
+            self.canvas.create_text(text_x, title_y, anchor="nw", font=(FONT_NAME, FONT_SIZE_TITLE), fill="white", state=tk.HIDDEN),
+            self.canvas.create_text(text_x, difficulty_y, anchor="nw", font=(FONT_NAME, FONT_SIZE_DETAIL), fill="white", state=tk.HIDDEN),
+            self.canvas.create_text(text_x, const_y, anchor="nw", font=(FONT_NAME, FONT_SIZE_DETAIL), fill="white", state=tk.HIDDEN),
+            self.canvas.create_text(text_x, achivescore_y, anchor="nw", font=(FONT_NAME, FONT_SIZE_DETAIL), fill="white", state=tk.HIDDEN),
+        ]
+        return {'placeholder': placeholder_item, 'image': image_item, 'texts': text_items,
+                'x': x1, 'y': y1, 'chart': None, 'content': None, 'img_path': ''}
+
+    def _move_canvas_slot(self, slot, x, y):
+        """ セルのアイテムをまとめて (x, y) に動かす (順位が変わっただけの曲は描き直さない) """
+        dx, dy = x - slot['x'], y - slot['y']
+        if dx or dy:
+            for item in [slot['placeholder'], slot['image']] + slot['texts']:
+                self.canvas.move(item, dx, dy)
+            slot['x'], slot['y'] = x, y
+
+    def _update_canvas_slot(self, slot, song):
+        """ セルの表示内容が前回と変わっていれば、そのセルのアイテムだけを itemconfig で書き換える """
+        content = None if song is None else tuple(song[field] for field in TILE_FIELDS) + (song.get('画像パス', ''),)
+        if content == slot['content']:
+            return
+        slot['content'] = content
+        slot['chart'] = None if song is None else (song['曲名'], song['難易度'], song['STDORDX'])
+        if song is None: # 空きセル
+            slot['img_path'] = ''
+            for item in [slot['placeholder'], slot['image']] + slot['texts']:
+                self.canvas.itemconfig(item, state=tk.HIDDEN)
+            return
 
+        texts = [
+            f"{song['レート値']:.0f}",
+            truncate_title(song['曲名']),
+            f"{song['難易度']} [{song['レベル']}]",
+            f"定数:{song['譜面定数']:.1f} ({song['STDORDX']})",
+            f"スコア:{song['スコア']/10000:.4f} % ",
+        ]
+        for item, text in zip(slot['texts'], texts):
+            self.canvas.itemconfig(item, text=text, state=tk.NORMAL)
+
+        # ジャケットが用意できるまでは仮のセルを表示する
+        img_path = song.get('画像パス', '')
+        slot['img_path'] = img_path
+        self.canvas.itemconfig(slot['image'], image='', state=tk.HIDDEN)
+        self.canvas.itemconfig(slot['placeholder'], state=tk.NORMAL)
+        if img_path and os.path.exists(img_path):
+            if img_path in self.image_cache:
+                self._show_jacket(slot, img_path)
+            else:
+                self._request_jacket(img_path, slot)
+        elif img_path:
+            print(f"画像ファイルが見つかりません: {img_path}")
+
+    def _show_jacket(self, slot, img_path):
+        photo_image = self.image_cache.get(img_path)
+        if photo_image and slot['img_path'] == img_path: # 読み込み中にセルの曲が変わっていれば何もしない
+            self.canvas.itemconfig(slot['image'], image=photo_image, state=tk.NORMAL)
+            self.canvas.itemconfig(slot['placeholder'], state=tk.HIDDEN)
+
+    def _request_jacket(self, img_path, slot):
+        """ ジャケットの読み込みをバックグラウンドに依頼し、読み込めたらセルに表示する """
+        self.jacket_waiting.setdefault(img_path, []).append(slot)
+        if img_path in self.jacket_loading:
+            return
+        if not self.jacket_loading:
+            self.master.after(JACKET_POLL_INTERVAL_MS, self._poll_jacket_results)
+        self.jacket_loading.add(img_path)
+        self.jacket_executor.submit(self._load_jacket, img_path)
 
-    def display_rating_tables(self):
-        self.canvas.delete("all")
-        current_y_offset = 0
+    def _load_jacket(self, img_path):
+        # ワーカースレッドで実行する (Tk の PhotoImage はメインスレッドで作る)
+        try:
+            # 縮小と明るさ調整はディスクのキャッシュがあればそれを使う
+            img_brightness_adjusted = self.jacket_cache.get(img_path, (CELL_WIDTH, CELL_HEIGHT), JACKET_BRIGHTNESS)
+            self.jacket_results.put((img_path, img_brightness_adjusted, None))
+        except Exception as e:
+            self.jacket_results.put((img_path, None, e))
 
-        # --- 修正箇所: 総合計レートの表示を追加 ---
-        if hasattr(self, 'total_rate'):
-            total_rate_text = f"総合計レート: {self.total_rate:.0f}"
-            self.canvas.create_text(WINDOW_WIDTH / 2, current_y_offset + HEADING_AREA_HEIGHT / 2, anchor="center",
-                                    text=total_rate_text, font=(FONT_NAME, FONT_SIZE_TOTAL_RATE, "bold"), fill="red")
-        current_y_offset += HEADING_AREA_HEIGHT # 総合計表示エリアの高さ
-        # --- 修正箇所ここまで ---
+    def _poll_jacket_results(self):
+        """ 読み込み終わったジャケットを Canvas に反映する (after から呼ばれる) """
+        while True:
+            try:
+                img_path, img_brightness_adjusted, error = self.jacket_results.get_nowait()
+            except queue.Empty:
+                break
+            self.jacket_loading.discard(img_path)
+            if error is not None:
+                print(f"画像読み込みエラー ({img_path}): {error}")
+                self.image_cache[img_path] = None
+            else:
+                self.image_cache[img_path] = ImageTk.PhotoImage(img_brightness_adjusted)
+            for slot in self.jacket_waiting.pop(img_path, []):
+                self._show_jacket(slot, img_path)
+        if self.jacket_loading:
+            self.master.after(JACKET_POLL_INTERVAL_MS, self._poll_jacket_results)
+        else:
+            self.jacket_cache.save_hash_index()
 
+    def _create_canvas_table(self):
+        """ 表のアイテムを一度だけ作る (総合計・見出し2つ・新曲と旧曲のセル) """
+        current_y_offset = 0
+        total_item = self.canvas.create_text(WINDOW_WIDTH / 2, current_y_offset + HEADING_AREA_HEIGHT / 2, anchor="center",
+                                             font=(FONT_NAME, FONT_SIZE_TOTAL_RATE, "bold"), fill="red", state=tk.HIDDEN)
+        current_y_offset += HEADING_AREA_HEIGHT # 総合計表示エリアの高さ
 
-        # 1. 新曲テーブル描画
-        # --- 修正箇所: 新曲小計表示を追加 ---
-        new_heading_text = f"新曲 (Top {MAX_NEW_SONGS_DISPLAY})　小計: {self.new_songs_subtotal_rate:.0f}" if hasattr(self, 'new_songs_subtotal_rate') else f"新曲 (Top {MAX_NEW_SONGS_DISPLAY})"
-        self.canvas.create_text(10, current_y_offset + HEADING_AREA_HEIGHT / 2, anchor="w",
-                                text=new_heading_text,
-                                font=(FONT_NAME, HEADING_FONT_SIZE, "bold"), fill="black")
-        # --- 修正箇所ここまで ---
+        new_heading_item = self.canvas.create_text(10, current_y_offset + HEADING_AREA_HEIGHT / 2, anchor="w",
+                                                   font=(FONT_NAME, HEADING_FONT_SIZE, "bold"), fill="black")
         current_y_offset += HEADING_AREA_HEIGHT
-
-        if hasattr(self, 'top_new_songs'):
-            for i, song in enumerate(self.top_new_songs):
-                row = i // TABLE_COLS
-                col = i % TABLE_COLS
-                cell_base_x = col * CELL_WIDTH
-                cell_base_y = current_y_offset + row * CELL_HEIGHT
-                self._draw_song_cell_on_canvas(song, cell_base_x, cell_base_y)
+        new_positions = [((i % TABLE_COLS) * CELL_WIDTH, current_y_offset + (i // TABLE_COLS) * CELL_HEIGHT)
+                         for i in range(MAX_NEW_SONGS_DISPLAY)]
         current_y_offset += NEW_SONGS_TABLE_ROWS * CELL_HEIGHT # 新曲テーブル分の高さを加算
 
-        # 2. 旧曲テーブル描画
-        # --- 修正箇所: 旧曲小計表示を追加 ---
-        old_heading_text = f"旧曲 (Top {MAX_OLD_SONGS_DISPLAY})　小計: {self.old_songs_subtotal_rate:.0f}" if hasattr(self, 'old_songs_subtotal_rate') else f"旧曲 (Top {MAX_OLD_SONGS_DISPLAY})"
-        self.canvas.create_text(10, current_y_offset + HEADING_AREA_HEIGHT / 2, anchor="w",
-                                text=old_heading_text,
-                                font=(FONT_NAME, HEADING_FONT_SIZE, "bold"), fill="black")
-        # --- 修正箇所ここまで ---
+        old_heading_item = self.canvas.create_text(10, current_y_offset + HEADING_AREA_HEIGHT / 2, anchor="w",
+                                                   font=(FONT_NAME, HEADING_FONT_SIZE, "bold"), fill="black")
         current_y_offset += HEADING_AREA_HEIGHT
+        old_positions = [((i % TABLE_COLS) * CELL_WIDTH, current_y_offset + (i // TABLE_COLS) * CELL_HEIGHT)
+                         for i in range(MAX_OLD_SONGS_DISPLAY)]
 
-        if hasattr(self, 'top_old_songs'):
-            for i, song in enumerate(self.top_old_songs):
-                row = i // TABLE_COLS
-                col = i % TABLE_COLS
-                cell_base_x = col * CELL_WIDTH
-                cell_base_y = current_y_offset + row * CELL_HEIGHT
-                self._draw_song_cell_on_canvas(song, cell_base_x, cell_base_y)
-        
         # Canvasのスクロール範囲を明示的に設定 (bbox("all")は時々不正確になることがあるため)
-        # --- 修正箇所: 総合計表示エリアの高さを含むように最終高さを調整 ---
         final_height = (HEADING_AREA_HEIGHT + # 総合計表示エリア
                         HEADING_AREA_HEIGHT + NEW_SONGS_TABLE_ROWS * CELL_HEIGHT +
                         HEADING_AREA_HEIGHT + OLD_SONGS_TABLE_ROWS * CELL_HEIGHT)
-        # --- 修正箇所ここまで ---
         self.canvas.config(scrollregion=(0, 0, TABLE_COLS * CELL_WIDTH, final_height))
+        self.canvas_slots = {'total': total_item, 'new_heading': new_heading_item, 'old_heading': old_heading_item,
+                             'new': (new_positions, [self._create_canvas_slot(x, y) for x, y in new_positions]),
+                             'old': (old_positions, [self._create_canvas_slot(x, y) for x, y in old_positions])}
+
+    def _update_canvas_cells(self, positions, slot_list, songs):
+        """
+        表の各位置に曲を割り当てる。前回も表示していた譜面は同じアイテムを動かして使い、
+        新しく入った譜面には表から外れた譜面のアイテムを使い回す。
+        """
+        slots_by_chart = {slot['chart']: slot for slot in slot_list if slot['chart'] is not None}
+        assigned = [slots_by_chart.pop((song['曲名'], song['難易度'], song['STDORDX']), None) for song in songs[:len(positions)]]
+        assigned += [None] * (len(positions) - len(assigned))
+        reused = {id(slot) for slot in assigned if slot is not None}
+        free_slots = [slot for slot in slot_list if id(slot) not in reused]
+        for i, (x, y) in enumerate(positions):
+            slot = assigned[i] if assigned[i] is not None else free_slots.pop(0)
+            assigned[i] = slot
+            self._move_canvas_slot(slot, x, y)
+            self._update_canvas_slot(slot, songs[i] if i < len(songs) else None)
+        slot_list[:] = assigned
 
+    def display_rating_tables(self):
+        """ 表を表示する。アイテムは作り直さず、前回から変わったセルと数値だけを書き換える """
+        with instrumentation.stage('canvas.draw'):
+            self._update_canvas_table()
 
-    def _draw_song_cell_on_image(self, draw, song, base_x, base_y, fonts):
-        """ Pillow Imageに1つの楽曲セルを描画するヘルパー """
-        x1, y1 = base_x, base_y
-        
-        # 画像の描画は呼び出し元で行うため、ここではテキスト描画のみ
-        text_x = x1 + CELL_PADDING
-        rate_y = y1  # CELL_PADDINGを0に
-        draw.text((text_x, rate_y), f"{song['レート値']:.0f}", font=fonts['rate'], fill="yellow")
-        
-        title_y = rate_y + FONT_SIZE_RATE + CELL_PADDING + RATE_PASSING # RATE_PASSINGをここでも適用
-        song_name_display = song['曲名']
-        max_title_len = int(CELL_WIDTH / (FONT_SIZE_TITLE * 0.65))
-        if len(song_name_display) > max_title_len:
-            song_name_display = song_name_display[:max_title_len-1] + "…"
-        draw.text((text_x, title_y), song_name_display, font=fonts['title'], fill="white")
-        
-        difficulty_y = title_y + FONT_SIZE_TITLE + 1.5*CELL_PADDING # 1.5*CELL_PADDINGをここでも適用
-        draw.text((text_x, difficulty_y), f"{song['難易度']} [{song['レベル']}]", font=fonts['detail'], fill="white")
-        
-        const_y = difficulty_y + FONT_SIZE_DETAIL + CELL_PADDING
-        draw.text((text_x, const_y), f"定数:{song['譜面定数']:.1f} ({song['STDORDX']})", font=fonts['detail'], fill="white")
+    def _update_canvas_table(self):
+        if self.canvas_slots is None:
+            self._create_canvas_table()
+        slots = self.canvas_slots
 
-        achivescore_y = const_y + FONT_SIZE_DETAIL + CELL_PADDING
-        draw.text((text_x, achivescore_y),
-                  text=f"スコア:{song['スコア']/10000:.4f} % ", # スコアキーを修正
-                  font=fonts['detail'], fill="white")
+        if hasattr(self, 'total_rate'):
+            self.canvas.itemconfig(slots['total'], text=f"総合計レート: {self.total_rate:.0f}", state=tk.NORMAL)
+
+        new_heading_text = f"新曲 (Top {MAX_NEW_SONGS_DISPLAY})　小計: {self.new_songs_subtotal_rate:.0f}" if hasattr(self, 'new_songs_subtotal_rate') else f"新曲 (Top {MAX_NEW_SONGS_DISPLAY})"
+        self.canvas.itemconfig(slots['new_heading'], text=new_heading_text)
+        old_heading_text = f"旧曲 (Top {MAX_OLD_SONGS_DISPLAY})　小計: {self.old_songs_subtotal_rate:.0f}" if hasattr(self, 'old_songs_subtotal_rate') else f"旧曲 (Top {MAX_OLD_SONGS_DISPLAY})"
+        self.canvas.itemconfig(slots['old_heading'], text=old_heading_text)
+
+        self._update_canvas_cells(*slots['new'], getattr(self, 'top_new_songs', []))
+        self._update_canvas_cells(*slots['old'], getattr(self, 'top_old_songs', []))
 
 
     def export_table_as_image(self):
@@ -510,149 +617,20 @@ class RatingApp:
         if not filepath: return
 
         try:
-            img_width = TABLE_COLS * CELL_WIDTH
-            # --- 修正箇所: 画像の高さに総合計表示エリアの分を追加 ---
-            img_height = (HEADING_AREA_HEIGHT + # 総合計表示エリア
-                          HEADING_AREA_HEIGHT + NEW_SONGS_TABLE_ROWS * CELL_HEIGHT +
-                          HEADING_AREA_HEIGHT + OLD_SONGS_TABLE_ROWS * CELL_HEIGHT)
-            # --- 修正箇所ここまで ---
-
-            image = Image.new("RGB", (img_width, img_height), "white") # 背景色
-            draw = ImageDraw.Draw(image)
-            
-            fonts = {}
-            # フォントファイルパスの調整
-            # get_resource_path を使用して、バンドルされたフォントファイルを見つける
-            font_path_base = get_resource_path("") # リソースのルートパスを取得
-            
-            try:
-                # Windows標準の日本語フォントを明示的に指定
-                jp_font_path = "C:/Windows/Fonts/meiryo.ttc"
-                fonts['heading'] = ImageFont.truetype(jp_font_path, HEADING_FONT_SIZE)
-                fonts['rate'] = ImageFont.truetype(jp_font_path, FONT_SIZE_RATE)
-                fonts['title'] = ImageFont.truetype(jp_font_path, FONT_SIZE_TITLE)
-                fonts['detail'] = ImageFont.truetype(jp_font_path, FONT_SIZE_DETAIL)
-                # --- 修正箇所: 総合計レート用フォントを追加 ---
-                fonts['total_rate'] = ImageFont.truetype(jp_font_path, FONT_SIZE_TOTAL_RATE)
-                # --- 修正箇所ここまで ---
-            except IOError:
-                print(f"警告: 指定フォント({jp_font_path})が見つかりません。代替フォントを使用。")
-                print(f"警告: 指定フォント({FONT_NAME})が見つかりません。代替フォントを使用。")
-                # OS依存の代替案
-                if os.name == 'nt': # Windows
-                    default_font_name = "arial.ttf"
-                    default_bold_font_name = "arialbd.ttf"
-                else: # macOS/Linux (一般的なフォント)
-                    default_font_name = "DejaVuSans.ttf"
-                    default_bold_font_name = "DejaVuSans-Bold.ttf"
-
-                try:
-                    fonts['heading'] = ImageFont.truetype(default_bold_font_name, HEADING_FONT_SIZE)
-                    fonts['rate'] = ImageFont.truetype(default_bold_font_name, FONT_SIZE_RATE)
-                    fonts['title'] = ImageFont.truetype(default_font_name, FONT_SIZE_TITLE)
-                    fonts['detail'] = ImageFont.truetype(default_font_name, FONT_SIZE_DETAIL)
-                    # --- 修正箇所: 総合計レート用代替フォントを追加 ---
-                    fonts['total_rate'] = ImageFont.truetype(default_bold_font_name, FONT_SIZE_TOTAL_RATE)
-                    # --- 修正箇所ここまで ---
-                except IOError as e_default_font:
-                    print(f"エラー: 代替フォントも読み込めません。システムデフォルトフォントで続行します。詳細: {e_default_font}")
-                    fonts['heading'] = ImageFont.load_default()
-                    fonts['rate'] = ImageFont.load_default()
-                    fonts['title'] = ImageFont.load_default()
-                    fonts['detail'] = ImageFont.load_default()
-                    # --- 修正箇所: 総合計レート用システムデフォルトフォントを追加 ---
-                    fonts['total_rate'] = ImageFont.load_default()
-                    # --- 修正箇所ここまで ---
-
-
-            current_y_offset = 0
-
-            # --- 修正箇所: 画像への総合計レートの描画を追加 ---
-            if hasattr(self, 'total_rate'):
-                total_rate_text = f"総合計レート: {self.total_rate:.0f}"
-                # テキストを中央揃えにするための計算
-                text_bbox = draw.textbbox((0, 0), total_rate_text, font=fonts['total_rate'])
-                text_width = text_bbox[2] - text_bbox[0]
-                text_height = text_bbox[3] - text_bbox[1]
-                
-                text_x = (img_width - text_width) / 2
-                text_y = current_y_offset + (HEADING_AREA_HEIGHT - text_height) / 2
-                draw.text((text_x, text_y), total_rate_text, font=fonts['total_rate'], fill="red")
-            current_y_offset += HEADING_AREA_HEIGHT # 総合計表示エリアの高さ
-            # --- 修正箇所ここまで ---
-
-
-            # 新曲描画
-            # --- 修正箇所: 画像への新曲小計表示を追加 ---
-            new_heading_text = f"新曲 (Top {MAX_NEW_SONGS_DISPLAY})　小計: {self.new_songs_subtotal_rate:.0f}" if hasattr(self, 'new_songs_subtotal_rate') else f"新曲 (Top {MAX_NEW_SONGS_DISPLAY})"
-            draw.text((10, current_y_offset + HEADING_AREA_HEIGHT / 2 - fonts['heading'].getbbox("A")[3] / 2),
-                      new_heading_text, font=fonts['heading'], fill="black")
-            # --- 修正箇所ここまで ---
-            current_y_offset += HEADING_AREA_HEIGHT
-            
-            if hasattr(self, 'top_new_songs'):
-                for i, song in enumerate(self.top_new_songs):
-                    row = i // TABLE_COLS
-                    col = i % TABLE_COLS
-                    x1 = col * CELL_WIDTH
-                    y1_cell = current_y_offset + row * CELL_HEIGHT
-                    
-                    # 画像の描画と明るさ調整
-                    img_path_s = song.get('画像パス', '')
-                    if img_path_s and os.path.exists(img_path_s):
-                        try:
-                            s_img = Image.open(img_path_s).resize((CELL_WIDTH, CELL_HEIGHT), Image.LANCZOS)
-                            # 明るさ調整をエクスポート時にも適用
-                            brightness_factor = 0.5
-                            enhancer = ImageEnhance.Brightness(s_img)
-                            s_img_brightness_adjusted = enhancer.enhance(brightness_factor)
-                            image.paste(s_img_brightness_adjusted, (x1, y1_cell))
-                        except Exception as e_img:
-                            print(f"エクスポート時画像エラー {img_path_s}: {e_img}")
-                            draw.rectangle([x1, y1_cell, x1 + CELL_WIDTH, y1_cell + CELL_HEIGHT], fill="darkgrey", outline="black")
-                    else:
-                        draw.rectangle([x1, y1_cell, x1 + CELL_WIDTH, y1_cell + CELL_HEIGHT], fill="darkgrey", outline="black")
-                    
-                    # テキスト描画 (ヘルパー関数呼び出し)
-                    self._draw_song_cell_on_image(draw, song, x1, y1_cell, fonts)
-
-            current_y_offset += NEW_SONGS_TABLE_ROWS * CELL_HEIGHT
-
-            # 旧曲描画
-            # --- 修正箇所: 画像への旧曲小計表示を追加 ---
-            old_heading_text = f"旧曲 (Top {MAX_OLD_SONGS_DISPLAY})　小計: {self.old_songs_subtotal_rate:.0f}" if hasattr(self, 'old_songs_subtotal_rate') else f"旧曲 (Top {MAX_OLD_SONGS_DISPLAY})"
-            draw.text((10, current_y_offset + HEADING_AREA_HEIGHT / 2 - fonts['heading'].getbbox("A")[3] / 2),
-                      old_heading_text, font=fonts['heading'], fill="black")
-            # --- 修正箇所ここまで ---
-            current_y_offset += HEADING_AREA_HEIGHT
-            
-            if hasattr(self, 'top_old_songs'):
-                for i, song in enumerate(self.top_old_songs):
-                    row = i // TABLE_COLS
-                    col = i % TABLE_COLS
-                    x1 = col * CELL_WIDTH
-                    y1_cell = current_y_offset + row * CELL_HEIGHT
-                    
-                    # 画像の描画と明るさ調整
-                    img_path_s = song.get('画像パス', '')
-                    if img_path_s and os.path.exists(img_path_s):
-                        try:
-                            s_img = Image.open(img_path_s).resize((CELL_WIDTH, CELL_HEIGHT), Image.LANCZOS)
-                            # 明るさ調整をエクスポート時にも適用
-                            brightness_factor = 0.5
-                            enhancer = ImageEnhance.Brightness(s_img)
-                            s_img_brightness_adjusted = enhancer.enhance(brightness_factor)
-                            image.paste(s_img_brightness_adjusted, (x1, y1_cell))
-                        except Exception as e_img:
-                            print(f"エクスポート時画像エラー {img_path_s}: {e_img}")
-                            draw.rectangle([x1, y1_cell, x1 + CELL_WIDTH, y1_cell + CELL_HEIGHT], fill="darkgrey", outline="black")
-                    else:
-                        draw.rectangle([x1, y1_cell, x1 + CELL_WIDTH, y1_cell + CELL_HEIGHT], fill="darkgrey", outline="black")
-                    
-                    # テキスト描画
-                    self._draw_song_cell_on_image(draw, song, x1, y1_cell, fonts)
-
-            image.save(filepath)
+            with instrumentation.stage('export.total'):
+                # セルは並列に描いてから貼り合わせる (出力は1セルずつ描いた場合と同じ)
+                # 前回のエクスポートから変わっていないセルはキャッシュのタイルを使う
+                with instrumentation.stage('export.render'):
+                    image = render_rating_table(getattr(self, 'top_new_songs', []),
+                                                getattr(self, 'top_old_songs', []),
+                                                getattr(self, 'total_rate', None),
+                                                getattr(self, 'new_songs_subtotal_rate', None),
+                                                getattr(self, 'old_songs_subtotal_rate', None),
+                                                jacket_cache=self.jacket_cache, tile_cache=self.tile_cache)
+                with instrumentation.stage('export.png_encode'):
+                    image.save(filepath)
+                self.jacket_cache.save_hash_index()
+            self._report_instrumentation()
             messagebox.showinfo("エクスポート完了", f"画像を {filepath} に保存しました。")
         except Exception as e:
             messagebox.showerror("エクスポートエラー", f"画像の保存中にエラーが発生しました: {e}")
@@ -662,11 +640,107 @@ class RatingApp:
 
     
     
+    def _report_instrumentation(self):
+        """ 計測が有効なら、キャッシュのヒット率を記録して集計を表示し、トレースファイルを更新する """
+        if not instrumentation.is_enabled():
+            return
+        instrumentation.record_cache_stats('jacket_cache', self.jacket_cache)
+        instrumentation.record_cache_stats('tile_cache', self.tile_cache)
+        print(instrumentation.format_summary())
+        instrumentation.flush()
+
     def fully_automatic_processing(self):
+        """ HTMLの解析からスコアの取り込みまでをバックグラウンドで実行する (画面は固まらない) """
+        if self.automatic_worker is not None and self.automatic_worker.is_alive():
+            return
         print("全自動処理を開始します。")
-        extract_music_data()  # CSVファイルを生成する関数を呼び出す
-        self.automotive_csv()
+        from extract_music_data import EXTRACTED_CSV_FILE_NAME
+        csv_file_path = get_resource_path(EXTRACTED_CSV_FILE_NAME) if SAVE_EXTRACTED_CSV else None
+        self.automatic_queue = queue.Queue()
+        self.automatic_cancel = threading.Event()
+        self._set_automatic_busy(True)
+        self.automatic_worker = threading.Thread(target=self._automatic_worker,
+                                                 args=(csv_file_path, self.automatic_queue, self.automatic_cancel),
+                                                 daemon=True)
+        self.automatic_worker.start()
+        self.master.after(AUTOMATIC_POLL_INTERVAL_MS, self._poll_automatic_queue)
+
+    def cancel_automatic_processing(self):
+        self.automatic_cancel.set()
+        self.progress_label.config(text="中止しています...")
+
+    def _set_automatic_busy(self, busy):
+        # 処理中はスコアを変更するボタンを押せないようにする (エンジンはワーカーだけが触る)
+        state = tk.DISABLED if busy else tk.NORMAL
+        for button in (self.auto_button, self.add_button, self.import_csv_button, self.history_button, self.calculate_button):
+            button.config(state=state)
+        self.cancel_button.config(state=tk.NORMAL if busy else tk.DISABLED)
+
+    def _automatic_worker(self, csv_file_path, progress_queue, cancel_event):
+        """
+        全自動処理のワーカースレッド。Tk には触らず、進捗と結果は progress_queue で画面側に渡す。
+        中止は解析中 (ファイルや読み込みの区切りごと)・CSVの保存前・取り込み前に確認し、
+        取り込みはまとめて1回で行う (途中までの反映は残さない)。
+        """
+        from extract_music_data import ExtractionCancelled, extract_music_data
+
+        def report_parse(fraction, message): # 解析の進み具合を進捗バーの 10〜55 に割り当てる
+            progress_queue.put(('progress', message, 10 + int(fraction * 45)))
+
+        try:
+            with instrumentation.stage('auto.worker'):
+                progress_queue.put(('progress', "HTMLを解析中...", 10))
+                records = extract_music_data(csv_file_path=csv_file_path, cancel_event=cancel_event,
+                                             progress=report_parse)  # 抽出結果をそのまま受け取る
+                if cancel_event.is_set():
+                    raise ExtractionCancelled()
+                progress_queue.put(('progress', f"スコアを取り込み中... ({len(records)} 件)", 60))
+                with instrumentation.stage('auto.apply_scores', records=len(records)):
+                    unmatched, remapped = self._apply_score_records(records)
+            progress_queue.put(('done', records, unmatched, remapped))
+        except ExtractionCancelled:
+            progress_queue.put(('cancelled',))
+        except FileNotFoundError as e:
+            progress_queue.put(('error', "エラー", f"HTMLファイルが見つかりません: {e.filename}"))
+        except Exception as e:
+            progress_queue.put(('error', "全自動処理エラー", f"データ処理エラー: {e}"))
+
+    def _poll_automatic_queue(self):
+        """ ワーカーからの通知を画面に反映する (Tk のメインスレッドで after から呼ばれる) """
+        while True:
+            try:
+                message = self.automatic_queue.get_nowait()
+            except queue.Empty:
+                break
+            kind = message[0]
+            if kind == 'progress':
+                self.progress_label.config(text=message[1])
+                self.progress_bar['value'] = message[2]
+            elif kind == 'done':
+                self._finish_automatic_processing(*message[1:])
+                return
+            else:
+                self._set_automatic_busy(False)
+                self.progress_bar['value'] = 0
+                if kind == 'cancelled':
+                    self.progress_label.config(text="中止しました")
+                else:
+                    self.progress_label.config(text="エラー")
+                    messagebox.showerror(message[1], message[2])
+                return
+        self.master.after(AUTOMATIC_POLL_INTERVAL_MS, self._poll_automatic_queue)
+
+    def _finish_automatic_processing(self, records, unmatched, remapped):
+        self.progress_label.config(text="表示を更新中...")
+        self.progress_bar['value'] = 90
+        self._record_history(records, "全自動処理")
+        self._set_automatic_busy(False)
         self.calculate_and_display_ratings()
+        self.progress_bar['value'] = 100
+        self.progress_label.config(text=f"完了 ({len(records)} 件)")
+        self._report_instrumentation()
+        self._show_unmatched_warning(unmatched, remapped)
+        messagebox.showinfo("インポート完了", f"{len(records)} 件の楽曲データを処理しました。")
     
     
     
@@ -674,9 +748,33 @@ class RatingApp:
 
 
 
+def _report_startup_time(root, imported, initialized, exit_after):
+    """ 起動からウィンドウが表示されるまでの時間を表示する (after_idle から呼ばれる) """
+    root.update_idletasks()
+    shown = time.perf_counter()
+    print(f"起動時間: import {(imported - _STARTUP_BEGIN) * 1000:.1f} ms / "
+          f"初期化 {(initialized - imported) * 1000:.1f} ms / "
+          f"ウィンドウ表示まで {(shown - _STARTUP_BEGIN) * 1000:.1f} ms")
+    if exit_after:
+        root.destroy()
+
+
 if __name__ == '__main__':
+    multiprocessing.freeze_support() # exe化したときにプロセスプールを使うため
+    imported = time.perf_counter()
+    # --trace [保存先] か環境変数 MAIRATE_TRACE で、処理の段階ごとの時間とメモリを計測する (不具合報告用)
+    if '--trace' in sys.argv[1:]:
+        trace_index = sys.argv.index('--trace')
+        trace_arg = sys.argv[trace_index + 1] if trace_index + 1 < len(sys.argv) else ''
+        instrumentation.enable(trace_arg if trace_arg and not trace_arg.startswith('-') else TRACE_FILE_PATH,
+                               trace_memory=instrumentation.memory_tracing_requested())
+    else:
+        instrumentation.enable_from_env(TRACE_FILE_PATH)
     root = tk.Tk()
     app = RatingApp(root)
+    startup_report = os.environ.get(STARTUP_REPORT_ENV)
+    if startup_report:
+        root.after_idle(_report_startup_time, root, imported, time.perf_counter(), startup_report == 'exit')
     root.mainloop()
     
   
\ No newline at end of file
@@ -0,0 +1,194 @@
+import csv
+import hashlib
+import os
+import pickle
+from array import array
+from collections.abc import Mapping
+
+from chart_matcher import ChartMatcher
+
+# コンパイル済みマスタの保存先フォルダ名 (マスタCSVと同じ場所に作る)
+CACHE_DIR_NAME = 'cache'
+# キャッシュの形式を変えたら上げる
+MASTER_CACHE_VERSION = 1
+
+
+def read_master_csv(csv_filepath):
+    """
+    楽曲マスタCSVを読み込み、(曲名, 難易度, STDORDX) をキーとする辞書を返す。
+
+    Args:
+        csv_filepath (str): マスタCSVのパス。
+
+    Returns:
+        dict: キー → {'譜面定数', 'レベル', 'STDORDX_val', '画像ファイル名'} の辞書。
+
+    Raises:
+        FileNotFoundError: CSVファイルが見つからない場合。
+        ValueError: 'STDORDX' 列がない場合。
+
+    """
+    master_data = {}
+    with open(csv_filepath, 'r', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        if 'STDORDX' not in reader.fieldnames: # 共通チェック
+            raise ValueError(f"{csv_filepath} に 'STDORDX' 列がありません。")
+        for row in reader:
+            key = (row['曲名'], row['難易度'], row['STDORDX'])
+            master_data[key] = {
+                '譜面定数': float(row['譜面定数']),
+                'レベル': row['レベル'],
+                'STDORDX_val': row['STDORDX'],
+                '画像ファイル名': row.get('画像ファイル名', '')
+            }
+    return master_data
+
+
+class MasterIndex(Mapping):
+    """
+    列ごとに保持した楽曲マスタ。(曲名, 難易度, STDORDX) をキーとする辞書と同じ形で参照できる。
+    m[key] は read_master_csv の値と同じ辞書を、参照のたびに作って返す。
+    """
+
+    def __init__(self, keys, constants, levels, image_names):
+        self.keys_list = list(keys)
+        self.constants = array('d', constants)
+        self.levels = list(levels)
+        self.image_names = list(image_names)
+        self._rows = {key: i for i, key in enumerate(self.keys_list)}
+        self._matcher = None
+
+    @classmethod
+    def from_dict(cls, master_data):
+        return cls(master_data.keys(),
+                   [info['譜面定数'] for info in master_data.values()],
+                   [info['レベル'] for info in master_data.values()],
+                   [info['画像ファイル名'] for info in master_data.values()])
+
+    @property
+    def matcher(self):
+        """ 表記ゆれに強い検索用の索引 (初めて使うときに1回だけ作り、このマスタを使うエンジンで共有する) """
+        if self._matcher is None:
+            self._matcher = ChartMatcher(self.keys_list)
+        return self._matcher
+
+    def row_of(self, key):
+        """ キーの行番号 (なければ None) """
+        return self._rows.get(key)
+
+    def __getitem__(self, key):
+        i = self._rows[key]
+        return {
+            '譜面定数': self.constants[i],
+            'レベル': self.levels[i],
+            'STDORDX_val': key[2],
+            '画像ファイル名': self.image_names[i],
+        }
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def __iter__(self):
+        return iter(self.keys_list)
+
+    def __len__(self):
+        return len(self.keys_list)
+
+    def to_columns(self):
+        return (self.keys_list, self.constants.tobytes(), self.levels, self.image_names)
+
+    @classmethod
+    def from_columns(cls, columns):
+        keys, constants_bytes, levels, image_names = columns
+        constants = array('d')
+        constants.frombytes(constants_bytes)
+        return cls(keys, constants, levels, image_names)
+
+
+def _file_sha1(filepath):
+    digest = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_master_cache_path(csv_filepath, cache_dir=None):
+    """ マスタCSVに対応するキャッシュファイルのパス (既定はCSVと同じ場所の cache フォルダ) """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(csv_filepath)), CACHE_DIR_NAME)
+    return os.path.join(cache_dir, os.path.basename(csv_filepath) + '.idx')
+
+
+def _read_master_cache(cache_path, stat, csv_filepath):
+    """
+    キャッシュが元のCSVと一致していれば MasterIndex を、使えなければ None を返す。
+    (MasterIndex または None, 確認のために求めたCSVのハッシュ (求めていなければ None)) の形で返す。
+    """
+    sha1 = None
+    try:
+        with open(cache_path, 'rb') as f:
+            header = pickle.load(f)
+            if not isinstance(header, dict) or header.get('version') != MASTER_CACHE_VERSION:
+                return None, None
+            if header['size'] != stat.st_size:
+                return None, None
+            # 更新日時だけ変わった場合は内容が同じかを確かめる
+            if header['mtime_ns'] != stat.st_mtime_ns:
+                sha1 = _file_sha1(csv_filepath)
+                if sha1 != header['sha1']:
+                    return None, sha1
+            return MasterIndex.from_columns(pickle.load(f)), sha1
+    except FileNotFoundError:
+        return None, sha1
+    except Exception as e:
+        print(f"マスタキャッシュを読み込めないため作り直します ({cache_path}): {e}")
+        return None, sha1
+
+
+def _write_master_cache(cache_path, header, master_index):
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(master_index.to_columns(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"マスタキャッシュを保存できませんでした ({cache_path}): {e}")
+
+
+def load_master_index(csv_filepath, cache_dir=None):
+    """
+    楽曲マスタを読み込む。コンパイル済みのキャッシュがあればCSVを解析せずにそれを使い、
+    CSVの更新日時かサイズが変わっていれば内容のハッシュを確認して、変わっていた場合だけ作り直す。
+
+    Args:
+        csv_filepath (str): マスタCSVのパス。
+        cache_dir (str): キャッシュの保存先 (None でCSVと同じ場所の cache フォルダ)。
+
+    Returns:
+        MasterIndex: 楽曲マスタ。
+
+    Raises:
+        FileNotFoundError: CSVファイルが見つからない場合。
+        ValueError: 'STDORDX' 列がない場合。
+
+    """
+    stat = os.stat(csv_filepath)
+    cache_path = get_master_cache_path(csv_filepath, cache_dir)
+
+    master_index, sha1 = _read_master_cache(cache_path, stat, csv_filepath)
+    if master_index is None:
+        master_index = MasterIndex.from_dict(read_master_csv(csv_filepath))
+    elif sha1 is None: # 更新日時もサイズも同じ
+        return master_index
+
+    header = {
+        'version': MASTER_CACHE_VERSION,
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha1': sha1 if sha1 is not None else _file_sha1(csv_filepath), # 確認で求めたハッシュは使い回す
+    }
+    _write_master_cache(cache_path, header, master_index)
+    return master_index
@@ -0,0 +1,200 @@
+import heapq
+
+import instrumentation
+from calculate import calculate_rate, calculate_rates
+from chart_matcher import ChartResolver
+from score_store import SONG_TYPE_CODES, ScoreStore
+
+UNKNOWN_CHART_INFO = {'譜面定数': 0.0, 'レベル': 'N/A', '画像ファイル名': ''}
+
+
+class TopKTracker:
+    """
+    レート値の上位 k 件を最小ヒープで保持し、小計を差分で更新する。
+    スコアは譜面ごとの最高値だけを残すため、各行のレート値は上がる方向にしか変わらない前提。
+    同じレート値どうしは行番号の小さい方 (先に取り込んだ譜面) を上位とする。
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.subtotal = 0
+        self._rates = {}   # 上位に入っている行 → レート値
+        self._heap = []    # (レート値, -行番号) 古くなった要素は取り出すときに捨てる
+
+    def __len__(self):
+        return len(self._rates)
+
+    def __contains__(self, row):
+        return row in self._rates
+
+    def _push(self, row, rate):
+        heapq.heappush(self._heap, (rate, -row))
+        if len(self._heap) > 2 * self.k + 16:
+            self._heap = [(r, -i) for i, r in self._rates.items()]
+            heapq.heapify(self._heap)
+
+    def _min_entry(self):
+        heap = self._heap
+        while heap:
+            rate, neg_row = heap[0]
+            if self._rates.get(-neg_row) == rate:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def offer(self, row, rate):
+        """ 行のレート値を反映し、上位の顔ぶれか小計が変わったら True を返す (O(log k)) """
+        current = self._rates.get(row)
+        if current is not None:
+            if rate <= current:
+                return False
+            self._rates[row] = rate
+            self.subtotal += rate - current
+            self._push(row, rate)
+            return True
+
+        if len(self._rates) < self.k:
+            self._rates[row] = rate
+            self.subtotal += rate
+            self._push(row, rate)
+            return True
+
+        min_rate, min_neg_row = self._min_entry()
+        if (rate, -row) <= (min_rate, min_neg_row):
+            return False
+        heapq.heappop(self._heap)
+        del self._rates[-min_neg_row]
+        self.subtotal -= min_rate
+        self._rates[row] = rate
+        self.subtotal += rate
+        self._push(row, rate)
+        return True
+
+    def clear(self):
+        self.__init__(self.k)
+
+    def rows(self):
+        """ 上位の行番号をレート値の高い順に返す """
+        return sorted(self._rates, key=lambda row: (-self._rates[row], row))
+
+
+class RatingEngine:
+    """
+    譜面ごとの最高スコアを保持し、新曲 Top-K と旧曲 Top-K を差分更新するレーティングエンジン。
+    スコアの追加・更新1件あたり O(log n) で小計と合計が更新される。
+    """
+
+    def __init__(self, new_song_master_data, old_song_master_data, images_dir='', max_new=15, max_old=35):
+        self.new_song_master_data = new_song_master_data
+        self.old_song_master_data = old_song_master_data
+        self.store = ScoreStore(images_dir)
+        self.top_new = TopKTracker(max_new)
+        self.top_old = TopKTracker(max_old)
+        self.version = 0 # 上位の顔ぶれか小計が変わるたびに増える
+        self.resolver = ChartResolver(new_song_master_data, old_song_master_data)
+
+    def resolve_chart(self, song_name, difficulty, std_or_dx):
+        """
+        マスタから譜面を探し、(マスタのキー, 譜面情報, 'new'/'old'/'unknown') を返す。
+        曲名の全角/半角・空白・記号などの表記ゆれは補正し、マスタ側のキーを返す。
+        """
+        master_key, song_type = self.resolver.resolve(song_name, difficulty, std_or_dx)
+        if song_type == 'new':
+            return master_key, self.new_song_master_data[master_key], 'new'
+        if song_type == 'old':
+            return master_key, self.old_song_master_data[master_key], 'old'
+        return master_key, UNKNOWN_CHART_INFO, 'unknown'
+
+    def lookup_chart(self, song_name, difficulty, std_or_dx):
+        """ マスタから譜面情報を探し、(譜面情報, 'new'/'old'/'unknown') を返す """
+        _, chart_info, song_type = self.resolve_chart(song_name, difficulty, std_or_dx)
+        return chart_info, song_type
+
+    def _upsert(self, song_name, difficulty, std_or_dx, score):
+        # 表記ゆれがあってもマスタの表記で保持する (同じ譜面の別表記は1行にまとまる)
+        (song_name, difficulty, std_or_dx), chart_info, song_type = self.resolve_chart(song_name, difficulty, std_or_dx)
+        row, changed = self.store.upsert(song_name, difficulty, std_or_dx, score,
+                                         chart_info['譜面定数'], chart_info['レベル'],
+                                         chart_info.get('画像ファイル名', ''), song_type)
+        return row, changed, song_type
+
+    def _offer(self, row, rate):
+        # スコアが更新された行について呼ぶ。上位に入っている行はレート値が同じでも (達成率の上限など)
+        # 表示するスコアが変わるので、表示内容が変わったものとして扱う
+        self.store.rates[row] = rate
+        song_type = self.store.song_types[row]
+        if song_type == SONG_TYPE_CODES['new']:
+            changed = self.top_new.offer(row, rate) or row in self.top_new
+        elif song_type == SONG_TYPE_CODES['old']:
+            changed = self.top_old.offer(row, rate) or row in self.top_old
+        else:
+            changed = False
+        if changed:
+            self.version += 1
+        return changed
+
+    def add_score(self, song_name, difficulty, std_or_dx, score):
+        """
+        1曲分のスコアを反映する。
+        (song_type, 上位の表示内容が変わったか) を返す。
+        """
+        row, changed, song_type = self._upsert(song_name, difficulty, std_or_dx, score)
+        if not changed:
+            return song_type, False
+        rate = calculate_rate(self.store.constants[row], self.store.scores[row])
+        return song_type, self._offer(row, rate)
+
+    def add_scores(self, records):
+        """
+        楽曲データ ('曲名', '難易度', 'STDORDX', 'スコア') をまとめて反映する。
+        レート値は更新のあった行だけを配列計算で求める。
+        (song_type のリスト, 上位の表示内容が変わったか) を返す。
+        """
+        changed_rows = []
+        song_types = []
+        with instrumentation.stage('engine.lookup'): # マスタの参照と譜面ごとの最高スコアの更新
+            for record in records:
+                row, changed, song_type = self._upsert(record['曲名'], record['難易度'], record['STDORDX'], record['スコア'])
+                song_types.append(song_type)
+                if changed:
+                    changed_rows.append(row)
+        if not changed_rows:
+            return song_types, False
+
+        changed_rows = list(dict.fromkeys(changed_rows))
+        with instrumentation.stage('engine.rating', rows=len(changed_rows)):
+            rates = calculate_rates([self.store.constants[i] for i in changed_rows],
+                                    [self.store.scores[i] for i in changed_rows])
+        top_changed = False
+        with instrumentation.stage('engine.topk'):
+            for row, rate in zip(changed_rows, rates.tolist()):
+                top_changed = self._offer(row, rate) or top_changed
+        return song_types, top_changed
+
+    def clear(self):
+        self.store.clear()
+        self.top_new.clear()
+        self.top_old.clear()
+        self.version += 1
+
+    @property
+    def new_songs_subtotal_rate(self):
+        return self.top_new.subtotal
+
+    @property
+    def old_songs_subtotal_rate(self):
+        return self.top_old.subtotal
+
+    @property
+    def total_rate(self):
+        return self.top_new.subtotal + self.top_old.subtotal
+
+    def top_new_songs(self):
+        """ 新曲の上位曲 (表示用の辞書、レート値の高い順) """
+        with instrumentation.stage('engine.sort', song_type='new'):
+            return [self.store.record(i) for i in self.top_new.rows()]
+
+    def top_old_songs(self):
+        """ 旧曲の上位曲 (表示用の辞書、レート値の高い順) """
+        with instrumentation.stage('engine.sort', song_type='old'):
+            return [self.store.record(i) for i in self.top_old.rows()]
@@ -0,0 +1,179 @@
+import argparse
+import math
+
+import numpy as np
+
+from calculate import RANK_BORDERS, calculate_rates
+from extract_music_data import EXTRACTED_CSV_FILE_NAME, get_external_file_path
+from master_data import load_master_index
+from rating_engine import RatingEngine
+from score_csv import read_score_csv
+
+
+def _min_score_for_border(border):
+    """ 達成率(%)の境界 border に届く最小のスコア (例: 97.0 → 970000) """
+    score = math.ceil(border * 10000)
+    # 浮動小数点の誤差を吸収して、calculate_rate と同じ比較結果になるように調整
+    while score / 10000 < border:
+        score += 1
+    while score > 0 and (score - 1) / 10000 >= border:
+        score -= 1
+    return score
+
+
+# ランク境界ごとの最小スコア (昇順、RANK_BORDERS と同じ並び)
+BORDER_SCORES = np.array([_min_score_for_border(b) for b in RANK_BORDERS], dtype=np.int64)
+
+
+def _song_key(song):
+    return (song['曲名'], song['難易度'], song['STDORDX'])
+
+
+class RatingIndex:
+    """
+    全マスタ譜面について、ランク境界ごとの必要スコアと到達時のレート値を保持する索引。
+
+    threshold_rates[i, j] は譜面 i で BORDER_SCORES[j] を出したときのレート値。
+    """
+
+    def __init__(self, keys, constants, is_new):
+        self.keys = list(keys)
+        self.key_to_row = {key: i for i, key in enumerate(self.keys)}
+        self.constants = np.asarray(constants, dtype=np.float64)
+        self.is_new = np.asarray(is_new, dtype=bool)
+        self.threshold_scores = BORDER_SCORES
+        self.threshold_rates = calculate_rates(self.constants[:, None], BORDER_SCORES[None, :])
+
+    def __len__(self):
+        return len(self.keys)
+
+    def suggest_improvements(self, top_new_songs, top_old_songs, max_new=15, max_old=35,
+                             min_gain=1, limit=20, known_scores=None):
+        """
+        現在の新曲/旧曲の上位リストから、合計レートが min_gain 以上上がる改善候補を返す。
+        譜面ごとに条件を満たす最も低い目標スコアを選び、上昇量の大きい順に並べる。
+
+        Args:
+            top_new_songs (list): 新曲の上位リスト ('曲名', '難易度', 'STDORDX', 'スコア' を持つ辞書)。
+            top_old_songs (list): 旧曲の上位リスト。
+            max_new (int): 新曲枠の数。
+            max_old (int): 旧曲枠の数。
+            min_gain (int): 最低限必要な合計レートの上昇量。
+            limit (int): 返す候補の最大数 (None で全件)。
+            known_scores (dict): 上位リスト外の既知スコア (キー → スコア)。
+
+        Returns:
+            list: 候補の辞書のリスト。
+
+        """
+        current_scores = np.zeros(len(self.keys), dtype=np.int64)
+        in_top = np.zeros(len(self.keys), dtype=bool)
+
+        if known_scores:
+            for key, score in known_scores.items():
+                row = self.key_to_row.get(key)
+                if row is not None:
+                    current_scores[row] = max(current_scores[row], score)
+
+        for song in list(top_new_songs) + list(top_old_songs):
+            row = self.key_to_row.get(_song_key(song))
+            if row is not None:
+                current_scores[row] = max(current_scores[row], song['スコア'])
+                in_top[row] = True
+
+        # 枠が埋まっていれば最下位と入れ替わる、空きがあればそのまま加算される
+        new_floor = min((s['レート値'] for s in top_new_songs), default=0) if len(top_new_songs) >= max_new else 0
+        old_floor = min((s['レート値'] for s in top_old_songs), default=0) if len(top_old_songs) >= max_old else 0
+
+        current_rates = calculate_rates(self.constants, current_scores)
+        baseline = np.where(in_top, current_rates, np.where(self.is_new, new_floor, old_floor))
+
+        gains = self.threshold_rates - baseline[:, None]
+        valid = (self.threshold_scores[None, :] > current_scores[:, None]) & (gains >= min_gain)
+
+        rows = np.flatnonzero(valid.any(axis=1))
+        cols = valid[rows].argmax(axis=1) # 境界は昇順なので最初の True が最も安い目標
+        row_gains = gains[rows, cols]
+        target_scores = self.threshold_scores[cols]
+
+        order = np.lexsort((target_scores - current_scores[rows], -row_gains))
+        if limit is not None:
+            order = order[:limit]
+
+        suggestions = []
+        for i in order.tolist():
+            row, col = rows[i], cols[i]
+            song_name, difficulty, std_or_dx = self.keys[row]
+            suggestions.append({
+                '曲名': song_name,
+                '難易度': difficulty,
+                'STDORDX': std_or_dx,
+                'song_type': 'new' if self.is_new[row] else 'old',
+                '現在スコア': int(current_scores[row]),
+                '目標スコア': int(target_scores[i]),
+                '目標レート': int(self.threshold_rates[row, col]),
+                '上昇量': int(row_gains[i]),
+            })
+        return suggestions
+
+
+def build_rating_index(new_song_master_data, old_song_master_data):
+    """
+    新曲/旧曲マスタから RatingIndex を作成する。
+    両方にある譜面は新曲として扱う (_add_song_to_list と同じ優先順位)。
+    """
+    keys, constants, is_new = [], [], []
+    for key, chart_info in new_song_master_data.items():
+        keys.append(key)
+        constants.append(chart_info['譜面定数'])
+        is_new.append(True)
+    for key, chart_info in old_song_master_data.items():
+        if key in new_song_master_data:
+            continue
+        keys.append(key)
+        constants.append(chart_info['譜面定数'])
+        is_new.append(False)
+    return RatingIndex(keys, constants, is_new)
+
+
+def suggest_for_engine(index, engine, min_gain=1, limit=20):
+    """ RatingEngine に取り込み済みのスコアから改善候補を求める (上位外の譜面のスコアも考慮する) """
+    store = engine.store
+    known_scores = {store.keys[i]: store.scores[i] for i in range(len(store))}
+    return index.suggest_improvements(engine.top_new_songs(), engine.top_old_songs(), engine.top_new.k, engine.top_old.k,
+                                      min_gain=min_gain, limit=limit, known_scores=known_scores)
+
+
+def format_suggestions(suggestions):
+    """ 改善候補を人が読める形の文字列にする """
+    if not suggestions:
+        return "合計レートが上がる候補はありません。"
+    lines = []
+    for suggestion in suggestions:
+        song_type = '新曲' if suggestion['song_type'] == 'new' else '旧曲'
+        lines.append(f"+{suggestion['上昇量']:>3}  {suggestion['曲名']} ({suggestion['難易度']} / {suggestion['STDORDX']}, {song_type}): "
+                     f"{suggestion['現在スコア']} → {suggestion['目標スコア']} (レート {suggestion['目標レート']})")
+    return '\n'.join(lines)
+
+
+def _main():
+    parser = argparse.ArgumentParser(description="スコアCSVから、合計レートが上がる目標スコアを上昇量の大きい順に表示する")
+    parser.add_argument('scores_csv', nargs='?', default=get_external_file_path(EXTRACTED_CSV_FILE_NAME),
+                        help="スコアCSV (既定は抽出結果の extracted_music_data.csv)")
+    parser.add_argument('--new-master', default=get_external_file_path('new_song_master.csv'), help="新曲マスタCSVのパス")
+    parser.add_argument('--old-master', default=get_external_file_path('old_song_master.csv'), help="旧曲マスタCSVのパス")
+    parser.add_argument('--min-gain', type=int, default=1, help="表示する候補の合計レートの上昇量の下限")
+    parser.add_argument('--limit', type=int, default=20, help="表示する候補の数")
+    args = parser.parse_args()
+
+    new_song_master_data = load_master_index(args.new_master)
+    old_song_master_data = load_master_index(args.old_master)
+    engine = RatingEngine(new_song_master_data, old_song_master_data)
+    engine.add_scores(read_score_csv(args.scores_csv))
+    index = build_rating_index(new_song_master_data, old_song_master_data)
+    print(f"現在の合計レート: {engine.total_rate} (新曲 {engine.new_songs_subtotal_rate} / 旧曲 {engine.old_songs_subtotal_rate})")
+    print(format_suggestions(suggest_for_engine(index, engine, args.min_gain, args.limit)))
+
+
+if __name__ == '__main__':
+    _main()
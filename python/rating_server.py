@@ -0,0 +1,357 @@
+import argparse
+import base64
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import instrumentation
+from extract_music_data import get_external_file_path, parse_song_blocks_stream
+from jacket_cache import JACKET_CACHE_DIR_NAME, JacketCache
+from master_data import load_master_index
+from rating_engine import RatingEngine
+from score_csv import REQUIRED_HEADERS, parse_score_csv
+from table_render import JP_FONT_PATH, MAX_NEW_SONGS_DISPLAY, MAX_OLD_SONGS_DISPLAY, RenderTemplate, render_rating_table
+from tile_cache import TILE_CACHE_DIR_NAME, TILE_FIELDS, TileCache
+
+# 既定 (いずれもexeと同じ場所)
+NEW_SONG_MASTER_CSV_FILE_NAME = 'new_song_master.csv'
+OLD_SONG_MASTER_CSV_FILE_NAME = 'old_song_master.csv'
+IMAGES_DIR_NAME = 'ジャケット'
+
+DEFAULT_HOST = '127.0.0.1' # 既定ではこのPCからの接続だけを受け付ける
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_QUEUE_SIZE = 16 # ワーカーが埋まっているときに待たせておく接続の数 (超えたら 503 を返す)
+MAX_REQUEST_BYTES = 32 * 1024 * 1024 # 受け付けるHTMLダンプ・CSVの大きさの上限
+REQUEST_TIMEOUT_SEC = 30 # 送信の遅い接続がワーカーを占有し続けないようにする
+
+# 応答のPNGの圧縮レベル (既定の 6 の約半分の時間で済み、サイズは1割弱大きくなる程度)
+PNG_COMPRESS_LEVEL = 1
+PNG_CACHE_ENTRIES = 32 # 表示内容ごとにエンコード済みのPNGを覚えておく数 (オーバーレイは同じ内容を繰り返し取得するため)
+
+INPUT_TYPES = ('html', 'csv')
+OUTPUT_FORMATS = ('json', 'png', 'both')
+
+
+def detect_input_type(text, content_type=''):
+    """ アップロードされた内容が HTMLダンプ ('html') かスコアCSV ('csv') か (Content-Type、なければ1行目で判定する) """
+    content_type = content_type.split(';')[0].strip().lower()
+    if content_type in ('text/csv', 'application/csv'):
+        return 'csv'
+    if content_type == 'text/html':
+        return 'html'
+    first_line = text.lstrip()[:1024].split('\n', 1)[0]
+    if not first_line.startswith('<') and all(header in first_line for header in REQUIRED_HEADERS):
+        return 'csv'
+    return 'html'
+
+
+def _song_summary(song):
+    """ 応答用の1曲分の辞書 (サーバー内のパスは返さず、ジャケットはファイル名だけにする) """
+    summary = {key: value for key, value in song.items() if key != '画像パス'}
+    summary['画像ファイル名'] = os.path.basename(song['画像パス']) if song.get('画像パス') else ''
+    return summary
+
+
+class RatingService:
+    """
+    レーティングの計算と表の画像の作成を、読み込み済みの状態を使い回して行う。
+    マスタ (と表記ゆれ用の索引)・ジャケットとセルのキャッシュはすべてのリクエストで共有し、
+    フォントを持つ RenderTemplate はワーカースレッドごとに1つ作る (FreeTypeFont はスレッド間で共有できないため)。
+    """
+
+    def __init__(self, new_master_path, old_master_path, images_dir, cache_root, font_path=JP_FONT_PATH):
+        self.new_master = load_master_index(new_master_path)
+        self.old_master = load_master_index(old_master_path)
+        self.images_dir = images_dir
+        self.font_path = font_path
+        self.jacket_cache = JacketCache(os.path.join(cache_root, JACKET_CACHE_DIR_NAME))
+        self.tile_cache = TileCache(cache_dir=os.path.join(cache_root, TILE_CACHE_DIR_NAME))
+        self.started = time.time()
+        self.requests = 0
+        self._png_cache = OrderedDict() # 表示内容 → PNGのバイト列
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def template(self):
+        """ 呼び出したスレッド用の RenderTemplate (初めて使うときに作る) """
+        template = getattr(self._local, 'template', None)
+        if template is None:
+            template = self._local.template = RenderTemplate(self.font_path)
+        return template
+
+    def warm_up(self):
+        """ 表記ゆれ用の索引を作り、空の表を1回描いておく (最初のリクエストで待たせないため) """
+        self.new_master.matcher
+        self.old_master.matcher
+        render_rating_table([], [], template=self.template(), max_workers=1)
+
+    def parse(self, text, input_type):
+        """
+        HTMLダンプかスコアCSVの文字列から楽曲データを読み取る。
+
+        Raises:
+            ValueError: 入力の種類が不正な場合や、CSVに必須のヘッダーが足りない場合。
+
+        """
+        if input_type == 'csv':
+            return parse_score_csv(io.StringIO(text))
+        if input_type == 'html':
+            return parse_song_blocks_stream(text)
+        raise ValueError(f"入力の種類は {', '.join(INPUT_TYPES)} のいずれかにしてください: {input_type}")
+
+    def rate(self, records):
+        """ 楽曲データからレーティングを計算したエンジンと、マスタにない譜面の数を返す """
+        engine = RatingEngine(self.new_master, self.old_master, self.images_dir,
+                              MAX_NEW_SONGS_DISPLAY, MAX_OLD_SONGS_DISPLAY)
+        song_types, _ = engine.add_scores(records)
+        return engine, song_types.count('unknown')
+
+    def _jacket_identity(self, song):
+        try:
+            return self.jacket_cache.source_hash(song['画像パス']) if song.get('画像パス') else None
+        except OSError:
+            return None
+
+    def _png_key(self, engine, top_new_songs, top_old_songs):
+        """ 表の画像の内容を決める値 (表示する値・ジャケットの内容・小計と合計) """
+        songs = tuple((tuple(song[field] for field in TILE_FIELDS), self._jacket_identity(song))
+                      for song in top_new_songs + top_old_songs)
+        return (len(top_new_songs), songs, engine.total_rate, engine.new_songs_subtotal_rate, engine.old_songs_subtotal_rate)
+
+    def render_png(self, engine):
+        """ レーティング表の画像をPNGのバイト列にする (前に同じ内容の表を作っていればそれを返す) """
+        top_new_songs, top_old_songs = engine.top_new_songs(), engine.top_old_songs()
+        key = self._png_key(engine, top_new_songs, top_old_songs)
+        with self._lock:
+            png = self._png_cache.get(key)
+            if png is not None:
+                self._png_cache.move_to_end(key)
+                return png
+
+        # リクエスト自体がワーカースレッドで並列に処理されるので、セルの描画はこのスレッドだけで行う
+        with instrumentation.stage('server.render'):
+            image = render_rating_table(top_new_songs, top_old_songs, engine.total_rate,
+                                        engine.new_songs_subtotal_rate, engine.old_songs_subtotal_rate,
+                                        template=self.template(), jacket_cache=self.jacket_cache, max_workers=1,
+                                        tile_cache=self.tile_cache)
+        with instrumentation.stage('server.png_encode'):
+            buffer = io.BytesIO()
+            image.save(buffer, format='PNG', compress_level=PNG_COMPRESS_LEVEL)
+        png = buffer.getvalue()
+        self.jacket_cache.save_hash_index()
+        with self._lock:
+            self._png_cache[key] = png
+            while len(self._png_cache) > PNG_CACHE_ENTRIES:
+                self._png_cache.popitem(last=False)
+        return png
+
+    def handle(self, text, input_type, output_format):
+        """
+        1件のリクエストを処理する。
+
+        Args:
+            text (str): HTMLダンプかスコアCSVの内容。
+            input_type (str): 'html' か 'csv'。
+            output_format (str): 'json' (レーティング)、'png' (表の画像)、'both' (JSONにPNGをBase64で含める)。
+
+        Returns:
+            tuple: (Content-Type, 応答の本文のバイト列)。
+
+        Raises:
+            ValueError: 入力が不正な場合。
+
+        """
+        start = time.perf_counter()
+        with instrumentation.stage('server.request', input=input_type, output=output_format):
+            with instrumentation.stage('server.parse', input=input_type):
+                records = self.parse(text, input_type)
+            engine, unknown_count = self.rate(records)
+            png = self.render_png(engine) if output_format in ('png', 'both') else None
+        with self._lock:
+            self.requests += 1
+        if output_format == 'png':
+            return 'image/png', png
+
+        result = {
+            '総合計レート': engine.total_rate,
+            '新曲小計': engine.new_songs_subtotal_rate,
+            '旧曲小計': engine.old_songs_subtotal_rate,
+            '件数': len(records),
+            '未登録譜面数': unknown_count,
+            '新曲': [_song_summary(song) for song in engine.top_new_songs()],
+            '旧曲': [_song_summary(song) for song in engine.top_old_songs()],
+            '処理時間(ms)': round((time.perf_counter() - start) * 1000, 1),
+        }
+        if png is not None:
+            result['png'] = base64.b64encode(png).decode('ascii')
+        return 'application/json; charset=utf-8', json.dumps(result, ensure_ascii=False).encode('utf-8')
+
+    def status(self):
+        """ /health で返す状態 """
+        instrumentation.record_cache_stats('jacket_cache', self.jacket_cache)
+        instrumentation.record_cache_stats('tile_cache', self.tile_cache)
+        return {
+            'status': 'ok',
+            '新曲マスタ': len(self.new_master),
+            '旧曲マスタ': len(self.old_master),
+            '処理したリクエスト': self.requests,
+            '起動からの秒数': round(time.time() - self.started, 1),
+            'ジャケットキャッシュ': {'hits': self.jacket_cache.hits, 'misses': self.jacket_cache.misses},
+            'セルキャッシュ': {'hits': self.tile_cache.hits, 'misses': self.tile_cache.misses, 'entries': len(self.tile_cache)},
+        }
+
+
+class RatingRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET /health: 状態を返す。
+    POST /rate?format=json|png|both&input=html|csv: 本文のHTMLダンプかスコアCSVからレーティングを返す
+    (input を省略すると Content-Type か内容から判定する)。
+    """
+
+    server_version = 'mairate-rating-server/1'
+    timeout = REQUEST_TIMEOUT_SEC
+
+    def do_GET(self):
+        if urlsplit(self.path).path == '/health':
+            self._send_json(200, self.server.service.status())
+        else:
+            self._send_error(404, "見つかりません。GET /health か POST /rate を使ってください。")
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/rate':
+            self._send_error(404, "見つかりません。POST /rate を使ってください。")
+            return
+        params = parse_qs(url.query)
+        output_format = params.get('format', ['json'])[0]
+        if output_format not in OUTPUT_FORMATS:
+            self._send_error(400, f"format は {', '.join(OUTPUT_FORMATS)} のいずれかにしてください。")
+            return
+        try:
+            length = int(self.headers['Content-Length'])
+        except (TypeError, ValueError):
+            self._send_error(411, "Content-Length が必要です。")
+            return
+        if length < 0: # rfile.read(-1) は上限なしで最後まで読んでしまう
+            self._send_error(400, "Content-Length が不正です。")
+            return
+        if length > MAX_REQUEST_BYTES:
+            self._send_error(413, f"本文が大きすぎます (上限 {MAX_REQUEST_BYTES // (1024 * 1024)} MB)。")
+            return
+        data = self.rfile.read(length)
+        if len(data) < length: # 送信の途中で切断された
+            self.close_connection = True
+            return
+        try:
+            text = data.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            self._send_error(400, "本文は UTF-8 で送ってください。")
+            return
+        input_type = params.get('input', [None])[0] or detect_input_type(text, self.headers.get('Content-Type', ''))
+
+        try:
+            content_type, body = self.server.service.handle(text, input_type, output_format)
+        except ValueError as e:
+            self._send_error(400, str(e))
+            return
+        except Exception as e:
+            print(f"リクエストの処理中にエラーが発生しました: {e}")
+            self._send_error(500, "サーバー内部でエラーが発生しました。")
+            return
+        self._send(200, content_type, body)
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, data):
+        self._send(status, 'application/json; charset=utf-8', json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+    def _send_error(self, status, message):
+        self._send_json(status, {'error': message})
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    接続を決まった数のワーカースレッドで処理する HTTPServer
+    (ThreadingHTTPServer は接続ごとにスレッドを作るため、混雑時に際限なくスレッドが増える)。
+    処理中と待機中の接続が workers + queue_size を超えたら、新しい接続にはすぐ 503 を返す。
+    """
+
+    def __init__(self, server_address, handler_class, service, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+        super().__init__(server_address, handler_class)
+        self.service = service
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rating_server')
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            self._reject(request)
+            return
+        self._executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except ConnectionError:
+            pass # クライアントが応答を待たずに切断した
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def _reject(self, request):
+        body = json.dumps({'error': "混雑しています。しばらくしてから再度お試しください。"}, ensure_ascii=False).encode('utf-8')
+        try:
+            request.sendall(b"HTTP/1.0 503 Service Unavailable\r\nContent-Type: application/json; charset=utf-8\r\n"
+                            b"Retry-After: 1\r\nContent-Length: " + str(len(body)).encode('ascii') + b"\r\n\r\n" + body)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=True)
+
+
+def _main():
+    parser = argparse.ArgumentParser(description="HTMLダンプかスコアCSVを受け取り、レーティング (JSON) と表の画像 (PNG) を返すローカルのHTTPサーバー")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="待ち受けるアドレス")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="待ち受けるポート")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="同時に処理するリクエストの数")
+    parser.add_argument('--queue', type=int, default=DEFAULT_QUEUE_SIZE, help="待たせておく接続の数 (超えたら 503 を返す)")
+    parser.add_argument('--new-master', default=get_external_file_path(NEW_SONG_MASTER_CSV_FILE_NAME), help="新曲マスタCSVのパス")
+    parser.add_argument('--old-master', default=get_external_file_path(OLD_SONG_MASTER_CSV_FILE_NAME), help="旧曲マスタCSVのパス")
+    parser.add_argument('--images-dir', default=get_external_file_path(IMAGES_DIR_NAME), help="ジャケット画像のフォルダ")
+    parser.add_argument('--cache-root', default=get_external_file_path(''), help="ジャケットとセルのキャッシュを置く cache フォルダの親")
+    args = parser.parse_args()
+
+    instrumentation.enable_from_env(get_external_file_path(instrumentation.DEFAULT_TRACE_FILE_NAME))
+    start = time.perf_counter()
+    service = RatingService(args.new_master, args.old_master, args.images_dir, args.cache_root)
+    service.warm_up()
+    server = PooledHTTPServer((args.host, args.port), RatingRequestHandler, service, args.workers, args.queue)
+    print(f"http://{args.host}:{server.server_address[1]}/ で待ち受けています "
+          f"(準備 {(time.perf_counter() - start) * 1000:.0f} ms、ワーカー {args.workers}、Ctrl+C で終了)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("サーバーを終了しました。")
+    finally:
+        server.server_close()
+        instrumentation.flush()
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,55 @@
+import csv
+
+import instrumentation
+
+REQUIRED_HEADERS = ['曲名', '難易度', 'STDORDX', 'スコア']
+
+
+def read_score_csv(filepath):
+    """
+    スコアCSV (曲名,難易度,STDORDX,スコア) を読み込み、楽曲データの辞書のリストを返す。
+    STDORDX が STD/DX 以外の行やスコアが数値でない行は警告を出して読み飛ばす。
+
+    Raises:
+        FileNotFoundError: ファイルが見つからない場合。
+        ValueError: 必須のヘッダーが足りない場合。
+
+    """
+    with open(filepath, 'r', encoding='utf-8-sig') as f, instrumentation.stage('csv.read'):
+        return parse_score_csv(f)
+
+
+def parse_score_csv(f):
+    """
+    テキストモードで開いたファイル (io.StringIO なども可) からスコアCSVを読み込む。read_score_csv と同じ行を返す。
+
+    Raises:
+        ValueError: 必須のヘッダーが足りない場合。
+
+    """
+    records = []
+    reader = csv.DictReader(f)
+    if not reader.fieldnames or not all(header in reader.fieldnames for header in REQUIRED_HEADERS):
+        raise ValueError(f"CSVファイルには '{', '.join(REQUIRED_HEADERS)}' のヘッダーが必要です。")
+    for row in reader:
+        try:
+            song_name = row['曲名']
+            difficulty = row['難易度']
+            std_or_dx = row['STDORDX'].upper()
+            score = int(row['スコア'])
+            if std_or_dx not in ["STD", "DX"]:
+                print(f"警告: STDORDXの値が不正な行 (STD/DX以外): {row}")
+                continue
+            records.append({'曲名': song_name, '難易度': difficulty, 'STDORDX': std_or_dx, 'スコア': score})
+        except ValueError: print(f"警告: スコア形式不正: {row}")
+        except KeyError as e: print(f"警告: CSV必須列不足 ({e}): {row}")
+        except (TypeError, AttributeError): print(f"警告: CSV必須列不足: {row}")
+    return records
+
+
+def write_score_csv(filepath, records):
+    """ 楽曲データの辞書のリストをスコアCSVとして保存する """
+    with open(filepath, 'w', encoding='utf-8-sig', newline='') as f, instrumentation.stage('csv.write', rows=len(records)):
+        writer = csv.DictWriter(f, fieldnames=REQUIRED_HEADERS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(records)
@@ -0,0 +1,210 @@
+import argparse
+
+import numpy as np
+
+from calculate import calculate_rates
+from chart_matcher import ChartResolver
+from extract_music_data import get_external_file_path
+from master_data import load_master_index
+from score_csv import read_score_csv
+
+NEW_SONG_MASTER_CSV_FILE_NAME = 'new_song_master.csv'
+OLD_SONG_MASTER_CSV_FILE_NAME = 'old_song_master.csv'
+
+_SONG_TYPE_NAMES = ('unknown', 'new', 'old')
+
+
+def _best_scores(records, resolver):
+    """ 譜面キー (表記ゆれはマスタの表記に補正する) → (最高スコア, 最初に現れた位置) の辞書 """
+    best = {}
+    for position, record in enumerate(records):
+        key, _ = resolver.resolve(record['曲名'], record['難易度'], record['STDORDX'])
+        current = best.get(key)
+        if current is None:
+            best[key] = (record['スコア'], position)
+        elif record['スコア'] > current[0]:
+            best[key] = (record['スコア'], current[1])
+    return best
+
+
+def _merge_join(before, after):
+    """
+    2つのスコア集合を譜面キー順に突き合わせる。
+    (キー, 変更前スコア, 変更前の位置, 変更後スコア, 変更後の位置) を返す。ない側のスコアと位置は -1。
+    """
+    before_keys = sorted(before)
+    after_keys = sorted(after)
+    joined = []
+    i = j = 0
+    while i < len(before_keys) or j < len(after_keys):
+        if j >= len(after_keys) or (i < len(before_keys) and before_keys[i] < after_keys[j]):
+            key = before_keys[i]
+            joined.append((key,) + before[key] + (-1, -1))
+            i += 1
+        elif i >= len(before_keys) or after_keys[j] < before_keys[i]:
+            key = after_keys[j]
+            joined.append((key, -1, -1) + after[key])
+            j += 1
+        else:
+            key = before_keys[i]
+            joined.append((key,) + before[key] + after[key])
+            i += 1
+            j += 1
+    return joined
+
+
+def _top_rows(present, song_types, song_type, rates, positions, k):
+    """ 指定した種類の譜面をレート値の高い順 (同値は取り込み順) に k 件選ぶ """
+    rows = np.flatnonzero(present & (song_types == song_type))
+    order = np.lexsort((positions[rows], -rates[rows]))[:k]
+    return rows[order]
+
+
+class ScoreDiff:
+    """
+    2つのスコア集合の比較結果。
+
+    chart_changes はスコアが変わった譜面ごとの辞書
+    ('曲名', '難易度', 'STDORDX', 'song_type', '変更前スコア', '変更後スコア', '変更前レート', '変更後レート', 'レート差') のリスト。
+    変更前後のどちらかにない譜面のスコアは None、レート値は 0 とする。
+    entered / left は 'new' / 'old' ごとに上位に入った / 外れた譜面の同じ形の辞書のリスト。
+    """
+
+    def __init__(self, chart_changes, entered, left, subtotals_before, subtotals_after):
+        self.chart_changes = chart_changes
+        self.entered = entered
+        self.left = left
+        self.subtotals_before = subtotals_before
+        self.subtotals_after = subtotals_after
+
+    @property
+    def total_before(self):
+        return sum(self.subtotals_before.values())
+
+    @property
+    def total_after(self):
+        return sum(self.subtotals_after.values())
+
+    @property
+    def total_delta(self):
+        return self.total_after - self.total_before
+
+    def subtotal_delta(self, song_type):
+        return self.subtotals_after[song_type] - self.subtotals_before[song_type]
+
+    def format_report(self):
+        """ 比較結果を人が読める形の文字列にする """
+        lines = [f"合計レート: {self.total_before} → {self.total_after} ({self.total_delta:+d})"]
+        for song_type, label in (('new', '新曲'), ('old', '旧曲')):
+            lines.append(f"{label}小計: {self.subtotals_before[song_type]} → {self.subtotals_after[song_type]} "
+                         f"({self.subtotal_delta(song_type):+d})")
+            for change in self.entered[song_type]:
+                lines.append(f"  IN  {_format_chart(change)} ({change['変更後レート']})")
+            for change in self.left[song_type]:
+                lines.append(f"  OUT {_format_chart(change)} ({change['変更前レート']})")
+        lines.append(f"スコアが変わった譜面: {len(self.chart_changes)} 件")
+        for change in sorted(self.chart_changes, key=lambda c: -c['レート差']):
+            before = '-' if change['変更前スコア'] is None else change['変更前スコア']
+            after = '-' if change['変更後スコア'] is None else change['変更後スコア']
+            lines.append(f"  {_format_chart(change)}: {before} → {after} (レート {change['レート差']:+d})")
+        return '\n'.join(lines)
+
+
+def _format_chart(change):
+    return f"{change['曲名']} ({change['難易度']} / {change['STDORDX']})"
+
+
+def diff_score_sets(before_records, after_records, new_song_master_data, old_song_master_data,
+                    max_new=15, max_old=35):
+    """
+    2つのスコア集合を譜面 (曲名, 難易度, STDORDX) ごとに突き合わせ、レートの差分を求める。
+    曲名の表記ゆれはマスタの表記に補正し、同じ譜面が複数あれば最高スコアを使う。レート値は変更前の全譜面を1回の配列計算で求め、
+    変更後はスコアが変わった譜面だけを計算し直す。
+
+    Args:
+        before_records (iterable): 変更前の楽曲データ ('曲名', '難易度', 'STDORDX', 'スコア')。
+        after_records (iterable): 変更後の楽曲データ。
+        new_song_master_data (Mapping): 新曲マスタ。
+        old_song_master_data (Mapping): 旧曲マスタ。
+        max_new (int): 新曲枠の数。
+        max_old (int): 旧曲枠の数。
+
+    Returns:
+        ScoreDiff: 比較結果。
+
+    """
+    resolver = ChartResolver(new_song_master_data, old_song_master_data)
+    joined = _merge_join(_best_scores(before_records, resolver), _best_scores(after_records, resolver))
+    n = len(joined)
+    constants = np.zeros(n, dtype=np.float64)
+    song_types = np.zeros(n, dtype=np.int8)
+    for i, (key, *_) in enumerate(joined):
+        if key in new_song_master_data: # 新曲マスタを優先
+            constants[i] = new_song_master_data[key]['譜面定数']
+            song_types[i] = 1
+        elif key in old_song_master_data:
+            constants[i] = old_song_master_data[key]['譜面定数']
+            song_types[i] = 2
+    columns = np.array([row[1:] for row in joined], dtype=np.int64).reshape(n, 4)
+    before_scores, before_positions, after_scores, after_positions = columns.T
+    before_present = before_scores >= 0
+    after_present = after_scores >= 0
+
+    before_rates = np.zeros(n, dtype=np.int64)
+    before_rates[before_present] = calculate_rates(constants[before_present], before_scores[before_present])
+    changed = np.flatnonzero(before_scores != after_scores)
+    after_rates = before_rates.copy()
+    after_rates[changed] = 0
+    changed_after = changed[after_present[changed]]
+    after_rates[changed_after] = calculate_rates(constants[changed_after], after_scores[changed_after])
+
+    def chart_record(i):
+        song_name, difficulty, std_or_dx = joined[i][0]
+        return {
+            '曲名': song_name,
+            '難易度': difficulty,
+            'STDORDX': std_or_dx,
+            'song_type': _SONG_TYPE_NAMES[song_types[i]],
+            '変更前スコア': int(before_scores[i]) if before_present[i] else None,
+            '変更後スコア': int(after_scores[i]) if after_present[i] else None,
+            '変更前レート': int(before_rates[i]),
+            '変更後レート': int(after_rates[i]),
+            'レート差': int(after_rates[i] - before_rates[i]),
+        }
+
+    entered, left, subtotals_before, subtotals_after = {}, {}, {}, {}
+    for song_type, code, k in (('new', 1, max_new), ('old', 2, max_old)):
+        top_before = _top_rows(before_present, song_types, code, before_rates, before_positions, k)
+        top_after = _top_rows(after_present, song_types, code, after_rates, after_positions, k)
+        subtotals_before[song_type] = int(before_rates[top_before].sum())
+        subtotals_after[song_type] = int(after_rates[top_after].sum())
+        before_set = set(top_before.tolist())
+        after_set = set(top_after.tolist())
+        entered[song_type] = [chart_record(i) for i in top_after.tolist() if i not in before_set]
+        left[song_type] = [chart_record(i) for i in top_before.tolist() if i not in after_set]
+
+    return ScoreDiff([chart_record(i) for i in changed.tolist()], entered, left, subtotals_before, subtotals_after)
+
+
+def diff_score_csvs(before_filepath, after_filepath, new_song_master_data, old_song_master_data,
+                    max_new=15, max_old=35):
+    """ 2つのスコアCSVを比較する (diff_score_sets のCSV版) """
+    return diff_score_sets(read_score_csv(before_filepath), read_score_csv(after_filepath),
+                           new_song_master_data, old_song_master_data, max_new, max_old)
+
+
+def _main():
+    parser = argparse.ArgumentParser(description="2つのスコアCSVのレート差分を表示する")
+    parser.add_argument('before_csv', help="変更前のスコアCSV")
+    parser.add_argument('after_csv', help="変更後のスコアCSV")
+    parser.add_argument('--new-master', default=get_external_file_path(NEW_SONG_MASTER_CSV_FILE_NAME), help="新曲マスタCSVのパス")
+    parser.add_argument('--old-master', default=get_external_file_path(OLD_SONG_MASTER_CSV_FILE_NAME), help="旧曲マスタCSVのパス")
+    args = parser.parse_args()
+
+    result = diff_score_csvs(args.before_csv, args.after_csv,
+                             load_master_index(args.new_master), load_master_index(args.old_master))
+    print(result.format_report())
+
+
+if __name__ == '__main__':
+    _main()
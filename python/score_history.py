@@ -0,0 +1,195 @@
+import argparse
+import csv
+import datetime
+import os
+import sqlite3
+import sys
+
+from score_csv import REQUIRED_HEADERS, read_score_csv
+
+HISTORY_DB_FILE_NAME = 'score_history.sqlite3'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    taken_at TEXT NOT NULL,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS score_events (
+    song_name TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    std_or_dx TEXT NOT NULL,
+    taken_at TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id)
+);
+CREATE INDEX IF NOT EXISTS idx_score_events_chart
+    ON score_events (song_name, difficulty, std_or_dx, taken_at, score);
+CREATE TABLE IF NOT EXISTS latest_scores (
+    song_name TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    std_or_dx TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    snapshot_id INTEGER NOT NULL,
+    PRIMARY KEY (song_name, difficulty, std_or_dx)
+) WITHOUT ROWID;
+"""
+
+
+def _to_timestamp(value, end_of_day=False):
+    """
+    記録日時を 'YYYY-MM-DDTHH:MM:SS' の文字列にする (保存と比較の両方で同じ形にそろえ、文字列の比較で前後を比べられるようにする)。
+    日付だけの値 (date や '2025-06-08') はその日の始まり、end_of_day=True ならその日の終わりとみなす。
+    タイムゾーン付きの値はローカル時刻に直す。
+
+    Raises:
+        ValueError: ISO形式として読めない文字列の場合。
+
+    """
+    if value is None:
+        value = datetime.datetime.now()
+    if isinstance(value, (int, float)):
+        value = datetime.datetime.fromtimestamp(value)
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            value = datetime.date.fromisoformat(text) # 日付だけの文字列
+        except ValueError:
+            value = datetime.datetime.fromisoformat(text) # 区切りが 'T' でも ' ' でも同じ日時になる
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time.max if end_of_day else datetime.time.min)
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.isoformat(timespec='seconds')
+
+
+def _rows_to_records(rows):
+    return [{'曲名': song_name, '難易度': difficulty, 'STDORDX': std_or_dx, 'スコア': score}
+            for song_name, difficulty, std_or_dx, score in rows]
+
+
+class ScoreHistory:
+    """
+    スコアの履歴をSQLiteに保存するストア。
+    取り込みごとにスナップショットを1件記録し、前回からスコアが変わった譜面だけを書き込む。
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def import_records(self, records, source=None, taken_at=None):
+        """
+        楽曲データ ('曲名', '難易度', 'STDORDX', 'スコア') をスナップショットとして記録する。
+        同じ譜面が複数あれば最高スコアを使う。
+
+        Args:
+            records (iterable): 楽曲データの辞書。
+            source (str): 取り込み元 (ファイル名など)。
+            taken_at: 記録日時 (datetime / ISO形式の文字列 / UNIX時刻、None で現在時刻)。
+
+        Returns:
+            tuple: (スナップショットID, スコアが変わった譜面の数)。
+
+        """
+        best = {}
+        for record in records:
+            key = (record['曲名'], record['難易度'], record['STDORDX'])
+            if key not in best or record['スコア'] > best[key]:
+                best[key] = record['スコア']
+        taken_at = _to_timestamp(taken_at)
+
+        with self.conn:
+            snapshot_id = self.conn.execute(
+                "INSERT INTO snapshots (taken_at, source) VALUES (?, ?)", (taken_at, source)).lastrowid
+            self.conn.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS incoming (
+                    song_name TEXT, difficulty TEXT, std_or_dx TEXT, score INTEGER,
+                    PRIMARY KEY (song_name, difficulty, std_or_dx)
+                ) WITHOUT ROWID""")
+            self.conn.execute("DELETE FROM incoming")
+            self.conn.executemany("INSERT INTO incoming VALUES (?, ?, ?, ?)",
+                                  [key + (score,) for key, score in best.items()])
+            # 前回から変わった行だけを履歴に追加
+            changed = self.conn.execute("""
+                INSERT INTO score_events (song_name, difficulty, std_or_dx, taken_at, score, snapshot_id)
+                SELECT i.song_name, i.difficulty, i.std_or_dx, ?, i.score, ?
+                FROM incoming AS i
+                LEFT JOIN latest_scores AS l
+                    ON l.song_name = i.song_name AND l.difficulty = i.difficulty AND l.std_or_dx = i.std_or_dx
+                WHERE l.score IS NULL OR l.score != i.score""", (taken_at, snapshot_id)).rowcount
+            self.conn.execute("""
+                INSERT INTO latest_scores (song_name, difficulty, std_or_dx, score, snapshot_id)
+                SELECT song_name, difficulty, std_or_dx, score, snapshot_id
+                FROM score_events WHERE snapshot_id = ?
+                ON CONFLICT (song_name, difficulty, std_or_dx)
+                DO UPDATE SET score = excluded.score, snapshot_id = excluded.snapshot_id""", (snapshot_id,))
+            self.conn.execute("DELETE FROM incoming")
+        return snapshot_id, changed
+
+    def import_csv(self, filepath, taken_at=None):
+        """ スコアCSVを取り込む (記録日時を省略した場合はファイルの更新日時) """
+        if taken_at is None:
+            taken_at = os.path.getmtime(filepath)
+        return self.import_records(read_score_csv(filepath), source=os.path.basename(filepath), taken_at=taken_at)
+
+    def current_best(self):
+        """ 全期間での譜面ごとの最高スコアを返す """
+        rows = self.conn.execute("""
+            SELECT song_name, difficulty, std_or_dx, MAX(score)
+            FROM score_events
+            GROUP BY song_name, difficulty, std_or_dx""").fetchall()
+        return _rows_to_records(rows)
+
+    def best_as_of(self, taken_at):
+        """ 指定日時までに記録された、譜面ごとの最高スコアを返す (日付だけならその日の記録を含む) """
+        rows = self.conn.execute("""
+            SELECT song_name, difficulty, std_or_dx, MAX(score)
+            FROM score_events
+            WHERE taken_at <= ?
+            GROUP BY song_name, difficulty, std_or_dx""", (_to_timestamp(taken_at, end_of_day=True),)).fetchall()
+        return _rows_to_records(rows)
+
+    def snapshots(self):
+        """ (スナップショットID, 記録日時, 取り込み元) のリスト """
+        return self.conn.execute("SELECT id, taken_at, source FROM snapshots ORDER BY taken_at, id").fetchall()
+
+
+def _main():
+    parser = argparse.ArgumentParser(description="スコア履歴 (SQLite) の取り込みと参照")
+    parser.add_argument('--db', default=HISTORY_DB_FILE_NAME, help="履歴DBのパス")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    import_parser = subparsers.add_parser('import', help="スコアCSVを取り込む")
+    import_parser.add_argument('csv_files', nargs='+')
+    best_parser = subparsers.add_parser('best', help="譜面ごとの最高スコアをCSV形式で表示する")
+    best_parser.add_argument('--as-of', help="この日時 (例: 2025-06-08) までの記録に限る")
+    subparsers.add_parser('snapshots', help="スナップショットの一覧")
+    args = parser.parse_args()
+
+    with ScoreHistory(args.db) as history:
+        if args.command == 'import':
+            for filepath in args.csv_files:
+                snapshot_id, changed = history.import_csv(filepath)
+                print(f"{filepath}: スナップショット {snapshot_id} ({changed} 件更新)")
+        elif args.command == 'best':
+            records = history.best_as_of(args.as_of) if args.as_of else history.current_best()
+            writer = csv.DictWriter(sys.stdout, fieldnames=REQUIRED_HEADERS)
+            writer.writeheader()
+            writer.writerows(records)
+        else:
+            for snapshot_id, taken_at, source in history.snapshots():
+                print(f"{snapshot_id}\t{taken_at}\t{source or ''}")
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,80 @@
+import os
+import sys
+from array import array
+
+# song_type 列の値
+SONG_TYPE_CODES = {'unknown': 0, 'new': 1, 'old': 2}
+SONG_TYPE_NAMES = {code: name for name, code in SONG_TYPE_CODES.items()}
+
+
+class ScoreStore:
+    """
+    取り込んだスコアを列ごとに保持するストア。譜面ごとに1行で、最高スコアだけを残す。
+    譜面キーと文字列は共有 (intern) し、スコア・譜面定数・レート値・新旧フラグは数値の配列で持つ。
+    表示用の辞書は record() で必要な行だけ作る。
+    """
+
+    def __init__(self, images_dir=''):
+        self.images_dir = images_dir
+        self.keys = []                 # (曲名, 難易度, STDORDX)
+        self.levels = []               # 'レベル' の文字列
+        self.image_names = []          # '画像ファイル名'
+        self.scores = array('q')
+        self.constants = array('d')
+        self.rates = array('q')
+        self.song_types = array('b')
+        self._rows = {}                # 譜面キー → 行番号
+        self._str_pool = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _intern_str(self, value):
+        return self._str_pool.setdefault(value, value)
+
+    def row_of(self, song_name, difficulty, std_or_dx):
+        """ 譜面キーの行番号 (未登録なら None) """
+        return self._rows.get((song_name, difficulty, std_or_dx))
+
+    def upsert(self, song_name, difficulty, std_or_dx, score, constant, level, image_name, song_type):
+        """
+        譜面ごとに最高スコアだけを残して追加する。
+        (行番号, スコアが新規または更新されたか) を返す。レート値は呼び出し側で設定する。
+        """
+        row = self._rows.get((song_name, difficulty, std_or_dx))
+        if row is not None:
+            if score <= self.scores[row]:
+                return row, False
+            self.scores[row] = score
+            return row, True
+
+        key = (sys.intern(song_name), sys.intern(difficulty), sys.intern(std_or_dx))
+        self.keys.append(key)
+        self.levels.append(self._intern_str(level))
+        self.image_names.append(self._intern_str(image_name))
+        self.scores.append(score)
+        self.constants.append(constant)
+        self.rates.append(0)
+        self.song_types.append(SONG_TYPE_CODES[song_type])
+        row = len(self.keys) - 1
+        self._rows[key] = row
+        return row, True
+
+    def clear(self):
+        self.__init__(self.images_dir)
+
+    def record(self, i):
+        """ 表示・エクスポート用に1行分の辞書を作る """
+        song_name, difficulty, std_or_dx = self.keys[i]
+        image_name = self.image_names[i]
+        return {
+            '曲名': song_name,
+            '難易度': difficulty,
+            'STDORDX': std_or_dx,
+            'スコア': self.scores[i],
+            '譜面定数': self.constants[i],
+            'レベル': self.levels[i],
+            '画像パス': os.path.join(self.images_dir, image_name) if image_name else '',
+            'レート値': self.rates[i],
+            'song_type': SONG_TYPE_NAMES[self.song_types[i]],
+        }
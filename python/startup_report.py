@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+APP_SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mairatev5.py')
+STARTUP_REPORT_ENV = 'MAIRATE_STARTUP_REPORT' # mairatev5.py と同じ名前
+
+# python -X importtime の1行 ("import time: self [us] | cumulative | imported package")
+_IMPORTTIME_LINE_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$')
+# mairatev5.py が表示する起動時間の行
+_STARTUP_LINE_RE = re.compile(r'起動時間: import ([\d.]+) ms / 初期化 ([\d.]+) ms / ウィンドウ表示まで ([\d.]+) ms')
+
+
+def parse_importtime(stderr_text):
+    """
+    python -X importtime の出力を読み取る。
+
+    Returns:
+        list: 'module', 'self_ms', 'cumulative_ms', 'depth' (0 が直接 import されたモジュール)、
+            'top' (そのモジュールを読み込んだ depth 0 のモジュール) の辞書のリスト。
+
+    """
+    rows = []
+    for line in stderr_text.splitlines():
+        match = _IMPORTTIME_LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append({
+                'module': module,
+                'self_ms': int(self_us) / 1000,
+                'cumulative_ms': int(cumulative_us) / 1000,
+                'depth': (len(indent) - 1) // 2,
+            })
+    # 子モジュールは親より先に出力されるので、後ろから見て depth 0 の親を割り当てる
+    top = None
+    for row in reversed(rows):
+        if row['depth'] == 0:
+            top = row['module']
+        row['top'] = top
+    return rows
+
+
+def measure_startup(window=True, app_script_path=APP_SCRIPT_PATH):
+    """
+    別プロセスでアプリを起動し、起動時間と import の内訳を測る。
+
+    Args:
+        window (bool): True ならウィンドウを表示するまで (表示後すぐに終了する)、
+            False なら import だけを測る (画面のない環境用)。
+        app_script_path (str): mairatev5.py のパス。
+
+    Returns:
+        dict: 'process_ms' (プロセス全体)、'window' (ウィンドウ表示までの内訳、測れなければ None)、'imports'。
+
+    Raises:
+        RuntimeError: アプリの起動に失敗した場合。
+
+    """
+    env = dict(os.environ, **{STARTUP_REPORT_ENV: 'exit'})
+    if window:
+        command = [sys.executable, '-X', 'importtime', app_script_path]
+    else:
+        module_name = os.path.splitext(os.path.basename(app_script_path))[0]
+        command = [sys.executable, '-X', 'importtime', '-c', f'import {module_name}']
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=os.path.dirname(app_script_path), env=env,
+                               capture_output=True, text=True, encoding='utf-8', errors='replace')
+    process_ms = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0:
+        error_lines = [line for line in completed.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError(f"アプリの起動に失敗しました (終了コード {completed.returncode}):\n" + '\n'.join(error_lines[-10:]))
+
+    window_times = None
+    match = _STARTUP_LINE_RE.search(completed.stdout)
+    if match:
+        import_ms, init_ms, shown_ms = (float(value) for value in match.groups())
+        window_times = {'import_ms': import_ms, 'init_ms': init_ms, 'time_to_window_ms': shown_ms}
+    return {'process_ms': process_ms, 'window': window_times, 'imports': parse_importtime(completed.stderr)}
+
+
+def _app_imports(imports, app_module):
+    """ アプリが直接 import したモジュール (import だけを測った場合は app_module の1段下) """
+    if any(row['depth'] == 0 and row['module'] == app_module for row in imports):
+        return [row for row in imports if row['depth'] == 1 and row['top'] == app_module]
+    return [row for row in imports if row['depth'] == 0]
+
+
+def format_report(result, top=15, app_module='mairatev5'):
+    """ measure_startup の結果を人が読める形の文字列にする """
+    lines = [f"プロセス全体: {result['process_ms']:.1f} ms"]
+    window_times = result['window']
+    if window_times:
+        lines.append(f"ウィンドウ表示まで: {window_times['time_to_window_ms']:.1f} ms "
+                     f"(import {window_times['import_ms']:.1f} ms / 初期化 {window_times['init_ms']:.1f} ms)")
+    imports = result['imports']
+    direct = sorted(_app_imports(imports, app_module), key=lambda row: -row['cumulative_ms'])
+    lines.append(f"{app_module} が直接 import したモジュール (累計の大きい順、上位 {top} 件):")
+    lines.extend(f"  {row['cumulative_ms']:8.1f} ms  {row['module']}" for row in direct[:top])
+    lines.append(f"モジュール単体の import 時間 (大きい順、上位 {top} 件):")
+    lines.extend(f"  {row['self_ms']:8.1f} ms  {row['module']}"
+                 for row in sorted(imports, key=lambda row: -row['self_ms'])[:top])
+    return '\n'.join(lines)
+
+
+def _main():
+    parser = argparse.ArgumentParser(description="mairatev5.py の起動時間 (ウィンドウ表示まで) と import の内訳を測る")
+    parser.add_argument('--no-window', action='store_true', help="ウィンドウを開かず import だけを測る (画面のない環境用)")
+    parser.add_argument('--top', type=int, default=15, help="表示するモジュールの数")
+    parser.add_argument('--json', help="結果をJSONで保存するパス (起動時間の推移を記録する用)")
+    args = parser.parse_args()
+
+    result = measure_startup(window=not args.no_window)
+    print(format_report(result, args.top))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,337 @@
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageDraw, ImageFont
+
+from jacket_cache import make_thumbnail
+from tile_cache import MISSING, tile_key
+
+# --- レイアウト定数 (Canvas 表示と画像エクスポートで共通) ---
+TABLE_COLS = 5 # 横方向のセル数は共通
+
+# 新曲用設定
+NEW_SONGS_TABLE_ROWS = 3
+MAX_NEW_SONGS_DISPLAY = NEW_SONGS_TABLE_ROWS * TABLE_COLS # 15
+
+# 旧曲用設定
+OLD_SONGS_TABLE_ROWS = 7
+MAX_OLD_SONGS_DISPLAY = OLD_SONGS_TABLE_ROWS * TABLE_COLS # 35
+
+# セルとフォント設定 (共通)
+CELL_WIDTH = 190
+CELL_HEIGHT = 120
+HEADING_FONT_SIZE = 18 # 小見出し用フォントサイズ
+HEADING_AREA_HEIGHT = 40 # 小見出しエリアの高さ
+CELL_PADDING = 5 # セル内テキストのパディング
+
+RATE_PASSING =  12# レート値の下に空白を入れるためのスペース
+
+FONT_SIZE_RATE = 23
+FONT_SIZE_TITLE = 15
+FONT_SIZE_DETAIL = 12
+FONT_SIZE_TOTAL_RATE = 40 # 総合計レートのフォントサイズ
+
+JACKET_BRIGHTNESS = 0.5 # ジャケットの明るさ 0.0 (黒) から 1.0 (元の明るさ) の範囲で調整
+
+# Windows標準の日本語フォントを明示的に指定
+JP_FONT_PATH = "C:/Windows/Fonts/meiryo.ttc"
+
+
+def load_fonts(font_path=JP_FONT_PATH):
+    """ エクスポート画像用のフォントを読み込む (日本語フォント → OSごとの代替フォント → システムデフォルト) """
+    fonts = {}
+    try:
+        fonts['heading'] = ImageFont.truetype(font_path, HEADING_FONT_SIZE)
+        fonts['rate'] = ImageFont.truetype(font_path, FONT_SIZE_RATE)
+        fonts['title'] = ImageFont.truetype(font_path, FONT_SIZE_TITLE)
+        fonts['detail'] = ImageFont.truetype(font_path, FONT_SIZE_DETAIL)
+        fonts['total_rate'] = ImageFont.truetype(font_path, FONT_SIZE_TOTAL_RATE)
+    except IOError:
+        print(f"警告: 指定フォント({font_path})が見つかりません。代替フォントを使用。")
+        # OS依存の代替案
+        if os.name == 'nt': # Windows
+            default_font_name = "arial.ttf"
+            default_bold_font_name = "arialbd.ttf"
+        else: # macOS/Linux (一般的なフォント)
+            default_font_name = "DejaVuSans.ttf"
+            default_bold_font_name = "DejaVuSans-Bold.ttf"
+
+        try:
+            fonts['heading'] = ImageFont.truetype(default_bold_font_name, HEADING_FONT_SIZE)
+            fonts['rate'] = ImageFont.truetype(default_bold_font_name, FONT_SIZE_RATE)
+            fonts['title'] = ImageFont.truetype(default_font_name, FONT_SIZE_TITLE)
+            fonts['detail'] = ImageFont.truetype(default_font_name, FONT_SIZE_DETAIL)
+            fonts['total_rate'] = ImageFont.truetype(default_bold_font_name, FONT_SIZE_TOTAL_RATE)
+        except IOError as e_default_font:
+            print(f"エラー: 代替フォントも読み込めません。システムデフォルトフォントで続行します。詳細: {e_default_font}")
+            fonts['heading'] = ImageFont.load_default()
+            fonts['rate'] = ImageFont.load_default()
+            fonts['title'] = ImageFont.load_default()
+            fonts['detail'] = ImageFont.load_default()
+            fonts['total_rate'] = ImageFont.load_default()
+    return fonts
+
+
+def table_image_size():
+    """ エクスポート画像の (幅, 高さ) """
+    img_width = TABLE_COLS * CELL_WIDTH
+    img_height = (HEADING_AREA_HEIGHT + # 総合計表示エリア
+                  HEADING_AREA_HEIGHT + NEW_SONGS_TABLE_ROWS * CELL_HEIGHT +
+                  HEADING_AREA_HEIGHT + OLD_SONGS_TABLE_ROWS * CELL_HEIGHT)
+    return img_width, img_height
+
+
+def truncate_title(song_name):
+    """ セル幅に収まるように曲名を省略する """
+    # フォントサイズとCELL_WIDTHに基づいて最大文字数を計算
+    # ImageFont.getsizeで正確なピクセル幅を取得する代わりに、おおよその比率で計算
+    max_title_len = int(CELL_WIDTH / (FONT_SIZE_TITLE * 0.65)) # 0.65は経験的な値
+    if len(song_name) > max_title_len:
+        return song_name[:max_title_len-1] + "…"
+    return song_name
+
+
+def _cell_text_items(song, base_x, base_y, fonts):
+    """ セル内に描くテキストの (座標, 文字列, フォント, 色) のリスト """
+    text_x = base_x + CELL_PADDING
+    rate_y = base_y  # CELL_PADDINGを0に
+    title_y = rate_y + FONT_SIZE_RATE + CELL_PADDING + RATE_PASSING # レート値の下に少しスペースを空ける
+    difficulty_y = title_y + FONT_SIZE_TITLE + 1.5*CELL_PADDING
+    const_y = difficulty_y + FONT_SIZE_DETAIL + CELL_PADDING
+    achivescore_y = const_y + FONT_SIZE_DETAIL + CELL_PADDING
+    return [
+        ((text_x, rate_y), f"{song['レート値']:.0f}", fonts['rate'], "yellow"),
+        ((text_x, title_y), truncate_title(song['曲名']), fonts['title'], "white"),
+        ((text_x, difficulty_y), f"{song['難易度']} [{song['レベル']}]", fonts['detail'], "white"),
+        ((text_x, const_y), f"定数:{song['譜面定数']:.1f} ({song['STDORDX']})", fonts['detail'], "white"),
+        ((text_x, achivescore_y), f"スコア:{song['スコア']/10000:.4f} % ", fonts['detail'], "white"),
+    ]
+
+
+def draw_song_cell_text(draw, song, base_x, base_y, fonts):
+    """ Pillow Imageに1つの楽曲セルのテキストを描画する (画像は呼び出し元で描画する) """
+    for xy, text, font, fill in _cell_text_items(song, base_x, base_y, fonts):
+        draw.text(xy, text, font=font, fill=fill)
+
+
+def _get_jacket(img_path, jacket_cache):
+    if jacket_cache is None:
+        return make_thumbnail(img_path, (CELL_WIDTH, CELL_HEIGHT), JACKET_BRIGHTNESS)
+    return jacket_cache.get(img_path, (CELL_WIDTH, CELL_HEIGHT), JACKET_BRIGHTNESS)
+
+
+def _draw_song_cell(image, draw, song, x1, y1_cell, fonts, jacket_cache):
+    """ 1つの楽曲セル (ジャケットとテキスト) を最終画像に直接描画する """
+    # 画像の描画と明るさ調整
+    img_path_s = song.get('画像パス', '')
+    if img_path_s and os.path.exists(img_path_s):
+        try:
+            image.paste(_get_jacket(img_path_s, jacket_cache), (x1, y1_cell))
+        except Exception as e_img:
+            print(f"エクスポート時画像エラー {img_path_s}: {e_img}")
+            draw.rectangle([x1, y1_cell, x1 + CELL_WIDTH, y1_cell + CELL_HEIGHT], fill="darkgrey", outline="black")
+    else:
+        draw.rectangle([x1, y1_cell, x1 + CELL_WIDTH, y1_cell + CELL_HEIGHT], fill="darkgrey", outline="black")
+
+    # テキスト描画
+    draw_song_cell_text(draw, song, x1, y1_cell, fonts)
+
+
+_worker_state = threading.local()
+
+
+def _init_tile_worker(fonts):
+    # FreeTypeFont はスレッド間で共有できないので、ワーカーごとに1回だけ複製する
+    _worker_state.fonts = {name: font.font_variant() if isinstance(font, ImageFont.FreeTypeFont) else font
+                           for name, font in fonts.items()}
+
+
+def _render_cell_tile(song, jacket_cache):
+    """
+    1つの楽曲セルをセル大の画像 (タイル) に描く。
+    ジャケットがない場合や、テキストがセルからはみ出す場合は、隣のセルとの重なり方を
+    変えないように None を返して最終画像への直接描画に任せる。
+    """
+    img_path_s = song.get('画像パス', '')
+    if not (img_path_s and os.path.exists(img_path_s)):
+        return None
+    try:
+        jacket = _get_jacket(img_path_s, jacket_cache)
+    except Exception:
+        return None # エラー表示は直接描画のときに行う
+    fonts = _worker_state.fonts
+    tile = Image.new("RGB", (CELL_WIDTH, CELL_HEIGHT))
+    tile.paste(jacket, (0, 0))
+    draw = ImageDraw.Draw(tile)
+    for xy, text, font, _ in _cell_text_items(song, 0, 0, fonts):
+        left, top, right, bottom = draw.textbbox(xy, text, font=font)
+        if left < 0 or top < 0 or right > CELL_WIDTH or bottom > CELL_HEIGHT:
+            return None
+    draw_song_cell_text(draw, song, 0, 0, fonts)
+    return tile
+
+
+def _cell_positions(y_offset, rows):
+    return [(col * CELL_WIDTH, y_offset + row * CELL_HEIGHT) for row in range(rows) for col in range(TABLE_COLS)]
+
+
+class RenderTemplate:
+    """
+    レーティング表の画像のうち、エクスポートごとに変わらない部分。
+    読み込み済みのフォント、見出しとセルの位置、白背景の画像、タイル描画用のスレッドプールを持つ。
+    get_render_template() でレイアウト定数とフォントのパスごとに1つだけ作られる。
+    """
+
+    def __init__(self, font_path=JP_FONT_PATH):
+        self.font_path = font_path
+        self.fonts = load_fonts(font_path)
+        self.image_size = table_image_size()
+        self.total_rate_y = 0
+        self.new_heading_y = HEADING_AREA_HEIGHT
+        self.new_cells = _cell_positions(self.new_heading_y + HEADING_AREA_HEIGHT, NEW_SONGS_TABLE_ROWS)
+        self.old_heading_y = self.new_heading_y + HEADING_AREA_HEIGHT + NEW_SONGS_TABLE_ROWS * CELL_HEIGHT
+        self.old_cells = _cell_positions(self.old_heading_y + HEADING_AREA_HEIGHT, OLD_SONGS_TABLE_ROWS)
+        # 見出しの文字の縦位置 (見出しエリアの上端から)
+        self.heading_text_dy = HEADING_AREA_HEIGHT / 2 - self.fonts['heading'].getbbox("A")[3] / 2
+        self.base_image = Image.new("RGB", self.image_size, "white") # 背景色
+        # セルの見た目を決める値 (描画済みセルのキャッシュキーに含める)
+        self.style_key = (_layout_key(), CELL_PADDING, RATE_PASSING, JACKET_BRIGHTNESS,
+                          tuple((name, _font_identity(font)) for name, font in sorted(self.fonts.items())))
+        self._executors = {}
+        self._lock = threading.Lock()
+
+    def new_image(self):
+        """ 背景だけを描いた画像 (呼び出しごとに新しいコピー) """
+        return self.base_image.copy()
+
+    def executor(self, max_workers):
+        """ タイル描画用のスレッドプール (ワーカーはフォントの複製を持ち続ける) """
+        with self._lock:
+            executor = self._executors.get(max_workers)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=max_workers, initializer=_init_tile_worker,
+                                              initargs=(self.fonts,), thread_name_prefix='table_render')
+                self._executors[max_workers] = executor
+            return executor
+
+
+def _font_identity(font):
+    if isinstance(font, ImageFont.FreeTypeFont):
+        return (font.path if isinstance(font.path, str) else None, font.index, font.size, font.getname())
+    return type(font).__name__
+
+
+def _jacket_identity(song, jacket_cache):
+    """ ジャケット画像の内容を表す値 (画像がなければ None) """
+    img_path_s = song.get('画像パス', '')
+    try:
+        if not (img_path_s and os.path.exists(img_path_s)):
+            return None
+        if jacket_cache is not None:
+            return jacket_cache.source_hash(img_path_s)
+        stat = os.stat(img_path_s)
+        return (os.path.abspath(img_path_s), stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+
+def _layout_key():
+    return (TABLE_COLS, NEW_SONGS_TABLE_ROWS, OLD_SONGS_TABLE_ROWS, CELL_WIDTH, CELL_HEIGHT,
+            HEADING_AREA_HEIGHT, HEADING_FONT_SIZE, FONT_SIZE_RATE, FONT_SIZE_TITLE, FONT_SIZE_DETAIL,
+            FONT_SIZE_TOTAL_RATE)
+
+
+@functools.lru_cache(maxsize=4)
+def _build_render_template(layout_key, font_path):
+    return RenderTemplate(font_path)
+
+
+def get_render_template(font_path=JP_FONT_PATH):
+    """ レイアウト定数とフォントのパスに対応する RenderTemplate (2回目以降は作り直さない) """
+    return _build_render_template(_layout_key(), font_path)
+
+
+def render_rating_table(top_new_songs, top_old_songs, total_rate=None, new_songs_subtotal_rate=None,
+                        old_songs_subtotal_rate=None, template=None, jacket_cache=None, max_workers=None,
+                        tile_cache=None):
+    """
+    レーティング表の画像を作る。
+    背景・フォント・レイアウトは RenderTemplate のものを使い、エクスポートごとにはセルと3つの数値だけを描く。
+    各セル (ジャケットとテキスト) はスレッドプールで並列にタイルとして描き、最後に描画順どおり貼り合わせる。
+    tile_cache を渡すと、前回と表示内容が同じセルは描き直さずにキャッシュのタイルを使う。
+    出力は1セルずつ直接描いた場合と同じ画素になる。
+
+    Args:
+        top_new_songs (list): 新曲の上位曲 (表示用の辞書)。
+        top_old_songs (list): 旧曲の上位曲。
+        total_rate (int): 総合計レート (None で表示しない)。
+        new_songs_subtotal_rate (int): 新曲小計 (None で表示しない)。
+        old_songs_subtotal_rate (int): 旧曲小計 (None で表示しない)。
+        template (RenderTemplate): 使うテンプレート (None で get_render_template())。
+        jacket_cache (JacketCache): ジャケットのキャッシュ (None で毎回縮小する)。
+        max_workers (int): タイルを描くスレッド数 (1 で並列化しない)。
+        tile_cache (TileCache): 描画済みセルのキャッシュ (None で毎回描く)。
+
+    Returns:
+        PIL.Image.Image: レーティング表の画像。
+
+    """
+    if template is None:
+        template = get_render_template()
+    if max_workers is None:
+        max_workers = min(8, os.cpu_count() or 1)
+    fonts = template.fonts
+    img_width = template.image_size[0]
+    new_cells = list(zip(top_new_songs, template.new_cells))
+    old_cells = list(zip(top_old_songs, template.old_cells))
+    songs = top_new_songs[:len(new_cells)] + top_old_songs[:len(old_cells)]
+
+    tiles = [MISSING] * len(songs)
+    if tile_cache is not None:
+        keys = [tile_key(song, _jacket_identity(song, jacket_cache), template.style_key) for song in songs]
+        tiles = [tile_cache.get(key) for key in keys]
+    pending = [i for i, tile in enumerate(tiles) if tile is MISSING]
+
+    render_tile = lambda i: _render_cell_tile(songs[i], jacket_cache)
+    if max_workers > 1 and len(pending) > 1:
+        rendered = list(template.executor(max_workers).map(render_tile, pending))
+    else:
+        _worker_state.fonts = fonts
+        rendered = [render_tile(i) for i in pending]
+    for i, tile in zip(pending, rendered):
+        tiles[i] = tile
+        if tile_cache is not None:
+            tile_cache.put(keys[i], tile)
+
+    image = template.new_image()
+    draw = ImageDraw.Draw(image)
+
+    if total_rate is not None:
+        total_rate_text = f"総合計レート: {total_rate:.0f}"
+        # テキストを中央揃えにするための計算
+        text_bbox = draw.textbbox((0, 0), total_rate_text, font=fonts['total_rate'])
+        text_width = text_bbox[2] - text_bbox[0]
+        text_height = text_bbox[3] - text_bbox[1]
+
+        text_x = (img_width - text_width) / 2
+        text_y = template.total_rate_y + (HEADING_AREA_HEIGHT - text_height) / 2
+        draw.text((text_x, text_y), total_rate_text, font=fonts['total_rate'], fill="red")
+
+    # 見出しとセルは元の描画順 (新曲見出し → 新曲セル → 旧曲見出し → 旧曲セル) で重ねる
+    # 見出しは小計と同じ文字列で描く (分けて描くと字詰めが変わり、画素が一致しなくなる場合がある)
+    new_heading_text = f"新曲 (Top {MAX_NEW_SONGS_DISPLAY})　小計: {new_songs_subtotal_rate:.0f}" if new_songs_subtotal_rate is not None else f"新曲 (Top {MAX_NEW_SONGS_DISPLAY})"
+    old_heading_text = f"旧曲 (Top {MAX_OLD_SONGS_DISPLAY})　小計: {old_songs_subtotal_rate:.0f}" if old_songs_subtotal_rate is not None else f"旧曲 (Top {MAX_OLD_SONGS_DISPLAY})"
+    sections = ((new_heading_text, template.new_heading_y, new_cells),
+                (old_heading_text, template.old_heading_y, old_cells))
+    tiles = iter(tiles)
+    for heading_text, heading_y, cells in sections:
+        draw.text((10, heading_y + template.heading_text_dy), heading_text, font=fonts['heading'], fill="black")
+        for song, (x1, y1_cell) in cells:
+            tile = next(tiles)
+            if tile is not None:
+                image.paste(tile, (x1, y1_cell))
+            else:
+                _draw_song_cell(image, draw, song, x1, y1_cell, fonts, jacket_cache)
+    return image
@@ -0,0 +1,20 @@
+import random
+
+from calculate import RANK_BORDERS, calculate_rate, calculate_rates
+
+
+def test_calculate_rates_matches_scalar():
+    rng = random.Random(0)
+    levels = [round(rng.uniform(1.0, 15.0), 1) for _ in range(2000)]
+    scores = [rng.randint(0, 1010000) for _ in range(2000)]
+    # 境界ちょうどとその前後 (浮動小数点の誤差が出やすい)
+    for border in RANK_BORDERS:
+        for score in (round(border * 10000) - 1, round(border * 10000), round(border * 10000) + 1):
+            levels.append(13.7)
+            scores.append(score)
+
+    assert calculate_rates(levels, scores).tolist() == [calculate_rate(level, score) for level, score in zip(levels, scores)]
+
+
+def test_calculate_rates_caps_at_max_achievement():
+    assert calculate_rates([14.0, 14.0], [1005000, 1010000]).tolist() == [calculate_rate(14.0, 1005000)] * 2
@@ -0,0 +1,55 @@
+from chart_matcher import ChartMatcher, ChartResolver, normalize_title
+from master_data import MasterIndex
+
+
+def _master(keys):
+    return MasterIndex(keys, [13.0] * len(keys), ['13'] * len(keys), [''] * len(keys))
+
+
+def test_normalize_title_keeps_word_spacing():
+    assert normalize_title('ＵＬＴＲＡ　 SYNERGY  MATRIX ') == 'ultra synergy matrix'
+    assert normalize_title('Heart Beats') != normalize_title('Heartbeats')
+
+
+def test_notation_variants_match_exactly():
+    matcher = ChartMatcher([('ULTRA SYNERGY MATRIX', 'MAS', 'DX'), ('Burning Hearts ～炎のANGEL～', 'EXP', 'STD')])
+
+    assert matcher.match('ｕｌｔｒａ  synergy matrix', 'master', 'dx') == (('ULTRA SYNERGY MATRIX', 'MAS', 'DX'), 1.0)
+    assert matcher.match('Burning Hearts 〜炎のANGEL〜', 'Expert', 'Standard') == (('Burning Hearts ～炎のANGEL～', 'EXP', 'STD'), 1.0)
+
+
+def test_fuzzy_match_accepts_small_typo():
+    matcher = ChartMatcher([('Burning Hearts ～炎のANGEL～', 'EXP', 'STD'), ('ULTRA SYNERGY MATRIX', 'EXP', 'STD')])
+
+    key, similarity = matcher.match('Burning Heats ～炎のANGEL～', 'EXP', 'STD')
+
+    assert key == ('Burning Hearts ～炎のANGEL～', 'EXP', 'STD')
+    assert 0.0 < similarity < 1.0
+
+
+def test_fuzzy_match_rejects_different_songs():
+    # 似ているが別の曲。マスタに片方しかなくても読み替えない
+    cases = [('ENERGY SYNERGY MATRIX', 'ULTRA SYNERGY MATRIX'),
+             ('Heart Beats', 'Heartbeats'),
+             ('チルノのパーフェクトさんすう教室', 'チルノのパーフェクトさんすう教室　⑨周年バージョン'),
+             ('チルノのパーフェクトさんすう教室　⑨周年バージョン', 'チルノのパーフェクトさんすう教室')]
+    for song_name, master_song_name in cases:
+        matcher = ChartMatcher([(master_song_name, 'MAS', 'STD')])
+        assert matcher.match(song_name, 'MAS', 'STD') == (None, 0.0), song_name
+
+
+def test_case_only_duplicates_are_ambiguous():
+    matcher = ChartMatcher([('Trust', 'MAS', 'DX'), ('TRUST', 'MAS', 'DX')])
+
+    assert matcher.match('Trust', 'MAS', 'DX') == (('Trust', 'MAS', 'DX'), 1.0)
+    assert matcher.match('trust', 'MAS', 'DX') == (None, 0.0)
+
+
+def test_resolver_records_fuzzy_matches_only():
+    resolver = ChartResolver(_master([('Burning Hearts ～炎のANGEL～', 'EXP', 'STD')]), _master([('Heartbeats', 'MAS', 'DX')]))
+
+    assert resolver.resolve('Burning Hearts 〜炎のANGEL〜', 'EXP', 'STD') == (('Burning Hearts ～炎のANGEL～', 'EXP', 'STD'), 'new')
+    assert resolver.resolve('Burning Heats ～炎のANGEL～', 'EXP', 'STD') == (('Burning Hearts ～炎のANGEL～', 'EXP', 'STD'), 'new')
+    assert resolver.resolve('Heart Beats', 'MAS', 'DX') == (('Heart Beats', 'MAS', 'DX'), 'unknown')
+
+    assert resolver.fuzzy_matches == {('Burning Heats ～炎のANGEL～', 'EXP', 'STD'): ('Burning Hearts ～炎のANGEL～', 'EXP', 'STD')}
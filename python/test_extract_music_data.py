@@ -0,0 +1,76 @@
+import io
+import os
+import shutil
+
+import pytest
+
+import extract_music_data
+from benchmark import make_friend_vs_html
+from extract_music_data import extract_music_data_from_files, parse_song_blocks_soup, parse_song_blocks_stream
+
+ROWS = [
+    {'曲名': 'Heart Beats', '難易度': 'MAS', 'STDORDX': 'STD', 'スコア': 1003456},
+    {'曲名': 'Heartbeats', '難易度': 'EXP', 'STDORDX': 'DX', 'スコア': 987654},
+    {'曲名': 'チルノのパーフェクトさんすう教室　⑨周年バージョン', '難易度': 'ReMAS', 'STDORDX': 'DX', 'スコア': 1005000},
+    {'曲名': '未プレイ', '難易度': 'BASIC', 'STDORDX': 'STD', 'スコア': ''}, # '― %' は出力しない
+    {'曲名': 'Heart Beats', '難易度': 'MAS', 'STDORDX': 'STD', 'スコア': 1004000}, # 同じ譜面がもう一度出てくる
+]
+
+
+def _write(path, rows):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(make_friend_vs_html(rows))
+
+
+def test_stream_parser_matches_soup_parser(monkeypatch):
+    html = make_friend_vs_html(ROWS)
+    expected = parse_song_blocks_soup(html)
+    assert len(expected) == 4
+
+    assert parse_song_blocks_stream(html) == expected
+    # 読み込みの区切りがタグや文字の途中に来ても同じ結果になる
+    monkeypatch.setattr(extract_music_data, 'STREAM_CHUNK_SIZE', 7)
+    assert parse_song_blocks_stream(io.StringIO(html)) == expected
+
+
+def test_single_and_multiple_files_give_same_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(extract_music_data, 'get_external_file_path', lambda relative: os.path.join(tmp_path, relative))
+    _write(tmp_path / 'html.txt', ROWS)
+    single = extract_music_data.extract_music_data()
+
+    os.mkdir(tmp_path / 'html')
+    shutil.copy(tmp_path / 'html.txt', tmp_path / 'html' / 'master.txt')
+    multiple = extract_music_data.extract_music_data()
+
+    assert single == multiple
+    assert [(row['曲名'], row['スコア']) for row in single] == [('Heart Beats', 1004000), ('Heartbeats', 987654),
+                                                                ('チルノのパーフェクトさんすう教室　⑨周年バージョン', 1005000)]
+
+
+class _BrokenExecutor:
+    def __init__(self, max_workers):
+        pass
+
+    def submit(self, *args):
+        raise RuntimeError("broken pool")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def test_submit_error_is_not_hidden(tmp_path, monkeypatch):
+    monkeypatch.setattr(extract_music_data, 'ProcessPoolExecutor', _BrokenExecutor)
+    paths = [tmp_path / 'a.txt', tmp_path / 'b.txt']
+    for path in paths:
+        _write(path, ROWS)
+
+    with pytest.raises(RuntimeError, match="broken pool"):
+        extract_music_data_from_files(paths, max_workers=2)
+
+
+def test_titles_with_markup_characters_round_trip():
+    rows = [{'曲名': 'Tic Tac DREAMIN’ & <Remix> "A"', '難易度': 'MAS', 'STDORDX': 'DX', 'スコア': 1001234}]
+    html = make_friend_vs_html(rows)
+
+    assert [row['曲名'] for row in parse_song_blocks_stream(html)] == [rows[0]['曲名']]
+    assert parse_song_blocks_stream(html) == parse_song_blocks_soup(html)
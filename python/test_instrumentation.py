@@ -0,0 +1,58 @@
+import io
+import json
+import tracemalloc
+
+import pytest
+
+import instrumentation
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    monkeypatch.setattr(instrumentation, '_recorder', None)
+    monkeypatch.setattr(instrumentation.atexit, 'register', lambda func: None)
+    was_tracing = tracemalloc.is_tracing()
+    yield
+    if not was_tracing:
+        tracemalloc.stop()
+
+
+def test_disabled_instrumentation_does_nothing(recorder):
+    f = io.StringIO('abc')
+    with instrumentation.stage('export.render'):
+        pass
+    instrumentation.counter('cache', hits=1)
+
+    assert instrumentation.timed_reader(f, 'extract.html_read') is f
+    assert instrumentation.summary() == {'stages': {}, 'counters': {}}
+
+
+def test_stages_counters_and_trace_file(recorder, tmp_path):
+    trace_path = tmp_path / 'trace.json'
+    instrumentation.enable(str(trace_path), trace_memory=True)
+
+    with instrumentation.stage('auto.worker', records=3):
+        with instrumentation.stage('auto.parse'):
+            data = bytearray(2 * 1024 * 1024)
+        del data
+    with pytest.raises(KeyError), instrumentation.stage('auto.apply'):
+        raise KeyError('x')
+    instrumentation.record_stage('extract.html_file', 0.0, 12.5, peak_kb=100.0, pid=4321, file='master.txt')
+    instrumentation.timed_reader(io.StringIO('abc'), 'extract.html_read').read()
+
+    class Cache:
+        hits, misses = 3, 1
+    instrumentation.record_cache_stats('jacket_cache', Cache)
+    instrumentation.flush()
+
+    stages = instrumentation.summary()['stages']
+    assert {name: stat['calls'] for name, stat in stages.items()} == {
+        'auto.parse': 1, 'auto.worker': 1, 'auto.apply': 1, 'extract.html_file': 1, 'extract.html_read': 1}
+    assert stages['auto.parse']['peak_kb'] >= 2048 and stages['auto.worker']['peak_kb'] >= stages['auto.parse']['peak_kb']
+
+    trace = json.loads(trace_path.read_text(encoding='utf-8'))
+    events = {event['name']: event for event in trace['traceEvents']}
+    assert events['auto.worker']['args']['records'] == 3
+    assert events['auto.apply']['args']['error'] == 'KeyError'
+    assert (events['extract.html_file']['pid'], events['extract.html_file']['dur']) == (4321, 12500.0)
+    assert trace['otherData']['counters']['jacket_cache.hit_rate'] == 0.75
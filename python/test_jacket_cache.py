@@ -0,0 +1,65 @@
+import os
+
+from PIL import Image
+
+from jacket_cache import JacketCache, evict_lru_files, make_thumbnail
+
+SIZE = (190, 120)
+
+
+def _jacket(path, color):
+    Image.new('RGB', (400, 400), color).save(path)
+    return str(path)
+
+
+def test_cached_thumbnail_matches_direct_resize(tmp_path):
+    source = _jacket(tmp_path / 'a.png', (200, 100, 50))
+    expected = make_thumbnail(source, SIZE, 0.5).tobytes()
+
+    cache = JacketCache(str(tmp_path / 'cache'))
+    assert cache.get(source, SIZE, 0.5).tobytes() == expected
+    assert cache.get(source, SIZE, 0.5).tobytes() == expected # メモリから
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.save_hash_index()
+
+    reopened = JacketCache(str(tmp_path / 'cache'))
+    assert reopened.get(source, SIZE, 0.5).tobytes() == expected # ディスクから
+    assert (reopened.hits, reopened.misses) == (1, 0)
+
+
+def test_replaced_jacket_gets_new_thumbnail(tmp_path):
+    source = _jacket(tmp_path / 'a.png', (200, 100, 50))
+    cache = JacketCache(str(tmp_path / 'cache'))
+    cache.get(source, SIZE, 0.5)
+
+    stat = os.stat(source)
+    _jacket(tmp_path / 'a.png', (10, 20, 30))
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert cache.get(source, SIZE, 0.5).tobytes() == make_thumbnail(source, SIZE, 0.5).tobytes()
+    assert cache.misses == 2
+
+
+def test_corrupt_thumbnail_is_rebuilt(tmp_path):
+    source = _jacket(tmp_path / 'a.png', (200, 100, 50))
+    cache_dir = tmp_path / 'cache'
+    JacketCache(str(cache_dir)).get(source, SIZE, 0.5)
+    for name in os.listdir(cache_dir):
+        if name.endswith('.png'):
+            (cache_dir / name).write_bytes(b'broken')
+
+    cache = JacketCache(str(cache_dir))
+    assert cache.get(source, SIZE, 0.5).tobytes() == make_thumbnail(source, SIZE, 0.5).tobytes()
+    assert cache.misses == 1
+
+
+def test_evict_removes_least_recently_used(tmp_path):
+    for i, name in enumerate(['old.png', 'middle.png', 'new.png']):
+        path = tmp_path / name
+        path.write_bytes(b'x' * 100)
+        os.utime(path, ns=(i * 10**9, i * 10**9))
+    (tmp_path / 'hashes.json').write_bytes(b'{}' * 100) # PNG 以外は数えない
+
+    evict_lru_files(str(tmp_path), 200)
+
+    assert sorted(os.listdir(tmp_path)) == ['hashes.json', 'middle.png', 'new.png']
@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+import master_data
+from master_data import get_master_cache_path, load_master_index
+
+HEADER = '曲名,難易度,STDORDX,譜面定数,レベル,画像ファイル名\n'
+KEY = ('曲A', 'MAS', 'DX')
+
+
+@pytest.fixture
+def master_csv(tmp_path, monkeypatch):
+    path = tmp_path / 'new_song_master.csv'
+    _write(path, '13.5')
+    calls = {'sha1': 0, 'csv': 0}
+    file_sha1, read_master_csv = master_data._file_sha1, master_data.read_master_csv
+
+    def counting_sha1(filepath):
+        calls['sha1'] += 1
+        return file_sha1(filepath)
+
+    def counting_read(filepath):
+        calls['csv'] += 1
+        return read_master_csv(filepath)
+
+    monkeypatch.setattr(master_data, '_file_sha1', counting_sha1)
+    monkeypatch.setattr(master_data, 'read_master_csv', counting_read)
+    return path, calls
+
+
+def _write(path, constant, mtime_ns=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(HEADER + f'曲A,MAS,DX,{constant},13+,a.png\n')
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def _constant(path):
+    return load_master_index(str(path))[KEY]['譜面定数']
+
+
+def test_unchanged_csv_is_read_from_cache(master_csv):
+    path, calls = master_csv
+    assert _constant(path) == 13.5
+    assert calls == {'sha1': 1, 'csv': 1}
+
+    assert _constant(path) == 13.5
+    assert calls == {'sha1': 1, 'csv': 1} # CSVの解析もハッシュの計算もしない
+
+
+def test_touched_csv_is_hashed_once(master_csv):
+    path, calls = master_csv
+    _constant(path)
+    os.utime(path, ns=(os.stat(path).st_mtime_ns + 10**9,) * 2)
+
+    assert _constant(path) == 13.5
+    assert calls == {'sha1': 2, 'csv': 1} # 内容は同じなのでキャッシュを使い、ハッシュは1回だけ求める
+
+    assert _constant(path) == 13.5
+    assert calls == {'sha1': 2, 'csv': 1} # 新しい更新日時を覚えている
+
+
+def test_changed_content_rebuilds_cache(master_csv):
+    path, calls = master_csv
+    _constant(path)
+    mtime_ns = os.stat(path).st_mtime_ns
+
+    _write(path, '13.7', mtime_ns + 10**9) # 同じサイズで内容だけ変わる
+    assert _constant(path) == 13.7
+    assert calls == {'sha1': 2, 'csv': 2}
+
+    _write(path, '13.75', mtime_ns + 2 * 10**9) # サイズが変わる
+    assert _constant(path) == 13.75
+    assert calls == {'sha1': 3, 'csv': 3}
+
+
+def test_corrupt_cache_is_rebuilt(master_csv):
+    path, calls = master_csv
+    _constant(path)
+    with open(get_master_cache_path(str(path)), 'wb') as f:
+        f.write(b'not a pickle')
+
+    assert _constant(path) == 13.5
+    assert calls['csv'] == 2
+    assert _constant(path) == 13.5
+    assert calls['csv'] == 2 # 作り直したキャッシュが使われる
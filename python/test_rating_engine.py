@@ -0,0 +1,84 @@
+import random
+
+from calculate import calculate_rate
+from master_data import MasterIndex
+from rating_engine import RatingEngine, TopKTracker
+
+
+def _engine():
+    master = MasterIndex([('曲A', 'MAS', 'DX'), ('曲B', 'MAS', 'DX')], [14.0, 13.0], ['14', '13'], ['', ''])
+    return RatingEngine(master, MasterIndex([], [], [], []), max_new=1, max_old=1)
+
+
+def test_score_update_with_same_rate_changes_version():
+    # 達成率の上限 (100.5%) を超えるとスコアが上がってもレート値は変わらないが、表示するスコアは変わる
+    engine = _engine()
+    engine.add_score('曲A', 'MAS', 'DX', 1005000)
+    version = engine.version
+    rate = engine.new_songs_subtotal_rate
+
+    song_type, top_changed = engine.add_score('曲A', 'MAS', 'DX', 1007000)
+
+    assert (song_type, top_changed) == ('new', True)
+    assert engine.version > version
+    assert engine.new_songs_subtotal_rate == rate
+    assert engine.top_new_songs()[0]['スコア'] == 1007000
+
+
+def test_score_update_outside_top_keeps_version():
+    engine = _engine()
+    engine.add_scores([{'曲名': '曲A', '難易度': 'MAS', 'STDORDX': 'DX', 'スコア': 1005000},
+                       {'曲名': '曲B', '難易度': 'MAS', 'STDORDX': 'DX', 'スコア': 900000}])
+    version = engine.version
+
+    _, top_changed = engine.add_score('曲B', 'MAS', 'DX', 910000)
+
+    assert not top_changed
+    assert engine.version == version
+
+
+def _brute_force_top(records, master, k):
+    """ 譜面ごとの最高スコアを全件並べ替えて上位 k 件を求める (同じレート値は先に出てきた譜面を上位にする) """
+    best, first_seen = {}, {}
+    for position, (key, score) in enumerate(records):
+        if key in master:
+            best[key] = max(best.get(key, 0), score)
+            first_seen.setdefault(key, position)
+    rates = {key: calculate_rate(master[key]['譜面定数'], score) for key, score in best.items()}
+    top = sorted(best, key=lambda key: (-rates[key], first_seen[key]))[:k]
+    return [(key, best[key], rates[key]) for key in top], sum(rates[key] for key in top)
+
+
+def test_incremental_top_matches_full_sort():
+    rng = random.Random(0)
+    new_keys = [(f'新曲{i}', 'MAS', 'DX') for i in range(30)]
+    old_keys = [(f'旧曲{i}', 'MAS', 'STD') for i in range(60)]
+    new_master = MasterIndex(new_keys, [rng.choice([12.5, 13.0, 13.7, 14.2]) for _ in new_keys], [''] * 30, [''] * 30)
+    old_master = MasterIndex(old_keys, [rng.choice([12.5, 13.0, 13.7, 14.2]) for _ in old_keys], [''] * 60, [''] * 60)
+    engine = RatingEngine(new_master, old_master, max_new=5, max_old=10)
+
+    records = []
+    for _ in range(40):
+        batch = [(rng.choice(new_keys + old_keys + [('未登録', 'MAS', 'DX')]), rng.choice([970000, 990000, 1000000, 1005000, 1007000]))
+                 for _ in range(rng.randint(1, 8))]
+        if len(batch) == 1:
+            engine.add_score(*batch[0][0], batch[0][1])
+        else:
+            engine.add_scores([{'曲名': key[0], '難易度': key[1], 'STDORDX': key[2], 'スコア': score} for key, score in batch])
+        records.extend(batch)
+
+        for master, k, songs, subtotal in ((new_master, 5, engine.top_new_songs(), engine.new_songs_subtotal_rate),
+                                           (old_master, 10, engine.top_old_songs(), engine.old_songs_subtotal_rate)):
+            expected, expected_subtotal = _brute_force_top(records, master, k)
+            assert [((s['曲名'], s['難易度'], s['STDORDX']), s['スコア'], s['レート値']) for s in songs] == expected
+            assert subtotal == expected_subtotal
+
+
+def test_topk_tracker_replaces_lowest():
+    tracker = TopKTracker(2)
+    assert tracker.offer(0, 100) and tracker.offer(1, 200)
+    assert not tracker.offer(2, 100) # 同じレート値なら先に入った行を残す
+    assert tracker.offer(0, 300)     # 上位にある行のレート値が上がる
+    assert tracker.offer(2, 250)
+    assert tracker.rows() == [0, 2] and tracker.subtotal == 550
+    assert 1 not in tracker
@@ -0,0 +1,65 @@
+import random
+
+from calculate import RANK_BORDERS, calculate_rate
+from master_data import MasterIndex
+from rating_engine import RatingEngine
+from rating_index import BORDER_SCORES, build_rating_index, suggest_for_engine
+
+
+def _masters(seed):
+    rng = random.Random(seed)
+    new_keys = [(f'新曲{i}', 'MAS', 'DX') for i in range(8)]
+    old_keys = [(f'旧曲{i}', 'MAS', 'STD') for i in range(12)]
+    new_constants = [round(rng.uniform(12.0, 15.0), 1) for _ in new_keys]
+    old_constants = [round(rng.uniform(12.0, 15.0), 1) for _ in old_keys]
+    new_master = MasterIndex(new_keys, new_constants, ['' for _ in new_keys], ['' for _ in new_keys])
+    old_master = MasterIndex(old_keys, old_constants, ['' for _ in old_keys], ['' for _ in old_keys])
+    records = [{'曲名': key[0], '難易度': key[1], 'STDORDX': key[2], 'スコア': rng.randint(900000, 1005000)}
+               for key in rng.sample(new_keys, 6) + rng.sample(old_keys, 9)]
+    return new_master, old_master, records
+
+
+def _engine(new_master, old_master, records):
+    engine = RatingEngine(new_master, old_master, max_new=3, max_old=5)
+    engine.add_scores(records)
+    return engine
+
+
+def test_border_scores_are_minimal():
+    for border, score in zip(RANK_BORDERS, BORDER_SCORES.tolist()):
+        assert score / 10000 >= border
+        assert (score - 1) / 10000 < border
+
+
+def test_threshold_rates_match_scalar_rate():
+    new_master, old_master, _ = _masters(0)
+    index = build_rating_index(new_master, old_master)
+    for row, constant in enumerate(index.constants.tolist()):
+        for col, score in enumerate(BORDER_SCORES.tolist()):
+            assert index.threshold_rates[row, col] == calculate_rate(constant, score)
+
+
+def test_suggestions_match_scalar_rate_and_total_gain():
+    for seed in range(20):
+        new_master, old_master, records = _masters(seed)
+        engine = _engine(new_master, old_master, records)
+        index = build_rating_index(new_master, old_master)
+
+        for suggestion in suggest_for_engine(index, engine, limit=None):
+            key = (suggestion['曲名'], suggestion['難易度'], suggestion['STDORDX'])
+            master = new_master if suggestion['song_type'] == 'new' else old_master
+            constant = master[key]['譜面定数']
+            target = suggestion['目標スコア']
+            assert suggestion['目標レート'] == calculate_rate(constant, target)
+
+            # 目標スコアを出したときの合計レートの上昇量が候補の値と一致する
+            improved = _engine(new_master, old_master, records)
+            improved.add_score(*key, target)
+            assert improved.total_rate - engine.total_rate == suggestion['上昇量']
+
+            # 1つ下の境界では上昇しない (目標は最も低い境界)
+            lower = [s for s in BORDER_SCORES.tolist() if suggestion['現在スコア'] < s < target]
+            if lower:
+                cheaper = _engine(new_master, old_master, records)
+                cheaper.add_score(*key, lower[-1])
+                assert cheaper.total_rate - engine.total_rate < 1
@@ -0,0 +1,91 @@
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+from rating_server import PooledHTTPServer, RatingRequestHandler, RatingService, detect_input_type
+
+SCORES_CSV = '曲名,難易度,STDORDX,スコア\n曲A,MAS,DX,1005000\nＵＮＫＮＯＷＮ,MAS,DX,1000000\n'
+
+
+class _BlockingService:
+    """ handle() が release されるまで戻らないサービス (ワーカーを埋めるため) """
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def handle(self, text, input_type, output_format):
+        self.entered.set()
+        self.release.wait(10)
+        return 'application/json; charset=utf-8', b'{}'
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(service, workers=1, queue_size=0):
+        server = PooledHTTPServer(('127.0.0.1', 0), RatingRequestHandler, service, workers, queue_size)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server.server_address[1]
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _post(port, body, path='/rate?input=csv', headers=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    connection.request('POST', path, body=body.encode('utf-8'), headers=headers or {})
+    response = connection.getresponse()
+    return response.status, response.getheader('Retry-After'), response.read()
+
+
+def test_busy_server_rejects_with_503(serve):
+    service = _BlockingService()
+    port = serve(service, workers=1, queue_size=0)
+    first = {}
+    thread = threading.Thread(target=lambda: first.update(result=_post(port, SCORES_CSV)))
+    thread.start()
+    assert service.entered.wait(10)
+
+    # 混雑時は本文を読まずに接続を受け付けた時点で 503 を返して閉じるので、何も送らずに応答を読む
+    with socket.create_connection(('127.0.0.1', port), timeout=10) as connection:
+        response = b''.join(iter(lambda: connection.recv(65536), b''))
+    head, body = response.split(b'\r\n\r\n', 1)
+    assert head.startswith(b'HTTP/1.0 503 ') and b'Retry-After: 1' in head
+    assert 'error' in json.loads(body)
+
+    service.release.set()
+    thread.join(10)
+    assert first['result'][0] == 200
+    assert _post(port, SCORES_CSV)[0] == 200 # 空いたら受け付ける
+
+
+def test_rate_csv_and_reject_bad_requests(tmp_path, serve):
+    master_path = tmp_path / 'new_song_master.csv'
+    master_path.write_text('曲名,難易度,STDORDX,譜面定数,レベル,画像ファイル名\n曲A,MAS,DX,14.0,14,\n', encoding='utf-8')
+    old_master_path = tmp_path / 'old_song_master.csv'
+    old_master_path.write_text('曲名,難易度,STDORDX,譜面定数,レベル,画像ファイル名\n', encoding='utf-8')
+    port = serve(RatingService(str(master_path), str(old_master_path), str(tmp_path), str(tmp_path)), workers=2)
+
+    status, _, body = _post(port, SCORES_CSV, path='/rate')
+    result = json.loads(body)
+    assert status == 200
+    assert (result['総合計レート'], result['件数'], result['未登録譜面数']) == (315, 2, 1)
+    assert [song['曲名'] for song in result['新曲']] == ['曲A']
+
+    assert _post(port, '', headers={'Content-Length': '-1'})[0] == 400
+    assert _post(port, SCORES_CSV, path='/rate?format=xml')[0] == 400
+    assert _post(port, 'a,b\n1,2\n')[0] == 400 # 必須のヘッダーがないCSV
+
+
+def test_detect_input_type():
+    assert detect_input_type(SCORES_CSV) == 'csv'
+    assert detect_input_type('<html><body></body></html>') == 'html'
+    assert detect_input_type('anything', 'text/csv; charset=utf-8') == 'csv'
@@ -0,0 +1,63 @@
+import random
+
+from master_data import MasterIndex
+from rating_engine import RatingEngine
+from score_diff import _merge_join, diff_score_sets
+
+
+def _record(song_name, score, difficulty='MAS', std_or_dx='DX'):
+    return {'曲名': song_name, '難易度': difficulty, 'STDORDX': std_or_dx, 'スコア': score}
+
+
+def _masters():
+    new_keys = [(f'新曲{i}', 'MAS', 'DX') for i in range(6)]
+    old_keys = [(f'旧曲{i}', 'MAS', 'DX') for i in range(10)] + [('ＷＩＤＥ Title', 'MAS', 'DX')]
+    new_master = MasterIndex(new_keys, [13.0 + i * 0.2 for i in range(len(new_keys))], [''] * len(new_keys), [''] * len(new_keys))
+    old_master = MasterIndex(old_keys, [12.0 + i * 0.2 for i in range(len(old_keys))], [''] * len(old_keys), [''] * len(old_keys))
+    return new_master, old_master
+
+
+def test_merge_join_covers_both_sides_in_key_order():
+    before = {('b',): (10, 0), ('c',): (20, 1)}
+    after = {('a',): (5, 0), ('c',): (25, 1), ('d',): (7, 2)}
+
+    assert _merge_join(before, after) == [(('a',), -1, -1, 5, 0),
+                                          (('b',), 10, 0, -1, -1),
+                                          (('c',), 20, 1, 25, 1),
+                                          (('d',), -1, -1, 7, 2)]
+
+
+def test_diff_matches_engine_subtotals():
+    new_master, old_master = _masters()
+    rng = random.Random(0)
+    keys = list(new_master) + list(old_master)
+    for _ in range(20):
+        before = [_record(key[0], rng.randint(950000, 1005000)) for key in rng.sample(keys, 10)]
+        after = before + [_record(key[0], rng.randint(950000, 1005000)) for key in rng.sample(keys, 5)]
+
+        diff = diff_score_sets(before, after, new_master, old_master, max_new=3, max_old=5)
+
+        for records, subtotals in ((before, diff.subtotals_before), (after, diff.subtotals_after)):
+            engine = RatingEngine(new_master, old_master, max_new=3, max_old=5)
+            engine.add_scores(records)
+            assert subtotals == {'new': engine.new_songs_subtotal_rate, 'old': engine.old_songs_subtotal_rate}
+
+
+def test_diff_reports_changes_entries_and_exits():
+    new_master, old_master = _masters()
+    before = [_record('新曲0', 1000000), _record('新曲1', 990000), _record('旧曲0', 980000)]
+    after = [_record('新曲0', 1000000), _record('新曲1', 980000), _record('新曲1', 1005000),  # 同じ譜面は最高スコアを使う
+             _record('新曲2', 1005000), _record('wide  title', 1000000)]                   # 表記ゆれはマスタの表記に補正する
+
+    diff = diff_score_sets(before, after, new_master, old_master, max_new=2, max_old=5)
+
+    changes = {change['曲名']: change for change in diff.chart_changes}
+    assert set(changes) == {'新曲1', '新曲2', '旧曲0', 'ＷＩＤＥ Title'}
+    assert (changes['新曲1']['変更前スコア'], changes['新曲1']['変更後スコア']) == (990000, 1005000)
+    assert changes['旧曲0']['変更後スコア'] is None and changes['旧曲0']['変更後レート'] == 0
+    assert changes['新曲2']['変更前スコア'] is None and changes['新曲2']['song_type'] == 'new'
+    assert [change['曲名'] for change in diff.entered['new']] == ['新曲2']
+    assert [change['曲名'] for change in diff.left['new']] == ['新曲0']
+    assert [change['曲名'] for change in diff.entered['old']] == ['ＷＩＤＥ Title']
+    assert [change['曲名'] for change in diff.left['old']] == ['旧曲0']
+    assert diff.total_delta == diff.subtotal_delta('new') + diff.subtotal_delta('old')
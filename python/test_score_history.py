@@ -0,0 +1,52 @@
+import datetime
+
+import pytest
+
+from score_history import ScoreHistory, _to_timestamp
+
+
+def _records(score, song_name='曲A'):
+    return [{'曲名': song_name, '難易度': 'MAS', 'STDORDX': 'DX', 'スコア': score}]
+
+
+@pytest.fixture
+def history():
+    with ScoreHistory(':memory:') as history:
+        yield history
+
+
+def test_timestamps_are_canonical():
+    assert _to_timestamp('2025-06-08 13:00') == '2025-06-08T13:00:00'
+    assert _to_timestamp('2025-06-08T13:00:00.250') == '2025-06-08T13:00:00'
+    assert _to_timestamp(datetime.datetime(2025, 6, 8, 13)) == '2025-06-08T13:00:00'
+    assert _to_timestamp('2025-06-08') == '2025-06-08T00:00:00'
+    assert _to_timestamp(datetime.date(2025, 6, 8), end_of_day=True) == '2025-06-08T23:59:59'
+    with pytest.raises(ValueError):
+        _to_timestamp('6/8/2025')
+
+
+def test_best_as_of_with_mixed_separators(history):
+    history.import_records(_records(1000000), taken_at='2025-06-08T12:00:00')
+    history.import_records(_records(1005000), taken_at='2025-06-08 14:00')
+
+    assert history.best_as_of('2025-06-08 13:00')[0]['スコア'] == 1000000
+    assert history.best_as_of('2025-06-08T13:00')[0]['スコア'] == 1000000
+    assert history.best_as_of('2025-06-08 11:59') == []
+
+
+def test_best_as_of_date_includes_that_day(history):
+    history.import_records(_records(1000000), taken_at=datetime.datetime(2025, 6, 8, 21, 30))
+    history.import_records(_records(1007000), taken_at='2025-06-09T00:00:00')
+
+    assert history.best_as_of(datetime.date(2025, 6, 8))[0]['スコア'] == 1000000
+    assert history.best_as_of('2025-06-09')[0]['スコア'] == 1007000
+
+
+def test_import_records_only_changed_charts(history):
+    _, changed = history.import_records(_records(1000000) + _records(990000, '曲B'), taken_at='2025-06-01')
+    assert changed == 2
+    # 同じ譜面が複数あれば最高スコア、前回と同じスコアは記録しない
+    _, changed = history.import_records(_records(1001000) + _records(999000) + _records(990000, '曲B'), taken_at='2025-06-02')
+    assert changed == 1
+    assert sorted((r['曲名'], r['スコア']) for r in history.current_best()) == [('曲A', 1001000), ('曲B', 990000)]
+    assert len(history.snapshots()) == 2
@@ -0,0 +1,30 @@
+import os
+
+from score_store import ScoreStore
+
+
+def test_upsert_keeps_best_score_per_chart():
+    store = ScoreStore('jackets')
+
+    assert store.upsert('曲A', 'MAS', 'DX', 1000000, 14.0, '14', 'a.png', 'new') == (0, True)
+    assert store.upsert('曲B', 'MAS', 'STD', 990000, 13.0, '13', '', 'old') == (1, True)
+    assert store.upsert('曲A', 'MAS', 'DX', 990000, 14.0, '14', 'a.png', 'new') == (0, False) # 下がったスコアは無視する
+    assert store.upsert('曲A', 'MAS', 'DX', 1003000, 14.0, '14', 'a.png', 'new') == (0, True)
+
+    assert len(store) == 2
+    assert store.row_of('曲B', 'MAS', 'STD') == 1
+    assert store.row_of('曲C', 'MAS', 'DX') is None
+    store.rates[0] = 313
+    assert store.record(0) == {'曲名': '曲A', '難易度': 'MAS', 'STDORDX': 'DX', 'スコア': 1003000, '譜面定数': 14.0,
+                               'レベル': '14', '画像パス': os.path.join('jackets', 'a.png'), 'レート値': 313, 'song_type': 'new'}
+    assert store.record(1)['画像パス'] == '' and store.record(1)['song_type'] == 'old'
+
+
+def test_clear_keeps_images_dir():
+    store = ScoreStore('jackets')
+    store.upsert('曲A', 'MAS', 'DX', 1000000, 14.0, '14', 'a.png', 'new')
+
+    store.clear()
+
+    assert len(store) == 0 and store.row_of('曲A', 'MAS', 'DX') is None
+    assert store.images_dir == 'jackets'
@@ -0,0 +1,40 @@
+import io
+
+from benchmark import make_table_songs, render_rating_table_baseline
+from jacket_cache import JacketCache
+from table_render import render_rating_table
+from tile_cache import TileCache
+
+
+def _png_bytes(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _songs():
+    top_new_songs, top_old_songs = make_table_songs()
+    # ジャケットのないセル (枠がセルより1ピクセル大きい) と、省略される長い曲名
+    top_new_songs[3] = dict(top_new_songs[3], 画像パス='')
+    top_old_songs[0] = dict(top_old_songs[0], 曲名='とても長い曲名' * 5 + ' & <Remix>')
+    return top_new_songs, top_old_songs[:22] # 旧曲の枠は途中まで
+
+
+def test_render_matches_baseline_png(tmp_path):
+    top_new_songs, top_old_songs = _songs()
+    expected = _png_bytes(render_rating_table_baseline(top_new_songs, top_old_songs, 15000, 4500, 10500))
+
+    jacket_cache = JacketCache(str(tmp_path))
+    tile_cache = TileCache()
+    for kwargs in ({'max_workers': 1}, {'max_workers': 4}, {'max_workers': 4, 'jacket_cache': jacket_cache},
+                   {'max_workers': 4, 'jacket_cache': jacket_cache, 'tile_cache': tile_cache},
+                   {'max_workers': 4, 'jacket_cache': jacket_cache, 'tile_cache': tile_cache}): # 最後はセルをすべてキャッシュから貼る
+        image = render_rating_table(top_new_songs, top_old_songs, 15000, 4500, 10500, **kwargs)
+        assert _png_bytes(image) == expected, kwargs
+
+
+def test_render_without_totals_matches_baseline_png():
+    top_new_songs, top_old_songs = _songs()
+
+    assert (_png_bytes(render_rating_table(top_new_songs, [], max_workers=2))
+            == _png_bytes(render_rating_table_baseline(top_new_songs, [])))
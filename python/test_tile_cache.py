@@ -0,0 +1,46 @@
+from PIL import Image
+
+from benchmark import make_table_songs
+from table_render import render_rating_table
+from tile_cache import MISSING, TILE_FIELDS, TileCache, tile_key
+
+SONG = {'曲名': '曲A', '難易度': 'MAS', 'レベル': '14', '譜面定数': 14.0, 'STDORDX': 'DX', 'スコア': 1005000,
+        'レート値': 315, '画像パス': 'a.png', 'song_type': 'new'}
+
+
+def test_tile_key_depends_only_on_drawn_fields():
+    key = tile_key(SONG, 'jacket', ('style',))
+    for field in TILE_FIELDS:
+        assert tile_key(dict(SONG, **{field: SONG[field] + 1 if field in ('スコア', 'レート値', '譜面定数') else 'x'}),
+                        'jacket', ('style',)) != key, field
+    assert tile_key(SONG, 'other jacket', ('style',)) != key
+    assert tile_key(SONG, 'jacket', ('other style',)) != key
+    assert tile_key(dict(SONG, 画像パス='b.png', song_type='old'), 'jacket', ('style',)) == key
+
+
+def test_get_and_put_in_memory_and_on_disk(tmp_path):
+    tile = Image.new('RGB', (190, 120), (1, 2, 3))
+    cache = TileCache(memory_entries=1, cache_dir=str(tmp_path))
+
+    assert cache.get('a') is MISSING
+    cache.put('a', tile)
+    cache.put('b', None) # 直接描画が必要なセルはメモリにだけ覚える
+    assert cache.get('b') is None
+    assert len(cache) == 1
+
+    assert cache.get('a').tobytes() == tile.tobytes() # メモリから外れてもディスクから読める
+    assert TileCache(cache_dir=str(tmp_path)).get('b') is MISSING
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_only_changed_cell_is_redrawn():
+    top_new_songs, top_old_songs = make_table_songs()
+    cache = TileCache()
+    render_rating_table(top_new_songs, top_old_songs, 15000, 4500, 10500, max_workers=1, tile_cache=cache)
+    misses = cache.misses
+
+    top_old_songs[4] = dict(top_old_songs[4], スコア=top_old_songs[4]['スコア'] + 1)
+    image = render_rating_table(top_new_songs, top_old_songs, 15000, 4500, 10500, max_workers=1, tile_cache=cache)
+
+    assert cache.misses == misses + 1
+    assert image.tobytes() == render_rating_table(top_new_songs, top_old_songs, 15000, 4500, 10500, max_workers=1).tobytes()
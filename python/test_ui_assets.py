@@ -0,0 +1,51 @@
+import os
+
+from PIL import Image
+
+import ui_assets
+from ui_assets import load_scaled_image
+
+
+def _source(path, mode):
+    image = Image.new(mode, (64, 48))
+    image.putdata([tuple((x * 7 + y * 3 + c * 50) % 256 for c in range(len(mode))) for y in range(48) for x in range(64)])
+    image.save(path)
+    return str(path)
+
+
+def test_scaled_image_matches_direct_resize(tmp_path):
+    for mode in ('RGB', 'RGBA'):
+        source = _source(tmp_path / f'{mode}.png', mode)
+        with Image.open(source) as img:
+            expected = img.resize((30, 20))
+
+        for _ in range(2): # 1回目は縮小して保存、2回目はキャッシュから
+            scaled = load_scaled_image(source, (30, 20), str(tmp_path / 'cache'))
+            assert (scaled.mode, scaled.tobytes()) == (expected.mode, expected.tobytes())
+
+
+def test_cached_image_is_used_without_decoding_source(tmp_path, monkeypatch):
+    source = _source(tmp_path / 'bg.png', 'RGB')
+    load_scaled_image(source, (30, 20), str(tmp_path / 'cache'))
+    opened = []
+    image_open = ui_assets.Image.open
+    monkeypatch.setattr(ui_assets.Image, 'open', lambda path, *args: opened.append(path) or image_open(path, *args))
+
+    load_scaled_image(source, (30, 20), str(tmp_path / 'cache'))
+
+    assert [os.path.dirname(path) for path in opened] == [str(tmp_path / 'cache')]
+
+
+def test_stale_entries_are_replaced(tmp_path):
+    source = _source(tmp_path / 'bg.png', 'RGB')
+    cache_dir = tmp_path / 'cache'
+    load_scaled_image(source, (30, 20), str(cache_dir))
+
+    load_scaled_image(source, (32, 24), str(cache_dir)) # 表示サイズが変わった
+    assert len(os.listdir(cache_dir)) == 1
+
+    stat = os.stat(source)
+    Image.new('RGB', (64, 48), 'red').save(source)           # 元画像が差し替えられた
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert load_scaled_image(source, (32, 24), str(cache_dir)).getpixel((0, 0)) == (255, 0, 0)
+    assert len(os.listdir(cache_dir)) == 1
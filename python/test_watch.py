@@ -0,0 +1,58 @@
+import os
+
+from master_data import MasterIndex
+from rating_engine import RatingEngine
+from watch import ChangePoller, ScoreWatcher
+
+
+def _write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def test_poller_waits_until_file_settles(tmp_path):
+    csv_dir = tmp_path / 'importCSV'
+    csv_dir.mkdir()
+    _write(csv_dir / 'old.csv', 'a')
+    poller = ChangePoller(dirs=[(str(csv_dir), ('.csv',))], debounce=2.0)
+    assert poller.prime() == [str(csv_dir / 'old.csv')]
+
+    path = str(csv_dir / 'new.csv')
+    _write(path, 'a')
+    _write(csv_dir / 'memo.txt', 'a') # 対象外の拡張子
+    assert poller.poll(now=0.0) == []
+    assert poller.poll(now=1.5) == []
+    _write(path, 'ab') # 書き込み中にまた変わると待ち時間を数え直す
+    assert poller.poll(now=1.5) == []
+    assert poller.poll(now=3.0) == []
+    assert poller.poll(now=3.5) == [path]
+    assert poller.poll(now=10.0) == [] # 返したあとは変わるまで返さない
+
+    os.remove(path)
+    assert poller.poll(now=11.0) == []
+    _write(path, 'abc') # 削除されたあとに置き直されたら新しいファイルとして扱う
+    assert poller.poll(now=12.0) == []
+    assert poller.poll(now=14.0) == [path]
+
+
+def test_watcher_renders_only_when_top_changes_and_retries_failed_save(tmp_path):
+    master = MasterIndex([('曲A', 'MAS', 'DX'), ('曲B', 'MAS', 'DX')], [14.0, 13.0], ['14', '13'], ['', ''])
+    engine = RatingEngine(master, MasterIndex([], [], [], []), max_new=1, max_old=1)
+    output_path = tmp_path / 'out' / 'rating.png'
+    watcher = ScoreWatcher(engine, str(output_path))
+    csv_path = tmp_path / 'scores.csv'
+    _write(csv_path, '曲名,難易度,STDORDX,スコア\n曲A,MAS,DX,1000000\n')
+
+    assert watcher.load_files([str(csv_path), str(tmp_path / 'missing.csv')]) == 1
+    assert not watcher.render_if_changed() # 保存先のフォルダがない
+    assert watcher.pending
+
+    os.mkdir(tmp_path / 'out')
+    assert watcher.render_if_changed()
+    assert output_path.exists() and not watcher.pending
+    assert os.listdir(tmp_path / 'out') == ['rating.png']
+
+    engine.add_score('曲B', 'MAS', 'DX', 900000) # 上位の外
+    assert not watcher.render_if_changed()
+    engine.add_score('曲A', 'MAS', 'DX', 1005000)
+    assert watcher.render_if_changed()
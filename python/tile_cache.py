@@ -0,0 +1,115 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+from jacket_cache import evict_lru_files
+
+# 描画済みセルの保存先の既定 (実行ファイルと同じ場所の cache フォルダ内)
+TILE_CACHE_DIR_NAME = os.path.join('cache', 'tiles')
+# メモリ上に保持するセルの数 (表1枚分は50セル)
+DEFAULT_TILE_MEMORY_ENTRIES = 512
+# ディスク上のセルの合計サイズの上限
+DEFAULT_MAX_TILE_CACHE_BYTES = 128 * 1024 * 1024
+
+# セルの画素を決める項目 (これ以外の項目が変わっても描き直さない)
+TILE_FIELDS = ('曲名', '難易度', 'レベル', '譜面定数', 'STDORDX', 'スコア', 'レート値')
+
+# get() でキャッシュになかったことを表す値 (None は「直接描画が必要なセル」としてキャッシュする)
+MISSING = object()
+
+
+def tile_key(song, jacket_id, style_key):
+    """
+    セルのキャッシュキー。表示する項目・ジャケットの識別子・描画スタイルのハッシュ。
+
+    Args:
+        song (dict): 表示用の楽曲データ。
+        jacket_id: ジャケット画像の内容を表す値 (画像がなければ None)。
+        style_key (tuple): レイアウト定数やフォントなど描画スタイルを表す値。
+
+    Returns:
+        str: 16進数のハッシュ。
+
+    """
+    fields = tuple(song[field] for field in TILE_FIELDS)
+    return hashlib.sha1(repr((style_key, jacket_id, fields)).encode('utf-8')).hexdigest()
+
+
+class TileCache:
+    """
+    描画済みのセル (ジャケットとテキストを重ねたタイル) のキャッシュ。
+    メモリ上では最近使った memory_entries 件を保持し、cache_dir を指定するとディスクにも保存する。
+    ディスク上の合計が max_bytes を超えたら、最後に使ったのが古いものから削除する。
+    複数のスレッドから同時に使ってよい。
+    """
+
+    def __init__(self, memory_entries=DEFAULT_TILE_MEMORY_ENTRIES, cache_dir=None,
+                 max_bytes=DEFAULT_MAX_TILE_CACHE_BYTES):
+        self.memory_entries = memory_entries
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict() # キー → タイル (直接描画が必要なセルは None)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._memory)
+
+    def _remember(self, key, tile):
+        with self._lock:
+            self._memory[key] = tile
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """ キャッシュ済みのタイル (直接描画が必要なセルは None)、なければ MISSING を返す """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+        if self.cache_dir is not None:
+            cache_path = os.path.join(self.cache_dir, key + '.png')
+            try:
+                with Image.open(cache_path) as cached:
+                    tile = cached.copy()
+                os.utime(cache_path) # 最後に使った日時として更新日時を使う
+                with self._lock:
+                    self.hits += 1
+                self._remember(key, tile)
+                return tile
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"セルのキャッシュを読み込めないため描き直します ({cache_path}): {e}")
+
+        with self._lock:
+            self.misses += 1
+        return MISSING
+
+    def put(self, key, tile):
+        """ 描画したタイルを保存する (None はメモリ上にだけ記録する) """
+        self._remember(key, tile)
+        if self.cache_dir is None or tile is None:
+            return
+        cache_path = os.path.join(self.cache_dir, key + '.png')
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            tile.save(tmp_path, format='PNG')
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"セルのキャッシュを保存できませんでした ({cache_path}): {e}")
+            return
+        evict_lru_files(self.cache_dir, self.max_bytes)
+
+    def clear(self):
+        """ メモリ上のキャッシュを空にする (ディスク上のファイルは残す) """
+        with self._lock:
+            self._memory.clear()
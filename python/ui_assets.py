@@ -0,0 +1,76 @@
+import hashlib
+import os
+import threading
+
+from PIL import Image
+
+# 縮小済みの画面用画像 (背景・説明画像) の保存先の既定 (実行ファイルと同じ場所の cache フォルダ内)
+UI_ASSET_CACHE_DIR_NAME = os.path.join('cache', 'ui')
+# 縮小済み画像の保存形式。無圧縮の TGA は PNG と違って展開が要らず、透過 (RGBA) もそのまま保存できる
+_CACHE_EXTENSION = '.tga'
+
+
+def _cache_file_name(source_path, size):
+    """ 元画像のパス・更新日時・サイズと表示サイズから決まるキャッシュのファイル名 """
+    stat = os.stat(source_path)
+    identity = repr((os.path.abspath(source_path), stat.st_mtime_ns, stat.st_size, tuple(size)))
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    return f"{stem}_{size[0]}x{size[1]}_{hashlib.sha1(identity.encode('utf-8')).hexdigest()[:16]}{_CACHE_EXTENSION}"
+
+
+def _remove_stale_files(cache_dir, stem, keep_name):
+    """ 同じ元画像の古いキャッシュ (元画像や表示サイズが変わる前のもの) を削除する """
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return
+    for name in names:
+        if name != keep_name and name.startswith(stem + '_') and name.endswith(_CACHE_EXTENSION):
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+
+
+def load_scaled_image(source_path, size, cache_dir):
+    """
+    画面用の画像を size に縮小して返す。縮小済みの画像を cache_dir に保存しておき、
+    元画像 (更新日時・ファイルサイズ) と size が同じなら元画像を読まずにそれを使う。
+    Image.open(source_path).resize(size) と同じ画素になる。
+
+    Args:
+        source_path (str): 元の画像のパス。
+        size (tuple): (幅, 高さ)。
+        cache_dir (str): 縮小済み画像の保存先。
+
+    Returns:
+        PIL.Image.Image: 縮小した画像。
+
+    Raises:
+        FileNotFoundError: 元画像がない場合。
+        OSError: 元画像を読み込めない場合。
+
+    """
+    name = _cache_file_name(source_path, size)
+    cache_path = os.path.join(cache_dir, name)
+    try:
+        with Image.open(cache_path) as cached:
+            cached.load()
+            return cached.copy()
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"画面用画像のキャッシュを読み込めないため作り直します ({cache_path}): {e}")
+
+    with Image.open(source_path) as img:
+        scaled = img.resize(size)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        scaled.save(tmp_path, format='TGA')
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"画面用画像のキャッシュを保存できませんでした ({cache_path}): {e}")
+        return scaled
+    _remove_stale_files(cache_dir, os.path.splitext(os.path.basename(source_path))[0], name)
+    return scaled
@@ -0,0 +1,228 @@
+import argparse
+import os
+import time
+
+from extract_music_data import (HTML_DUMP_DIR_NAME, HTML_DUMP_EXTENSIONS, get_external_file_path,
+                                parse_html_file)
+from jacket_cache import JACKET_CACHE_DIR_NAME, JacketCache
+from master_data import load_master_index
+from rating_engine import RatingEngine
+from score_csv import read_score_csv
+from table_render import MAX_NEW_SONGS_DISPLAY, MAX_OLD_SONGS_DISPLAY, render_rating_table
+from tile_cache import TILE_CACHE_DIR_NAME, TileCache
+
+# 監視対象の既定 (いずれもexeと同じ場所)
+HTML_FILE_NAME = 'html.txt'
+IMPORT_CSV_DIR_NAME = 'importCSV'
+DEFAULT_OUTPUT_FILE_NAME = 'rating_table.png'
+NEW_SONG_MASTER_CSV_FILE_NAME = 'new_song_master.csv'
+OLD_SONG_MASTER_CSV_FILE_NAME = 'old_song_master.csv'
+IMAGES_DIR_NAME = 'ジャケット'
+
+POLL_INTERVAL_SEC = 1.0 # 更新を確認する間隔
+DEBOUNCE_SEC = 2.0 # 更新日時とサイズがこの時間変わらなくなってから読み込む (貼り付けや保存の途中を読まないため)
+
+
+class ChangePoller:
+    """
+    ファイルとフォルダを定期的に調べ、追加・更新されたファイルを返す (外部ライブラリなしで動くようにポーリングで検出する)。
+    更新日時とサイズが debounce 秒変わらなくなったファイルだけを返すので、書き込み中のファイルは読まない。
+    """
+
+    def __init__(self, files=(), dirs=(), debounce=DEBOUNCE_SEC):
+        """
+        Args:
+            files (iterable): 監視するファイルのパス。
+            dirs (iterable): (フォルダのパス, 対象の拡張子のタプル) のリスト。
+            debounce (float): 更新が落ち着いたとみなすまでの秒数。
+
+        """
+        self.files = list(files)
+        self.dirs = list(dirs)
+        self.debounce = debounce
+        self._known = {}   # パス → 最後に返したときの (更新日時, サイズ)
+        self._pending = {} # パス → ((更新日時, サイズ), その状態を最初に見た時刻)
+
+    def scan(self):
+        """ 監視対象のファイルごとの (更新日時, サイズ) """
+        paths = list(self.files)
+        for dir_path, extensions in self.dirs:
+            try:
+                names = sorted(os.listdir(dir_path))
+            except OSError:
+                continue
+            paths.extend(os.path.join(dir_path, name) for name in names if name.lower().endswith(extensions))
+        stats = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if os.path.isfile(path):
+                stats[path] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+    def prime(self):
+        """ 今あるファイルを処理済みとして記録し、そのパスのリストを返す (起動時にまとめて読み込む用) """
+        self._known = self.scan()
+        self._pending.clear()
+        return list(self._known)
+
+    def poll(self, now=None):
+        """ 前回から追加・更新され、更新が落ち着いたファイルのパスのリスト """
+        if now is None:
+            now = time.monotonic()
+        stats = self.scan()
+        for path in list(self._known):
+            if path not in stats: # 削除されたファイル (取り込み済みのスコアはそのまま残す)
+                del self._known[path]
+        for path in list(self._pending):
+            if path not in stats:
+                del self._pending[path]
+
+        settled = []
+        for path, stat in stats.items():
+            if self._known.get(path) == stat:
+                self._pending.pop(path, None)
+                continue
+            pending = self._pending.get(path)
+            if pending is None or pending[0] != stat:
+                self._pending[path] = (stat, now) # 変わるたびに待ち時間を数え直す
+            elif now - pending[1] >= self.debounce:
+                del self._pending[path]
+                self._known[path] = stat
+                settled.append(path)
+        return settled
+
+
+def read_scores_file(path):
+    """ HTMLダンプかスコアCSVを読み込んで楽曲データを返す (拡張子で判定する) """
+    if path.lower().endswith('.csv'):
+        return read_score_csv(path)
+    return parse_html_file(path)
+
+
+class ScoreWatcher:
+    """
+    更新されたファイルのスコアだけを読み込んでエンジンに追加し、
+    上位の顔ぶれか小計が変わったときだけ (engine.version が変わったときだけ) レーティング表の画像を作り直す。
+    """
+
+    def __init__(self, engine, output_path, jacket_cache=None, tile_cache=None):
+        self.engine = engine
+        self.output_path = output_path
+        self.jacket_cache = jacket_cache
+        self.tile_cache = tile_cache
+        self.rendered_version = None
+
+    def load_files(self, paths):
+        """ ファイルのスコアをエンジンに追加し、読み込んだ件数を返す (読めないファイルは警告して飛ばす) """
+        count = 0
+        for path in paths:
+            try:
+                records = read_scores_file(path)
+            except Exception as e:
+                print(f"読み込みエラー ({path}): {e}")
+                continue
+            song_types, _ = self.engine.add_scores(records)
+            unknown_count = song_types.count('unknown')
+            print(f"{os.path.basename(path)}: {len(records)} 件" + (f" (マスタにない譜面 {unknown_count} 件)" if unknown_count else ""))
+            count += len(records)
+        return count
+
+    @property
+    def pending(self):
+        """ 表示内容が変わったのに画像をまだ保存できていないか """
+        return self.engine.version != self.rendered_version
+
+    def render_if_changed(self):
+        """
+        前回の画像から表示内容が変わっていれば作り直し、作り直したら True を返す。
+        保存できなかった場合 (Windows で配信ソフトが画像を開いたままのときなど) は警告して False を返し、
+        次に呼ばれたときに作り直す。
+        """
+        if not self.pending:
+            return False
+        engine = self.engine
+        image = render_rating_table(engine.top_new_songs(), engine.top_old_songs(), engine.total_rate,
+                                    engine.new_songs_subtotal_rate, engine.old_songs_subtotal_rate,
+                                    jacket_cache=self.jacket_cache, tile_cache=self.tile_cache)
+        # 配信ソフトなどが書き込み途中の画像を読まないよう、一時ファイルに書いてから置き換える
+        root, extension = os.path.splitext(self.output_path)
+        tmp_path = f"{root}.{os.getpid()}.tmp{extension}"
+        try:
+            image.save(tmp_path)
+            os.replace(tmp_path, self.output_path)
+        except OSError as e:
+            print(f"画像を保存できませんでした。次の確認時に再試行します ({self.output_path}): {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+        if self.jacket_cache is not None:
+            self.jacket_cache.save_hash_index()
+        self.rendered_version = engine.version
+        print(f"{time.strftime('%H:%M:%S')} 総合計レート {engine.total_rate} "
+              f"(新曲 {engine.new_songs_subtotal_rate} / 旧曲 {engine.old_songs_subtotal_rate}) → {self.output_path}")
+        return True
+
+
+def watch(poller, watcher, interval=POLL_INTERVAL_SEC, once=False):
+    """
+    今あるファイルを読み込んで表を作り、その後は更新されたファイルだけを読み込み直す (Ctrl+C で終了)。
+
+    Args:
+        poller (ChangePoller): 監視対象。
+        watcher (ScoreWatcher): スコアの取り込みと画像の作成。
+        interval (float): 更新を確認する間隔 (秒)。
+        once (bool): True なら今あるファイルを処理したら終了する。
+
+    """
+    watcher.load_files(poller.prime())
+    watcher.render_if_changed()
+    if once:
+        return
+    print("監視中... (Ctrl+C で終了)")
+    try:
+        while True:
+            time.sleep(interval)
+            changed_paths = poller.poll()
+            if changed_paths:
+                watcher.load_files(changed_paths)
+                if not watcher.render_if_changed() and not watcher.pending:
+                    print("上位の曲は変わっていません。")
+            elif watcher.pending: # 前回保存できなかった画像を作り直す
+                watcher.render_if_changed()
+    except KeyboardInterrupt:
+        print("監視を終了しました。")
+
+
+def _main():
+    parser = argparse.ArgumentParser(description="html.txt・HTMLダンプのフォルダ・importCSV を監視し、更新されたらレーティング表の画像を作り直す")
+    parser.add_argument('--html', default=get_external_file_path(HTML_FILE_NAME), help="監視するHTMLファイル")
+    parser.add_argument('--dump-dir', default=get_external_file_path(HTML_DUMP_DIR_NAME), help="HTMLダンプを置くフォルダ")
+    parser.add_argument('--csv-dir', default=get_external_file_path(IMPORT_CSV_DIR_NAME), help="スコアCSVを置くフォルダ")
+    parser.add_argument('--output', default=get_external_file_path(DEFAULT_OUTPUT_FILE_NAME), help="レーティング表の画像の保存先")
+    parser.add_argument('--new-master', default=get_external_file_path(NEW_SONG_MASTER_CSV_FILE_NAME), help="新曲マスタCSVのパス")
+    parser.add_argument('--old-master', default=get_external_file_path(OLD_SONG_MASTER_CSV_FILE_NAME), help="旧曲マスタCSVのパス")
+    parser.add_argument('--images-dir', default=get_external_file_path(IMAGES_DIR_NAME), help="ジャケット画像のフォルダ")
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL_SEC, help="更新を確認する間隔 (秒)")
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE_SEC, help="更新が落ち着いたとみなすまでの秒数")
+    parser.add_argument('--once', action='store_true', help="今あるファイルを処理したら終了する")
+    args = parser.parse_args()
+
+    engine = RatingEngine(load_master_index(args.new_master), load_master_index(args.old_master), args.images_dir,
+                          MAX_NEW_SONGS_DISPLAY, MAX_OLD_SONGS_DISPLAY)
+    cache_root = os.path.dirname(os.path.abspath(args.output))
+    watcher = ScoreWatcher(engine, args.output,
+                           jacket_cache=JacketCache(os.path.join(cache_root, JACKET_CACHE_DIR_NAME)),
+                           tile_cache=TileCache(cache_dir=os.path.join(cache_root, TILE_CACHE_DIR_NAME)))
+    poller = ChangePoller(files=[args.html],
+                          dirs=[(args.dump_dir, HTML_DUMP_EXTENSIONS), (args.csv_dir, ('.csv',))],
+                          debounce=args.debounce)
+    watch(poller, watcher, interval=args.interval, once=args.once)
+
+
+if __name__ == '__main__':
+    _main()